@@ -19,6 +19,10 @@ class Settings(BaseSettings):
     
     # Database
     DATABASE_PATH: str = Field(default="data/estoque.db")
+    DATABASE_BUSY_TIMEOUT_MS: int = Field(default=5000)
+    DATABASE_CACHE_SIZE_KB: int = Field(default=8192)  # 8 MB de page cache por conexão
+    DATABASE_MMAP_SIZE: int = Field(default=64 * 1024 * 1024)  # 64 MB
+    DATABASE_MAX_WORKERS: int = Field(default=4)  # Threads do pool usado pelas rotas async
     
     # Google Sheets
     GOOGLE_SHEETS_SPREADSHEET_ID: str = Field(default="")
@@ -28,9 +32,41 @@ class Settings(BaseSettings):
     SLACK_BOT_TOKEN: str = Field(default="")
     SLACK_CHANNEL: str = Field(default="C09DV1KQS4C")
     SLACK_ENABLED: bool = Field(default=True)
+    SLACK_USER_CACHE_TTL_SECONDS: float = Field(default=600.0)  # Mapeamento PESSOAS → Slack
+    SLACK_USER_CACHE_PERSIST: bool = Field(default=True)  # Cópia no SQLite para partida a frio
     
     # Sync Settings
-    SYNC_INTERVAL_MINUTES: int = 5
+    SYNC_INTERVAL_MINUTES: int = 5  # 0 desliga o sync agendado
+    SYNC_JITTER_SECONDS: int = Field(default=30)  # Espalha o horário do sync agendado
+    SYNC_TIMEOUT_SECONDS: float = Field(default=120.0)  # Tempo máximo de espera por um sync
+    SHEETS_HTTP_TIMEOUT_SECONDS: float = Field(default=30.0)  # Por requisição ao Google
+    
+    # Outbox (Slack/Sheets em segundo plano)
+    OUTBOX_POLL_SECONDS: float = Field(default=30.0)
+    OUTBOX_MAX_ATTEMPTS: int = Field(default=8)
+    OUTBOX_BACKOFF_BASE_SECONDS: float = Field(default=5.0)
+    OUTBOX_BACKOFF_MAX_SECONDS: float = Field(default=600.0)
+    
+    # HISTÓRICO (linhas agrupadas num único append_rows)
+    HISTORY_BATCH_MAX_ROWS: int = Field(default=50)
+    HISTORY_BATCH_WINDOW_SECONDS: float = Field(default=2.0)  # Espera para juntar linhas
+    SHEETS_QUOTA_BACKOFF_SECONDS: float = Field(default=60.0)  # Cota por minuto do Sheets
+    
+    # Feed de mudanças dos itens (/api/items/changes e /api/items/stream)
+    CHANGE_FEED_POLL_SECONDS: float = Field(default=2.0)  # Pega escritas de outros processos
+    CHANGE_FEED_KEEPALIVE_SECONDS: float = Field(default=15.0)  # Comentário SSE contra proxies
+    CHANGE_FEED_STREAM_MAX_SECONDS: float = Field(default=120.0)  # Depois o navegador reconecta
+    
+    # Alertas de estoque baixo (só quando o item cruza o estoque_minimo)
+    LOW_STOCK_ALERTS_ENABLED: bool = Field(default=True)
+    LOW_STOCK_ALERT_WINDOW_SECONDS: float = Field(default=60.0)  # Junta os cruzamentos num resumo; ida e volta na janela não avisa
+    LOW_STOCK_ALERT_MAX_ITEMS: int = Field(default=50)  # Cruzamentos por mensagem
+    
+    # Compressão e cache HTTP
+    COMPRESSION_MINIMUM_BYTES: int = Field(default=1000)  # Respostas menores saem sem compressão
+    COMPRESSION_GZIP_LEVEL: int = Field(default=6)
+    COMPRESSION_BROTLI_QUALITY: int = Field(default=5)  # Por requisição; compress_static.py usa 11
+    STATIC_MAX_AGE_SECONDS: int = Field(default=365 * 24 * 3600)  # Assets com ?v=<hash> (immutable)
     
     class Config:
         env_file = ".env"
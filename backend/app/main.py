@@ -3,11 +3,12 @@ Main FastAPI Application
 Sistema de Controle de Estoque 5S
 """
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, Request, Response
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import HTMLResponse, JSONResponse
 from contextlib import asynccontextmanager
+import asyncio
 import os
 import sys
 
@@ -15,9 +16,40 @@ import sys
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from app.routes import items, transactions, settings as settings_routes
-from app.services.database import Database
-from app.services.google_sheets import GoogleSheetsService
+from app.services.database import Database, AsyncDatabase
+from app.services.outbox import outbox_worker
+from app.services.change_feed import change_feed
+from app.services.slack_user_cache import slack_user_cache
+from app.services.sync_scheduler import sync_scheduler
 from app.config import settings
+from app.utils.compression import CompressionMiddleware
+from app.utils.http_cache import etag_matches
+from app.utils.static_assets import StaticAssets, render_index
+
+
+# Estado da partida, usado pelo /api/ready (o /api/health só diz que o processo está de pé)
+startup_state = {
+    "database": False,
+    "initial_sync": "pendente",  # pendente | rodando | ok | falhou
+    "initial_sync_error": None,
+}
+
+
+async def initial_sync():
+    """Initial sync with Google Sheets, in the background"""
+    startup_state["initial_sync"] = "rodando"
+    try:
+        print("Iniciando sincronizacao com Google Sheets...")
+        result = await sync_scheduler.run(trigger="inicial")
+        startup_state["initial_sync"] = "ok"
+        print(f"Sincronizacao inicial concluida: {result}")
+    except Exception as e:
+        startup_state["initial_sync"] = "falhou"
+        startup_state["initial_sync_error"] = str(e)
+        print(f"Erro na sincronizacao inicial: {e}")
+        print("   Sistema continuara funcionando com dados locais")
+        import traceback
+        traceback.print_exc()
 
 
 # Lifespan context manager for startup/shutdown events
@@ -29,24 +61,32 @@ async def lifespan(app: FastAPI):
     # Initialize database
     db = Database()
     db.init_db()
+    startup_state["database"] = True
     print("Banco de dados inicializado")
     
-    # Initial sync with Google Sheets
-    try:
-        print("Iniciando sincronizacao com Google Sheets...")
-        sheets_service = GoogleSheetsService()
-        result = await sheets_service.sync_from_sheets()
-        print(f"Sincronizacao inicial concluida: {result}")
-    except Exception as e:
-        print(f"Erro na sincronizacao inicial: {e}")
-        print("   Sistema continuara funcionando com dados locais")
-        import traceback
-        traceback.print_exc()
+    # Entrega em segundo plano do que ficou pendente no outbox (Slack/Sheets)
+    outbox_worker.start()
+    
+    # Acorda os streams de /api/items/stream a cada mudança de item
+    change_feed.start()
+    
+    # Serve já com o estado local; o sync inicial roda em segundo plano
+    sync_task = asyncio.create_task(initial_sync(), name="initial-sync")
+    
+    # Sync periódico (SYNC_INTERVAL_MINUTES)
+    sync_scheduler.start()
     
     yield
     
     # Shutdown
     print("Encerrando aplicacao...")
+    sync_task.cancel()
+    sync_scheduler.shutdown()
+    await change_feed.stop()
+    await outbox_worker.stop()
+    slack_user_cache.shutdown()
+    AsyncDatabase.shutdown()
+    Database.close_all()
 
 
 # Create FastAPI app
@@ -64,6 +104,15 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Next-Cursor"],
+)
+
+# Compressão (brotli/gzip) acima de COMPRESSION_MINIMUM_BYTES; SSE e .br/.gz passam direto
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=settings.COMPRESSION_MINIMUM_BYTES,
+    compresslevel=settings.COMPRESSION_GZIP_LEVEL,
+    brotli_quality=settings.COMPRESSION_BROTLI_QUALITY,
 )
 
 # Include routers
@@ -74,12 +123,16 @@ app.include_router(settings_routes.router, prefix="/api", tags=["Settings"])
 # Mount static files (frontend)
 frontend_path = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "frontend")
 if os.path.exists(frontend_path):
-    app.mount("/static", StaticFiles(directory=frontend_path), name="static")
+    app.mount("/static", StaticAssets(directory=frontend_path, max_age=settings.STATIC_MAX_AGE_SECONDS), name="static")
     
     @app.get("/")
-    async def serve_frontend():
-        """Serve the frontend HTML"""
-        return FileResponse(os.path.join(frontend_path, "index.html"))
+    async def serve_frontend(request: Request):
+        """Serve the frontend HTML (hashed asset URLs, revalidated via ETag)"""
+        body, etag = await run_in_threadpool(render_index, frontend_path)
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            return Response(status_code=304, headers=headers)
+        return HTMLResponse(body, headers=headers)
 
 
 # Health check endpoint
@@ -92,6 +145,30 @@ async def health_check():
     }
 
 
+# Readiness endpoint
+@app.get("/api/ready")
+async def readiness_check():
+    """
+    Readiness: can the kiosk show the inventory?
+    Pronto assim que houver catálogo local (mesmo com o sync inicial
+    ainda rodando ou falhando); com o banco vazio, só depois do sync
+    inicial terminar.
+    """
+    itens_locais = await AsyncDatabase().count_items() if startup_state["database"] else 0
+    pronto = startup_state["database"] and (
+        itens_locais > 0 or startup_state["initial_sync"] in ("ok", "falhou")
+    )
+    return JSONResponse(
+        status_code=200 if pronto else 503,
+        content={
+            "ready": pronto,
+            "local_items": itens_locais,
+            **startup_state,
+            "sync": sync_scheduler.status()
+        }
+    )
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(
@@ -3,7 +3,7 @@ Data Models for Items and Transactions
 """
 
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import List, Optional
 from datetime import datetime
 
 
@@ -19,6 +19,7 @@ class Item(BaseModel):
     estoque_minimo: int = 0
     codigos_originais: Optional[str] = None
     aba_origem: Optional[str] = None
+    change_seq: int = 0  # Posição no feed de mudanças (/api/items/changes)
     
     class Config:
         from_attributes = True
@@ -47,6 +48,19 @@ class TransactionCreate(BaseModel):
     nome_pessoa: str = Field(..., min_length=1)
 
 
+class BatchMovement(BaseModel):
+    """One line of a batch checkout"""
+    tipo: str = Field(..., pattern="^(retirada|devolucao)$")
+    item_id: int
+    quantidade: int = Field(..., gt=0)
+
+
+class TransactionBatchCreate(BaseModel):
+    """Batch Transaction Request (all items for one person, all-or-nothing)"""
+    nome_pessoa: str = Field(..., min_length=1)
+    itens: List[BatchMovement] = Field(..., min_length=1, max_length=50)
+
+
 class TransactionResponse(BaseModel):
     """Transaction Response"""
     success: bool
@@ -54,4 +68,23 @@ class TransactionResponse(BaseModel):
     transaction_id: int
     novo_saldo: int
     slack_notified: bool = False
+    codigos: List[str] = Field(default_factory=list)  # Unidades 5S retiradas/devolvidas
+
 
+class BatchTransactionResult(BaseModel):
+    """Result of one line of a batch checkout"""
+    transaction_id: int
+    tipo: str
+    item_id: int
+    item_nome: str
+    quantidade: int
+    novo_saldo: int
+    codigos: List[str] = Field(default_factory=list)
+
+
+class TransactionBatchResponse(BaseModel):
+    """Batch Transaction Response"""
+    success: bool
+    message: str
+    transactions: List[BatchTransactionResult]
+    slack_notified: bool = False
@@ -3,57 +3,234 @@ Items Routes
 Endpoints for item management
 """
 
-from fastapi import APIRouter, HTTPException, Query
-from typing import List
-from app.services.database import Database
-from app.services.google_sheets import GoogleSheetsService
+import hashlib
+import json
+import time
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from typing import List, Optional
+from app.config import settings
+from app.services.database import AsyncDatabase
+from app.services.catalog_cache import ITEM_FIELDS, CatalogSnapshot, catalog_cache
+from app.services.change_feed import change_feed
+from app.services.sync_scheduler import SyncTimeoutError, sync_scheduler
 from app.models.item import Item
+from app.utils.http_cache import etag_matches
+from app.utils.pagination import encode_cursor, decode_cursor
 
 router = APIRouter()
-db = Database()
+db = AsyncDatabase()
+
+# Mudanças por evento do stream (o resto vem em seguida, em outros eventos)
+STREAM_BATCH = 500
+
+
+async def _catalog() -> CatalogSnapshot:
+    """
+    Catalog snapshot at the change feed's sequence
+    Se o feed viu o seq andar (ou ainda não há catálogo), atualiza no pool
+    do banco; senão serve da memória sem sair do event loop.
+    """
+    snapshot = catalog_cache.current(change_feed.seq)
+    if snapshot is None:
+        snapshot = await db.run(catalog_cache.refresh)
+    return snapshot
+
+
+def _cached_response(request: Request, body: bytes, etag: str) -> Response:
+    """JSON response with ETag; 304 when the client already has it"""
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
 
 
 @router.get("/items", response_model=List[Item])
-async def get_all_items():
-    """Get all items"""
+async def get_all_items(
+    request: Request,
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    cursor: Optional[str] = None
+):
+    """
+    Get all items (served from the catalog cache, supports If-None-Match)
+    Com `limit`/`cursor`, pagina por (nome, id); o próximo cursor vem no
+    header X-Next-Cursor.
+    """
     try:
-        items = db.get_all_items()
+        after = decode_cursor(cursor, (str, int))  # (nome, id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    try:
+        if limit is None and after is None:
+            body, etag = (await _catalog()).get_body()
+            return _cached_response(request, body, etag)
+        
+        body, next_key = (await _catalog()).get_page(limit or 100, after)
+        headers = {"X-Next-Cursor": encode_cursor(list(next_key))} if next_key else {}
+        return Response(content=body, media_type="application/json", headers=headers)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+# Declarada antes de /items/{item_id} para "search" não ser lido como ID
+@router.get("/items/search", response_model=List[Item])
+async def search_items(
+    q: str = Query(None, min_length=1),
+    limit: int = Query(20, ge=1, le=100)
+):
+    """Search items by name, codes, category or location (accent-insensitive, prefix)"""
+    try:
+        if not q or len(q.strip()) < 2:
+            return []
+        items = await db.search_items(q, limit)
         return items
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def _changes_payload(changes: dict, since: int) -> dict:
+    """Delta as sent to clients (reset: the client is ahead of the database)"""
+    return {
+        "seq": changes['seq'],
+        "items": [{field: item.get(field) for field in ITEM_FIELDS} for item in changes['items']],
+        "removidos": changes['removidos'],
+        "has_more": changes['has_more'],
+        "reset": since > changes['seq']
+    }
+
+
+def _sse(evento: str, data: dict, event_id: int) -> str:
+    """One Server-Sent Events message"""
+    payload = json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+    return f"id: {event_id}\nevent: {evento}\ndata: {payload}\n\n"
+
+
+@router.get("/items/changes")
+async def get_item_changes(
+    since: int = Query(0, ge=0, description="Último seq recebido (0 = tudo)"),
+    limit: int = Query(500, ge=1, le=5000)
+):
+    """
+    Items changed or removed after `since` (catalog delta)
+    Guarde o `seq` da resposta e mande em ?since= no próximo pedido; com
+    has_more, peça de novo em seguida. reset=true: o banco foi recriado,
+    recarregue /api/items.
+    """
+    try:
+        changes = await db.get_item_changes(since, limit)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return _changes_payload(changes, since)
+
+
+@router.get("/items/stream")
+async def stream_item_changes(request: Request, since: Optional[int] = Query(None, ge=0)):
+    """
+    Server-Sent Events with item deltas as they happen
+    Eventos: `items` (mesmo formato de /api/items/changes, id = seq),
+    `reset` (recarregue /api/items) e `ready` quando o cliente não mandou
+    `since`. Na reconexão o EventSource manda Last-Event-ID e o stream
+    continua de onde parou; por isso cada stream dura no máximo
+    CHANGE_FEED_STREAM_MAX_SECONDS (o uvicorn espera respostas abertas
+    antes de encerrar).
+    """
+    ultimo_id = request.headers.get("last-event-id", "")
+    if ultimo_id.isdigit():
+        since = int(ultimo_id)
+    
+    async def eventos():
+        seq = since
+        fim = time.monotonic() + settings.CHANGE_FEED_STREAM_MAX_SECONDS
+        yield "retry: 3000\n\n"
+        if seq is None:
+            seq = await db.get_change_seq()
+            yield _sse("ready", {"seq": seq}, seq)
+        
+        while not change_feed.closed and time.monotonic() < fim:
+            changes = _changes_payload(await db.get_item_changes(seq, STREAM_BATCH), seq)
+            if changes['reset']:
+                yield _sse("reset", {"seq": changes['seq']}, changes['seq'])
+            elif changes['items'] or changes['removidos']:
+                yield _sse("items", changes, changes['seq'])
+            seq = changes['seq']
+            if changes['has_more']:
+                continue
+            if await request.is_disconnected():
+                break
+            espera = min(settings.CHANGE_FEED_KEEPALIVE_SECONDS, fim - time.monotonic())
+            if espera > 0 and not await change_feed.wait(seq, espera):
+                yield ": ping\n\n"  # Mantém a conexão viva em proxies
+    
+    return StreamingResponse(
+        eventos(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 @router.get("/items/{item_id}", response_model=Item)
-async def get_item(item_id: int):
-    """Get item by ID"""
-    item = db.get_item_by_id(item_id)
-    if not item:
+async def get_item(item_id: int, request: Request):
+    """Get item by ID (served from the catalog cache, supports If-None-Match)"""
+    cached = (await _catalog()).get_item(item_id)
+    if not cached:
         raise HTTPException(status_code=404, detail="Item não encontrado")
-    return item
+    return _cached_response(request, *cached)
 
 
-@router.get("/items/search", response_model=List[Item])
-async def search_items(q: str = Query(None, min_length=1)):
-    """Search items by name"""
+STATS_FIELDS = ("itens", "quantidade_total", "quantidade_disponivel", "quantidade_em_uso", "abaixo_minimo")
+
+
+def _stats_payload(stats: dict) -> dict:
+    """Totals and per-aba rollups from the (aba_origem, categoria) groups"""
+    totais = dict.fromkeys(STATS_FIELDS, 0)
+    por_aba = {}
+    for grupo in stats['grupos']:
+        aba = por_aba.setdefault(grupo['aba_origem'], {'aba_origem': grupo['aba_origem'], **dict.fromkeys(STATS_FIELDS, 0)})
+        for campo in STATS_FIELDS:
+            totais[campo] += grupo[campo]
+            aba[campo] += grupo[campo]
+    return {
+        'seq': stats['seq'],
+        'totais': totais,
+        'por_aba': list(por_aba.values()),
+        'grupos': stats['grupos']
+    }
+
+
+@router.get("/stats")
+async def get_stats(request: Request):
+    """
+    Dashboard totals: units, available, in use and items below estoque_minimo
+    Vem dos agregados por aba/categoria mantidos por triggers no mesmo
+    commit de cada movimentação ou sync; não varre o catálogo.
+    """
     try:
-        if not q or len(q.strip()) < 2:
-            return []
-        items = db.search_items(q)
-        return items
+        stats = await db.get_item_stats()
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    body = json.dumps(_stats_payload(stats), ensure_ascii=False).encode("utf-8")
+    return _cached_response(request, body, f'"s-{hashlib.sha1(body).hexdigest()[:16]}"')
 
 
 @router.post("/sync")
-async def sync_with_sheets():
-    """Manually trigger sync with Google Sheets"""
+async def sync_with_sheets(full: bool = Query(False, description="Ignora os snapshots e reprocessa todas as abas")):
+    """
+    Manually trigger sync with Google Sheets (incremental unless full=true)
+    Se já houver um sync rodando, espera e devolve o resultado dele
+    """
     try:
-        sheets_service = GoogleSheetsService()
-        result = await sheets_service.sync_from_sheets()
-        return result
+        return await sync_scheduler.run(trigger="manual", full=full)
+    except SyncTimeoutError as e:
+        raise HTTPException(status_code=504, detail=str(e))
     except Exception as e:
         raise HTTPException(
             status_code=500,
             detail=f"Erro ao sincronizar com Google Sheets: {str(e)}"
         )
 
+
+@router.get("/sync/status")
+async def get_sync_status():
+    """Last sync run (trigger, duration, result) and next scheduled run"""
+    return sync_scheduler.status()
@@ -2,6 +2,7 @@
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
 from app.config import settings
+from app.services.slack_user_cache import slack_user_cache
 import os
 from pathlib import Path
 
@@ -75,3 +76,14 @@ async def save_slack_settings(slack_settings: SlackSettings):
         )
 
 
+@router.get("/settings/slack/user-cache")
+async def get_slack_user_cache_stats():
+    """Get hit rate and refresh stats of the PESSOAS → Slack mapping cache"""
+    return slack_user_cache.stats()
+
+
+@router.post("/settings/slack/user-cache/refresh")
+async def refresh_slack_user_cache():
+    """Mark the PESSOAS → Slack mapping as stale so it is downloaded again"""
+    slack_user_cache.invalidate()
+    return {"success": True, "message": "Mapeamento sera atualizado na proxima consulta"}
@@ -3,17 +3,20 @@ Transactions Routes
 Endpoints for item transactions (retirada/devolucao)
 """
 
-from fastapi import APIRouter, HTTPException, Query
-from typing import List
+from fastapi import APIRouter, HTTPException, Query, Response
+from typing import List, Optional
 from datetime import datetime
-from app.services.database import Database
-from app.services.slack_service import SlackService
-from app.services.google_sheets import GoogleSheetsService
-from app.models.item import Transaction, TransactionCreate, TransactionResponse
+from app.services.database import AsyncDatabase, ItemNotFoundError, InsufficientStockError
+from app.services.catalog_cache import catalog_cache
+from app.services.change_feed import change_feed
+from app.services.outbox import outbox_worker, EVENTO_SLACK_TRANSACAO, EVENTO_SHEETS_HISTORICO, EVENTO_SLACK_LOTE
+from app.models.item import (
+    TransactionCreate, TransactionResponse, TransactionBatchCreate, TransactionBatchResponse, BatchTransactionResult
+)
+from app.utils.pagination import encode_cursor, decode_cursor
 
 router = APIRouter()
-db = Database()
-slack_service = SlackService()
+db = AsyncDatabase()
 
 
 @router.post("/transactions", response_model=TransactionResponse)
@@ -22,119 +25,41 @@ async def create_transaction(transaction_data: TransactionCreate):
     Create a new transaction (retirada or devolucao)
     """
     try:
-        # Get item
-        item = db.get_item_by_id(transaction_data.item_id)
-        if not item:
-            raise HTTPException(status_code=404, detail="Item não encontrado")
+        timestamp = datetime.now()
         
-        # Calculate new quantities
-        if transaction_data.tipo == "retirada":
-            # Check if there's enough stock
-            if item['quantidade_disponivel'] < transaction_data.quantidade:
-                raise HTTPException(
-                    status_code=400,
-                    detail=f"Estoque insuficiente! Disponível: {item['quantidade_disponivel']} unidades"
-                )
-            new_disponivel = item['quantidade_disponivel'] - transaction_data.quantidade
-            new_em_uso = item['quantidade_em_uso'] + transaction_data.quantidade
-        else:  # devolucao
-            # Check if there are items in use to return
-            if item['quantidade_em_uso'] < transaction_data.quantidade:
-                raise HTTPException(
-                    status_code=400,
-                    detail=f"Quantidade inválida! Apenas {item['quantidade_em_uso']} unidades em uso"
-                )
-            new_disponivel = item['quantidade_disponivel'] + transaction_data.quantidade
-            new_em_uso = item['quantidade_em_uso'] - transaction_data.quantidade
-        
-        new_quantity = new_disponivel  # Para compatibilidade com código existente
-        
-        # Create transaction record
-        transaction = Transaction(
-            tipo=transaction_data.tipo,
-            item_id=transaction_data.item_id,
-            item_nome=item['nome'],
-            quantidade=transaction_data.quantidade,
-            nome_pessoa=transaction_data.nome_pessoa,
-            saldo_apos=new_quantity,
-            timestamp=datetime.now()
-        )
-        
-        transaction_id = db.create_transaction(transaction)
-        
-        # Update item quantities in database
-        conn = db.get_connection()
-        cursor = conn.cursor()
-        cursor.execute("""
-            UPDATE items 
-            SET quantidade_disponivel = ?,
-                quantidade_em_uso = ?,
-                updated_at = CURRENT_TIMESTAMP
-            WHERE id = ?
-        """, (new_disponivel, new_em_uso, transaction_data.item_id))
-        conn.commit()
-        conn.close()
-        
-        # Registrar em items_em_uso (opcional - apenas track de códigos)
-        if transaction_data.tipo == "retirada":
-            # Pegar códigos disponíveis
-            codigos = item.get('codigos_originais', '').split(',')
-            for i in range(transaction_data.quantidade):
-                if i < len(codigos):
-                    db.add_item_em_uso(transaction_data.item_id, codigos[i], transaction_data.nome_pessoa)
-        else:
-            # Remover de items_em_uso
-            db.remove_item_em_uso(transaction_data.item_id, transaction_data.nome_pessoa, transaction_data.quantidade)
-        
-        # Try to get Slack user ID from Google Sheets mapping
-        user_slack_id = None
+        # Saldo, histórico, items_em_uso e outbox numa única transação do banco
         try:
-            sheets_service = GoogleSheetsService()
-            user_mapping = sheets_service.get_slack_user_mapping()
-            user_slack_id = user_mapping.get(transaction_data.nome_pessoa.lower())
-            
-            # If not found in mapping, try to search Slack directly
-            if not user_slack_id:
-                user_slack_id = slack_service.find_user_by_name(transaction_data.nome_pessoa)
-        except Exception as e:
-            print(f"⚠️  Erro ao buscar usuário no Slack: {e}")
-        
-        # Send Slack notification
-        slack_notified = False
-        try:
-            slack_notified = await slack_service.send_transaction_notification(
+            result = await db.apply_stock_movement(
                 tipo=transaction_data.tipo,
-                item_nome=item['nome'],
+                item_id=transaction_data.item_id,
                 quantidade=transaction_data.quantidade,
                 nome_pessoa=transaction_data.nome_pessoa,
-                user_id=user_slack_id,
-                saldo_atual=new_quantity,
-                estoque_minimo=item['estoque_minimo']
+                timestamp=timestamp,
+                eventos=(EVENTO_SLACK_TRANSACAO, EVENTO_SHEETS_HISTORICO)
             )
-        except Exception as e:
-            print(f"⚠️  Erro ao enviar notificação ao Slack: {e}")
+        except ItemNotFoundError as e:
+            raise HTTPException(status_code=404, detail=str(e))
+        except InsufficientStockError as e:
+            raise HTTPException(status_code=400, detail=str(e))
         
-        # Update Google Sheets
-        try:
-            sheets_service = GoogleSheetsService()
-            await sheets_service.update_item_quantity(item['nome'], new_quantity)
-            await sheets_service.append_to_history({
-                'timestamp': transaction.timestamp.isoformat(),
-                'tipo': transaction_data.tipo,
-                'item_nome': item['nome'],
-                'quantidade': transaction_data.quantidade,
-                'nome_pessoa': transaction_data.nome_pessoa,
-                'saldo_apos': new_quantity
-            })
-        except Exception as e:
-            print(f"⚠️  Erro ao atualizar Google Sheets: {e}")
+        item = result['item']
+        transaction_id = result['transaction_id']
+        new_quantity = item['quantidade_disponivel']
+        
+        # Write-through no catálogo em memória (aplica o delta do feed)
+        await db.run(catalog_cache.refresh)
+        
+        # Slack e HISTÓRICO ficam no outbox (mesmo commit); entrega em segundo plano
+        outbox_worker.notify()
+        change_feed.notify()
         
         return TransactionResponse(
             success=True,
             message=f"{'Retirada' if transaction_data.tipo == 'retirada' else 'Devolução'} realizada com sucesso!",
             transaction_id=transaction_id,
             novo_saldo=new_quantity,
-            slack_notified=slack_notified
+            slack_notified=False,  # A notificação sai depois, pelo outbox
+            codigos=result['codigos']
         )
         
     except HTTPException:
@@ -144,22 +69,105 @@ async def create_transaction(transaction_data: TransactionCreate):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/transactions/batch", response_model=TransactionBatchResponse)
+async def create_transaction_batch(batch_data: TransactionBatchCreate):
+    """
+    Create several transactions for one person at once (all-or-nothing)
+    Um carrinho inteiro numa única transação do banco: se qualquer item
+    falhar, nada é aplicado. Gera uma mensagem no Slack para o lote e as
+    linhas do HISTÓRICO saem juntas num único append.
+    """
+    try:
+        timestamp = datetime.now()
+        
+        try:
+            results = await db.apply_stock_movements(
+                [movimento.model_dump() for movimento in batch_data.itens],
+                nome_pessoa=batch_data.nome_pessoa,
+                timestamp=timestamp,
+                eventos=(EVENTO_SHEETS_HISTORICO,),
+                eventos_lote=(EVENTO_SLACK_LOTE,)
+            )
+        except ItemNotFoundError as e:
+            raise HTTPException(status_code=404, detail=str(e))
+        except InsufficientStockError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        
+        # Write-through no catálogo em memória (uma ida ao pool para o lote)
+        await db.run(catalog_cache.refresh)
+        
+        outbox_worker.notify()
+        change_feed.notify()
+        
+        return TransactionBatchResponse(
+            success=True,
+            message=f"{len(results)} movimentações realizadas com sucesso!",
+            transactions=[
+                BatchTransactionResult(
+                    transaction_id=result['transaction_id'],
+                    tipo=movimento.tipo,
+                    item_id=movimento.item_id,
+                    item_nome=result['item']['nome'],
+                    quantidade=movimento.quantidade,
+                    novo_saldo=result['item']['quantidade_disponivel'],
+                    codigos=result['codigos']
+                )
+                for movimento, result in zip(batch_data.itens, results)
+            ],
+            slack_notified=False  # A notificação sai depois, pelo outbox
+        )
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Erro ao processar lote de transacoes: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+def _history_cursor(cursor: Optional[str]):
+    """Decode a history cursor into (timestamp, id)"""
+    try:
+        return decode_cursor(cursor, (str, int))  # (timestamp ISO, id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def _history_page(transactions: list, limit: int, response: Response) -> list:
+    """Trim the extra row fetched and set X-Next-Cursor if there is more"""
+    if len(transactions) > limit:
+        transactions = transactions[:limit]
+        last = transactions[-1]
+        response.headers["X-Next-Cursor"] = encode_cursor([last['timestamp'], last['id']])
+    return transactions
+
+
 @router.get("/history")
-async def get_history(limit: int = Query(50, ge=1, le=200)):
-    """Get transaction history"""
+async def get_history(
+    response: Response,
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = None
+):
+    """Get transaction history (keyset pagination via cursor / X-Next-Cursor)"""
+    after = _history_cursor(cursor)
     try:
-        transactions = db.get_transactions(limit)
-        return transactions
+        transactions = await db.get_transactions(limit + 1, after)
+        return _history_page(transactions, limit, response)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.get("/history/item/{item_id}")
-async def get_item_history(item_id: int, limit: int = Query(20, ge=1, le=100)):
-    """Get transaction history for a specific item"""
+async def get_item_history(
+    item_id: int,
+    response: Response,
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None
+):
+    """Get transaction history for a specific item (keyset pagination)"""
+    after = _history_cursor(cursor)
     try:
-        transactions = db.get_transactions_by_item(item_id, limit)
-        return transactions
+        transactions = await db.get_transactions_by_item(item_id, limit + 1, after)
+        return _history_page(transactions, limit, response)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -168,7 +176,7 @@ async def get_item_history(item_id: int, limit: int = Query(20, ge=1, le=100)):
 async def get_items_em_uso():
     """Get all items currently in use"""
     try:
-        items = db.get_items_em_uso()
+        items = await db.get_items_em_uso()
         return items
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -178,7 +186,7 @@ async def get_items_em_uso():
 async def get_item_em_uso(item_id: int):
     """Get items in use for a specific item"""
     try:
-        items = db.get_items_em_uso_by_item(item_id)
+        items = await db.get_items_em_uso_by_item(item_id)
         return items
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
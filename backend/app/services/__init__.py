@@ -1,8 +1,33 @@
 """Services Package"""
 
-from .database import Database
+from .database import Database, AsyncDatabase, StockError, ItemNotFoundError, InsufficientStockError
+from .catalog_cache import CatalogCache, CatalogSnapshot, catalog_cache
+from .change_feed import ChangeFeed, change_feed
+from .sheets_client import SheetsClient, sheets_client
 from .google_sheets import GoogleSheetsService
+from .sync_scheduler import SyncScheduler, SyncTimeoutError, sync_scheduler
 from .slack_service import SlackService
+from .slack_user_cache import SlackUserMappingCache, slack_user_cache
 
-__all__ = ["Database", "GoogleSheetsService", "SlackService"]
+__all__ = [
+    "Database",
+    "AsyncDatabase",
+    "StockError",
+    "ItemNotFoundError",
+    "InsufficientStockError",
+    "CatalogCache",
+    "CatalogSnapshot",
+    "catalog_cache",
+    "ChangeFeed",
+    "change_feed",
+    "SheetsClient",
+    "sheets_client",
+    "GoogleSheetsService",
+    "SyncScheduler",
+    "SyncTimeoutError",
+    "sync_scheduler",
+    "SlackService",
+    "SlackUserMappingCache",
+    "slack_user_cache",
+]
 
@@ -0,0 +1,161 @@
+"""
+Catalog Cache Service
+In-memory copy of the items catalog served by /api/items
+"""
+
+import bisect
+import json
+import os
+import threading
+from typing import Dict, List, Optional, Tuple
+from app.models.item import Item
+from app.services.database import Database
+
+# Campos expostos pela API (mesmos do response_model Item)
+ITEM_FIELDS = tuple(Item.model_fields.keys())
+
+# Acima disso uma atualização relê o catálogo inteiro em vez de aplicar o delta
+PATCH_MAX_CHANGES = 500
+
+
+def serialize_item(item: dict) -> bytes:
+    """Serialize an item row exactly as the API returns it"""
+    payload = {field: item.get(field) for field in ITEM_FIELDS}
+    return json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class CatalogSnapshot:
+    """
+    Immutable view of the catalog at one change sequence
+    Nunca é alterado depois de criado: quem já pegou a referência lê sem
+    lock, mesmo enquanto outra thread monta o próximo snapshot.
+    """
+
+    def __init__(self, epoch: str, seq: int, items: Dict[int, dict], fragments: Dict[int, bytes], keys: List[Tuple[str, int]]):
+        self.epoch = epoch
+        self.seq = seq
+        self.items = items
+        self.fragments = fragments
+        self.keys = keys  # (nome, id) em ordem
+        self.etag = f'"c-{epoch}-{seq}"'
+        self._body: Optional[bytes] = None
+
+    def get_body(self) -> Tuple[bytes, str]:
+        """Get (json_body, etag) of the full catalog"""
+        if self._body is None:
+            self._body = b"[" + b",".join(self.fragments[key[1]] for key in self.keys) + b"]"
+        return self._body, self.etag
+
+    def get_page(
+        self,
+        limit: int,
+        after: Optional[Tuple[str, int]] = None
+    ) -> Tuple[bytes, Optional[Tuple[str, int]]]:
+        """
+        Get one page of the catalog ordered by (nome, id)
+        Retorna (json_body, chave da última linha ou None se acabou).
+        Busca binária na chave: custo igual na primeira ou na milésima página.
+        """
+        start = bisect.bisect_right(self.keys, tuple(after)) if after else 0
+        end = min(start + limit, len(self.keys))
+        body = b"[" + b",".join(self.fragments[key[1]] for key in self.keys[start:end]) + b"]"
+        next_key = self.keys[end - 1] if end < len(self.keys) else None
+        return body, next_key
+
+    def get_item(self, item_id: int) -> Optional[Tuple[bytes, str]]:
+        """Get (json_body, etag) of one item, or None if it does not exist"""
+        item = self.items.get(item_id)
+        if item is None:
+            return None
+        return self.fragments[item_id], f'"i-{self.epoch}-{item_id}-{item["change_seq"]}"'
+
+
+class CatalogCache:
+    """
+    Process-wide item catalog cache
+    O catálogo fica num CatalogSnapshot marcado com o seq do feed de
+    mudanças (item_change_counter). Quando o seq do banco anda, refresh()
+    aplica o delta de get_item_changes num snapshot novo e troca a
+    referência, então qualquer escrita no items (rotas, sync, import_xlsx
+    com o servidor no ar) chega ao cache e às ETags.
+    """
+
+    def __init__(self, db_path: Optional[str] = None):
+        self.db_path = db_path
+        self._lock = threading.Lock()  # Só entre quem atualiza; leitores não esperam
+        self._epoch = os.urandom(4).hex()  # ETags não colidem entre reinícios
+        self._snapshot: Optional[CatalogSnapshot] = None
+
+    def current(self, seq: Optional[int] = None) -> Optional[CatalogSnapshot]:
+        """
+        The loaded snapshot, without touching the database
+        Com `seq` (o último visto pelo feed), só devolve o snapshot se ele
+        estiver nessa versão; None quer dizer: chame refresh().
+        """
+        snapshot = self._snapshot
+        if snapshot is None or (seq is not None and snapshot.seq != seq):
+            return None
+        return snapshot
+
+    def invalidate(self):
+        """Drop the whole catalog (after a sync); next read reloads it"""
+        with self._lock:
+            self._snapshot = None
+
+    def refresh(self) -> CatalogSnapshot:
+        """
+        Bring the catalog up to the database's change sequence (blocking)
+        Relê só os itens alterados desde o seq do snapshot atual; carrega
+        tudo quando não há snapshot, quando o delta é grande ou quando o
+        banco voltou atrás (recriado).
+        """
+        with self._lock:
+            db = Database(self.db_path)
+            snapshot = self._snapshot
+            if snapshot is not None:
+                changes = db.get_item_changes(snapshot.seq, PATCH_MAX_CHANGES)
+                if changes['seq'] == snapshot.seq:
+                    return snapshot
+                if changes['seq'] > snapshot.seq and not changes['has_more']:
+                    snapshot = self._patch(snapshot, changes)
+                else:
+                    snapshot = self._load(db)
+            else:
+                snapshot = self._load(db)
+            self._snapshot = snapshot
+            return snapshot
+
+    def _load(self, db: Database) -> CatalogSnapshot:
+        """Read the full catalog and its sequence in one database snapshot"""
+        with db.transaction(immediate=False):
+            seq = db.get_change_seq()
+            rows = db.get_all_items()  # já vem ordenado por (nome, id)
+        return CatalogSnapshot(
+            self._epoch,
+            seq,
+            {row['id']: row for row in rows},
+            {row['id']: serialize_item(row) for row in rows},
+            [(row['nome'], row['id']) for row in rows]
+        )
+
+    def _patch(self, snapshot: CatalogSnapshot, changes: dict) -> CatalogSnapshot:
+        """New snapshot with the changed and removed items applied"""
+        items = dict(snapshot.items)
+        fragments = dict(snapshot.fragments)
+        reordenar = bool(changes['removidos'])
+        for item in changes['items']:
+            anterior = items.get(item['id'])
+            if anterior is None or anterior['nome'] != item['nome']:
+                reordenar = True  # Item novo ou renomeado
+            items[item['id']] = item
+            fragments[item['id']] = serialize_item(item)
+        for item_id in changes['removidos']:
+            items.pop(item_id, None)
+            fragments.pop(item_id, None)
+
+        keys = sorted((item['nome'], item_id) for item_id, item in items.items()) if reordenar else snapshot.keys
+        return CatalogSnapshot(self._epoch, changes['seq'], items, fragments, keys)
+
+
+# Instância compartilhada pela aplicação
+catalog_cache = CatalogCache()
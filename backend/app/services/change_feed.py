@@ -0,0 +1,98 @@
+"""
+Change Feed Service
+Wakes up /api/items/stream listeners when the items change sequence moves
+"""
+
+import asyncio
+from typing import Optional
+from app.config import settings
+from app.services.database import AsyncDatabase
+
+
+class ChangeFeed:
+    """
+    Tracks item_change_counter and broadcasts each new value
+    Quem grava no processo chama notify() (pode ser de outra thread, como o
+    sync); escritas de outros processos (import_xlsx) são pegas pela
+    consulta periódica a cada CHANGE_FEED_POLL_SECONDS.
+    """
+
+    def __init__(self, db: Optional[AsyncDatabase] = None):
+        self.db = db or AsyncDatabase()
+        self.seq = 0
+        self.closed = False
+        self._changed: Optional[asyncio.Event] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        """Start watching the sequence on the running event loop"""
+        if self._task is not None and not self._task.done():
+            return
+        self.closed = False
+        self._loop = asyncio.get_running_loop()
+        self._changed = asyncio.Event()
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run(), name="change-feed")
+
+    async def stop(self):
+        """Stop watching and release every waiting stream"""
+        self.closed = True
+        if self._changed is not None:
+            self._changed.set()
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def notify(self):
+        """Something was committed: check the sequence now (thread-safe)"""
+        loop = self._loop
+        if loop is None or loop.is_closed() or self._wakeup is None:
+            return
+        try:
+            loop.call_soon_threadsafe(self._wakeup.set)
+        except RuntimeError:
+            pass  # Loop encerrando
+
+    async def _run(self):
+        while True:
+            self._wakeup.clear()
+            try:
+                seq = await self.db.get_change_seq()
+                if seq != self.seq:
+                    self.seq = seq
+                    # Acorda todos os que esperam e arma o próximo evento
+                    changed, self._changed = self._changed, asyncio.Event()
+                    changed.set()
+            except Exception as e:
+                print(f"⚠️  Erro ao consultar o feed de mudanças: {e}")
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=settings.CHANGE_FEED_POLL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+
+    async def wait(self, since: int, timeout: float) -> bool:
+        """
+        Wait until the sequence passes `since` (True) or the timeout (False)
+        Sem o feed rodando (testes, scripts) só espera o timeout.
+        """
+        if self.seq > since:
+            return True
+        if self.closed or self._changed is None:
+            await asyncio.sleep(timeout)
+            return False
+        try:
+            await asyncio.wait_for(self._changed.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            return False
+        return not self.closed
+
+
+# Instância compartilhada pela aplicação
+change_feed = ChangeFeed()
@@ -3,29 +3,155 @@ Database Service
 SQLite database operations
 """
 
+import asyncio
+import json
+import re
 import sqlite3
-from typing import List, Optional, Dict, Any
+import threading
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import partial
+from typing import List, Optional, Dict, Any, Sequence, Tuple
 from datetime import datetime
 from app.config import settings
 from app.models.item import Item, Transaction
 
 
-class Database:
-    """Database handler for SQLite operations"""
+# Evento do outbox gravado pelo trigger de estoque mínimo (entregue em app.services.outbox)
+EVENTO_ALERTA_ESTOQUE = "alerta_estoque"
+
+
+class StockError(Exception):
+    """Stock movement rejected by the database"""
+
+
+class ItemNotFoundError(StockError):
+    """Item does not exist"""
+
+
+class InsufficientStockError(StockError):
+    """Not enough available (or in-use) units for the movement"""
+
+
+def split_codigos(codigos_originais: Optional[str]) -> List[str]:
+    """Split the comma-joined codigos_originais column"""
+    return [c.strip() for c in (codigos_originais or '').split(',') if c.strip()]
+
+
+def _close_connections(connections: Dict[str, sqlite3.Connection]):
+    """Close and forget a set of connections"""
+    for conn in list(connections.values()):
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+    connections.clear()
+
+
+class _ThreadConnections:
+    """
+    Connections opened by one thread, keyed by database path
+    Fica só no thread-local da thread dona: quando a thread termina o
+    objeto é descartado e o finalizer fecha as conexões, então threads de
+    vida curta não deixam conexões nem descritores abertos.
+    """
     
     def __init__(self):
-        self.db_path = settings.DATABASE_PATH
+        self.connections: Dict[str, sqlite3.Connection] = {}
+        self.close = weakref.finalize(self, _close_connections, self.connections)
+
+
+class Database:
+    """Database handler for SQLite operations
+    
+    Cada thread mantém uma conexão persistente por arquivo de banco,
+    aberta uma única vez com WAL e pragmas ajustados e fechada quando a
+    thread termina. Todas as instâncias de Database compartilham essas
+    conexões.
+    """
+    
+    _local = threading.local()
+    _registry_lock = threading.Lock()
+    _threads: "weakref.WeakSet[_ThreadConnections]" = weakref.WeakSet()
+    _fts_enabled: Dict[str, bool] = {}
     
-    def get_connection(self):
-        """Get database connection"""
-        conn = sqlite3.connect(self.db_path)
+    def __init__(self, db_path: Optional[str] = None):
+        self.db_path = db_path or settings.DATABASE_PATH
+    
+    def _open_connection(self) -> sqlite3.Connection:
+        """Open a new connection with the tuned pragmas"""
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=settings.DATABASE_BUSY_TIMEOUT_MS / 1000,
+            isolation_level=None,  # Transações explícitas via transaction()
+            check_same_thread=False  # Só a thread dona usa; fechada no fim da thread ou no close_all()
+        )
         conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(f"PRAGMA busy_timeout={int(settings.DATABASE_BUSY_TIMEOUT_MS)}")
+        conn.execute(f"PRAGMA cache_size=-{int(settings.DATABASE_CACHE_SIZE_KB)}")
+        conn.execute(f"PRAGMA mmap_size={int(settings.DATABASE_MMAP_SIZE)}")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        return conn
+    
+    def get_connection(self) -> sqlite3.Connection:
+        """Get this thread's persistent database connection"""
+        thread = getattr(self._local, 'thread', None)
+        if thread is None:
+            thread = self._local.thread = _ThreadConnections()
+            with self._registry_lock:
+                self._threads.add(thread)
+        
+        conn = thread.connections.get(self.db_path)
+        if conn is None:
+            conn = self._open_connection()
+            thread.connections[self.db_path] = conn
         return conn
     
+    @contextmanager
+    def transaction(self, immediate: bool = True):
+        """
+        Run a block inside a single database transaction
+        Commit no sucesso, rollback em qualquer exceção
+        """
+        conn = self.get_connection()
+        conn.execute("BEGIN IMMEDIATE" if immediate else "BEGIN")
+        try:
+            yield conn
+        except BaseException:
+            conn.rollback()
+            raise
+        else:
+            conn.commit()
+    
+    @classmethod
+    def close_all(cls):
+        """Close every pooled connection (application shutdown)"""
+        with cls._registry_lock:
+            threads = list(cls._threads)
+            cls._threads.clear()
+        
+        for thread in threads:
+            thread.close()
+        cls._local = threading.local()
+    
     def init_db(self):
         """Initialize database tables"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
+        with self.transaction() as conn:
+            self._create_schema(conn.cursor())
+            self._create_units_table(conn.cursor())
+            self._create_outbox_table(conn.cursor())
+            self._create_sync_state_table(conn.cursor())
+            self._create_change_feed(conn.cursor())
+            self._create_stats_table(conn.cursor())
+            self._create_stock_alerts(conn.cursor())
+            self._fts_enabled[self.db_path] = self._create_search_index(conn.cursor())
+    
+    def _create_schema(self, cursor: sqlite3.Cursor):
+        """Create tables and indexes"""
         
         # Items table (versão agregada do 5S)
         cursor.execute("""
@@ -76,237 +202,1175 @@ class Database:
         # Create indexes
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_items_nome ON items(nome)")
         cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_items_nome_aba ON items(nome, aba_origem)")
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_transactions_timestamp ON transactions(timestamp DESC)")
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_transactions_item ON transactions(item_id)")
+        # Índices compostos para paginação keyset em (timestamp, id)
+        cursor.execute("DROP INDEX IF EXISTS idx_transactions_timestamp")
+        cursor.execute("DROP INDEX IF EXISTS idx_transactions_item")
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_transactions_timestamp_id
+            ON transactions(timestamp DESC, id DESC)
+        """)
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_transactions_item_timestamp_id
+            ON transactions(item_id, timestamp DESC, id DESC)
+        """)
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_items_em_uso_item ON items_em_uso(item_id)")
         
-        conn.commit()
-        conn.close()
+        # Cópia local do mapeamento nome → Slack (aba PESSOAS)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS slack_user_mapping (
+                nome TEXT PRIMARY KEY,
+                slack_user TEXT NOT NULL,
+                updated_at REAL NOT NULL
+            )
+        """)
+    
+    def _create_units_table(self, cursor: sqlite3.Cursor):
+        """
+        Create item_units: one row per 5S unit code and its status
+        Bancos antigos são preenchidos a partir de codigos_originais e items_em_uso
+        """
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'item_units'")
+        exists = cursor.fetchone() is not None
+        
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS item_units (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                item_id INTEGER NOT NULL,
+                codigo TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'disponivel',  -- 'disponivel' | 'em_uso'
+                nome_pessoa TEXT,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY (item_id) REFERENCES items (id),
+                UNIQUE (item_id, codigo)
+            )
+        """)
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_item_units_codigo ON item_units(codigo)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_item_units_item_status ON item_units(item_id, status)")
+        
+        if exists:
+            return
+        
+        cursor.execute("SELECT id, codigos_originais FROM items WHERE codigos_originais IS NOT NULL")
+        cursor.executemany(
+            "INSERT OR IGNORE INTO item_units (item_id, codigo) VALUES (?, ?)",
+            [(row['id'], codigo) for row in cursor.fetchall() for codigo in split_codigos(row['codigos_originais'])]
+        )
+        cursor.execute("""
+            UPDATE item_units
+            SET status = 'em_uso',
+                nome_pessoa = (
+                    SELECT ieu.nome_pessoa FROM items_em_uso ieu
+                    WHERE ieu.item_id = item_units.item_id AND ieu.codigo_original = item_units.codigo
+                    LIMIT 1
+                )
+            WHERE EXISTS (
+                SELECT 1 FROM items_em_uso ieu
+                WHERE ieu.item_id = item_units.item_id AND ieu.codigo_original = item_units.codigo
+            )
+        """)
+    
+    def _create_outbox_table(self, cursor: sqlite3.Cursor):
+        """
+        Create the outbox of pending side effects (Slack, Sheets)
+        Gravado no mesmo commit da movimentação e consumido pelo OutboxWorker
+        """
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS outbox (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                evento TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pendente',  -- 'pendente' | 'falhou'
+                tentativas INTEGER NOT NULL DEFAULT 0,
+                proxima_tentativa REAL NOT NULL,  -- epoch em segundos
+                ultimo_erro TEXT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_outbox_pendente ON outbox(status, proxima_tentativa)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_outbox_evento ON outbox(evento, status, id)")
+    
+    def _create_sync_state_table(self, cursor: sqlite3.Cursor):
+        """
+        Create the per-worksheet snapshot used by the incremental sync
+        grupos guarda {nome: hash das linhas do grupo} da última leitura
+        """
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS sheet_snapshots (
+                aba TEXT PRIMARY KEY,
+                fingerprint TEXT NOT NULL,
+                grupos TEXT NOT NULL,  -- JSON {nome: hash}
+                linhas INTEGER NOT NULL DEFAULT 0,
+                modified_time TEXT,  -- modifiedTime da planilha no Drive
+                updated_at REAL NOT NULL
+            )
+        """)
+    
+    def _create_change_feed(self, cursor: sqlite3.Cursor):
+        """
+        Create the items change sequence, kept by triggers
+        Toda inserção/alteração de item (movimentação ou sync) recebe o
+        próximo número de item_change_counter em items.change_seq; itens
+        apagados ficam em items_removidos com o número da remoção. Assim
+        /api/items/changes?since=N devolve só o que mudou depois de N.
+        """
+        colunas = {row[1] for row in cursor.execute("PRAGMA table_info(items)")}
+        if 'change_seq' not in colunas:
+            cursor.execute("ALTER TABLE items ADD COLUMN change_seq INTEGER NOT NULL DEFAULT 0")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_items_change_seq ON items(change_seq)")
+        
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS item_change_counter (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                seq INTEGER NOT NULL
+            )
+        """)
+        cursor.execute("INSERT OR IGNORE INTO item_change_counter (id, seq) VALUES (1, 0)")
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS items_removidos (
+                item_id INTEGER PRIMARY KEY,
+                change_seq INTEGER NOT NULL
+            )
+        """)
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_items_removidos_seq ON items_removidos(change_seq)")
+        
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS items_seq_ai AFTER INSERT ON items BEGIN
+                UPDATE item_change_counter SET seq = seq + 1 WHERE id = 1;
+                UPDATE items SET change_seq = (SELECT seq FROM item_change_counter WHERE id = 1)
+                WHERE id = new.id;
+            END
+        """)
+        # Sem change_seq na lista: o UPDATE do próprio trigger não dispara outro
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS items_seq_au
+            AFTER UPDATE OF nome, categoria, localizacao, quantidade_total, quantidade_disponivel,
+                quantidade_em_uso, estoque_minimo, codigos_originais, aba_origem ON items BEGIN
+                UPDATE item_change_counter SET seq = seq + 1 WHERE id = 1;
+                UPDATE items SET change_seq = (SELECT seq FROM item_change_counter WHERE id = 1)
+                WHERE id = new.id;
+            END
+        """)
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS items_seq_ad AFTER DELETE ON items BEGIN
+                UPDATE item_change_counter SET seq = seq + 1 WHERE id = 1;
+                INSERT OR REPLACE INTO items_removidos (item_id, change_seq)
+                VALUES (old.id, (SELECT seq FROM item_change_counter WHERE id = 1));
+            END
+        """)
+    
+    def _create_stats_table(self, cursor: sqlite3.Cursor):
+        """
+        Create the per (aba_origem, categoria) aggregates, kept by triggers
+        Cada INSERT/UPDATE/DELETE em items ajusta a linha do seu grupo no
+        mesmo commit (movimentação, sync ou import), então o /api/stats lê
+        algumas linhas em vez de varrer o catálogo. Sem aba/categoria o
+        grupo usa ''.
+        """
+        existia = cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'item_stats'"
+        ).fetchone()
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS item_stats (
+                aba_origem TEXT NOT NULL,
+                categoria TEXT NOT NULL,
+                itens INTEGER NOT NULL DEFAULT 0,
+                quantidade_total INTEGER NOT NULL DEFAULT 0,
+                quantidade_disponivel INTEGER NOT NULL DEFAULT 0,
+                quantidade_em_uso INTEGER NOT NULL DEFAULT 0,
+                abaixo_minimo INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (aba_origem, categoria)
+            )
+        """)
+        
+        def somar(row: str) -> str:
+            return f"""
+                INSERT INTO item_stats (aba_origem, categoria, itens, quantidade_total,
+                    quantidade_disponivel, quantidade_em_uso, abaixo_minimo)
+                VALUES (COALESCE({row}.aba_origem, ''), COALESCE({row}.categoria, ''), 1,
+                    {row}.quantidade_total, {row}.quantidade_disponivel, {row}.quantidade_em_uso,
+                    {row}.quantidade_disponivel < {row}.estoque_minimo)
+                ON CONFLICT (aba_origem, categoria) DO UPDATE SET
+                    itens = itens + 1,
+                    quantidade_total = quantidade_total + excluded.quantidade_total,
+                    quantidade_disponivel = quantidade_disponivel + excluded.quantidade_disponivel,
+                    quantidade_em_uso = quantidade_em_uso + excluded.quantidade_em_uso,
+                    abaixo_minimo = abaixo_minimo + excluded.abaixo_minimo;
+            """
+        
+        def subtrair(row: str) -> str:
+            grupo = f"aba_origem = COALESCE({row}.aba_origem, '') AND categoria = COALESCE({row}.categoria, '')"
+            return f"""
+                UPDATE item_stats SET
+                    itens = itens - 1,
+                    quantidade_total = quantidade_total - {row}.quantidade_total,
+                    quantidade_disponivel = quantidade_disponivel - {row}.quantidade_disponivel,
+                    quantidade_em_uso = quantidade_em_uso - {row}.quantidade_em_uso,
+                    abaixo_minimo = abaixo_minimo - ({row}.quantidade_disponivel < {row}.estoque_minimo)
+                WHERE {grupo};
+            """, f"DELETE FROM item_stats WHERE {grupo} AND itens = 0;"
+        
+        menos_old, vazio_old = subtrair("old")
+        cursor.execute(f"CREATE TRIGGER IF NOT EXISTS items_stats_ai AFTER INSERT ON items BEGIN {somar('new')} END")
+        cursor.execute(f"CREATE TRIGGER IF NOT EXISTS items_stats_ad AFTER DELETE ON items BEGIN {menos_old} {vazio_old} END")
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS items_stats_au
+            AFTER UPDATE OF categoria, aba_origem, quantidade_total, quantidade_disponivel,
+                quantidade_em_uso, estoque_minimo ON items BEGIN
+                {menos_old} {somar('new')} {vazio_old}
+            END
+        """)
+        
+        if not existia:
+            # Banco anterior aos agregados: calcula uma vez a partir dos itens
+            self._rebuild_item_stats(cursor)
+    
+    @staticmethod
+    def _rebuild_item_stats(cursor):
+        """Recompute item_stats from scratch (first run / consistency check)"""
+        cursor.execute("DELETE FROM item_stats")
+        cursor.execute("""
+            INSERT INTO item_stats (aba_origem, categoria, itens, quantidade_total,
+                quantidade_disponivel, quantidade_em_uso, abaixo_minimo)
+            SELECT COALESCE(aba_origem, ''), COALESCE(categoria, ''), COUNT(*),
+                SUM(quantidade_total), SUM(quantidade_disponivel), SUM(quantidade_em_uso),
+                SUM(quantidade_disponivel < estoque_minimo)
+            FROM items
+            GROUP BY COALESCE(aba_origem, ''), COALESCE(categoria, '')
+        """)
+    
+    def _create_stock_alerts(self, cursor: sqlite3.Cursor):
+        """
+        Create the low-stock alert state, kept by triggers
+        Só quando um UPDATE faz o item cruzar o estoque_minimo (para baixo ou
+        de volta) o trigger grava a transição em estoque_alertas e põe uma
+        entrada no outbox, no mesmo commit; movimentações que não cruzam o
+        limite não escrevem nada. notificado_abaixo guarda o último lado
+        avisado no Slack, para o OutboxWorker descartar idas e voltas.
+        Item que já nasce abaixo do mínimo (import/sync) entra como avisado:
+        o retrato inicial da planilha não vira alerta, só a volta ao normal.
+        """
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS estoque_alertas (
+                item_id INTEGER PRIMARY KEY,
+                abaixo INTEGER NOT NULL,  -- quantidade_disponivel < estoque_minimo
+                transicoes INTEGER NOT NULL DEFAULT 0,
+                mudou_em REAL NOT NULL,  -- epoch da última transição
+                notificado_abaixo INTEGER NOT NULL DEFAULT 0,
+                notificado_em REAL
+            )
+        """)
+        
+        agora = "((julianday('now') - 2440587.5) * 86400.0)"
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS items_alerta_au
+            AFTER UPDATE OF quantidade_disponivel, estoque_minimo ON items
+            WHEN (old.quantidade_disponivel < old.estoque_minimo) <> (new.quantidade_disponivel < new.estoque_minimo)
+            BEGIN
+                INSERT INTO estoque_alertas (item_id, abaixo, transicoes, mudou_em)
+                VALUES (new.id, new.quantidade_disponivel < new.estoque_minimo, 1, {agora})
+                ON CONFLICT (item_id) DO UPDATE SET
+                    abaixo = excluded.abaixo,
+                    transicoes = transicoes + 1,
+                    mudou_em = excluded.mudou_em;
+                INSERT INTO outbox (evento, payload, proxima_tentativa)
+                VALUES ('{EVENTO_ALERTA_ESTOQUE}', json_object('item_id', new.id), {agora});
+            END
+        """)
+        # Item novo acima do mínimo não precisa de linha: sem estado = não está abaixo.
+        # Abaixo dele, o estado nasce já avisado e sem entrada no outbox (a
+        # versão anterior do trigger avisava cada item novo)
+        cursor.execute("DROP TRIGGER IF EXISTS items_alerta_ai")
+        cursor.execute(f"""
+            CREATE TRIGGER items_alerta_ai
+            AFTER INSERT ON items
+            WHEN new.quantidade_disponivel < new.estoque_minimo
+            BEGIN
+                INSERT INTO estoque_alertas (item_id, abaixo, mudou_em, notificado_abaixo)
+                VALUES (new.id, 1, {agora}, 1)
+                ON CONFLICT (item_id) DO UPDATE SET
+                    abaixo = 1,
+                    mudou_em = excluded.mudou_em,
+                    notificado_abaixo = 1;
+            END
+        """)
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS items_alerta_ad AFTER DELETE ON items BEGIN
+                DELETE FROM estoque_alertas WHERE item_id = old.id;
+            END
+        """)
+    
+    def _create_search_index(self, cursor: sqlite3.Cursor) -> bool:
+        """
+        Create the FTS5 search index over items, kept in sync by triggers
+        Retorna False se o SQLite não tiver FTS5 (busca cai no LIKE)
+        """
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'items_fts'")
+        exists = cursor.fetchone() is not None
+        
+        try:
+            # remove_diacritics: "Mecanica" encontra "Mecânica"
+            cursor.execute("""
+                CREATE VIRTUAL TABLE IF NOT EXISTS items_fts USING fts5(
+                    nome, codigos_originais, categoria, localizacao,
+                    content='items', content_rowid='id',
+                    tokenize='unicode61 remove_diacritics 2',
+                    prefix='2 3'
+                )
+            """)
+        except sqlite3.OperationalError as e:
+            print(f"FTS5 indisponivel, busca usara LIKE: {e}")
+            return False
+        
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS items_fts_ai AFTER INSERT ON items BEGIN
+                INSERT INTO items_fts (rowid, nome, codigos_originais, categoria, localizacao)
+                VALUES (new.id, new.nome, new.codigos_originais, new.categoria, new.localizacao);
+            END
+        """)
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS items_fts_ad AFTER DELETE ON items BEGIN
+                INSERT INTO items_fts (items_fts, rowid, nome, codigos_originais, categoria, localizacao)
+                VALUES ('delete', old.id, old.nome, old.codigos_originais, old.categoria, old.localizacao);
+            END
+        """)
+        # Só colunas indexadas: movimentações de estoque não tocam o índice
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS items_fts_au
+            AFTER UPDATE OF nome, codigos_originais, categoria, localizacao ON items BEGIN
+                INSERT INTO items_fts (items_fts, rowid, nome, codigos_originais, categoria, localizacao)
+                VALUES ('delete', old.id, old.nome, old.codigos_originais, old.categoria, old.localizacao);
+                INSERT INTO items_fts (rowid, nome, codigos_originais, categoria, localizacao)
+                VALUES (new.id, new.nome, new.codigos_originais, new.categoria, new.localizacao);
+            END
+        """)
+        
+        if not exists:
+            # Banco já existente: indexa os itens atuais
+            cursor.execute("INSERT INTO items_fts (items_fts) VALUES ('rebuild')")
+        return True
     
     # ITEMS OPERATIONS
     
     def get_all_items(self) -> List[Dict[str, Any]]:
         """Get all items"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM items ORDER BY nome")
-        items = [dict(row) for row in cursor.fetchall()]
-        conn.close()
-        return items
+        cursor = self.get_connection().execute("SELECT * FROM items ORDER BY nome, id")
+        return [dict(row) for row in cursor.fetchall()]
+    
+    def count_items(self) -> int:
+        """Number of items in the local catalog"""
+        return self.get_connection().execute("SELECT COUNT(*) FROM items").fetchone()[0]
+    
+    def get_change_seq(self) -> int:
+        """Current value of the items change sequence"""
+        return self.get_connection().execute(
+            "SELECT seq FROM item_change_counter WHERE id = 1"
+        ).fetchone()[0]
+
+    def get_item_stats(self) -> Dict[str, Any]:
+        """
+        Get the dashboard aggregates: {'seq', 'grupos': [...]}
+        Lê só item_stats (uma linha por aba/categoria), no mesmo snapshot
+        do change_seq, então o custo não cresce com o catálogo.
+        """
+        with self.transaction(immediate=False) as conn:
+            seq = conn.execute("SELECT seq FROM item_change_counter WHERE id = 1").fetchone()[0]
+            grupos = [dict(row) for row in conn.execute("""
+                SELECT aba_origem, categoria, itens, quantidade_total, quantidade_disponivel,
+                    quantidade_em_uso, abaixo_minimo
+                FROM item_stats
+                ORDER BY aba_origem, categoria
+            """)]
+        return {'seq': seq, 'grupos': grupos}
+
+    def get_item_changes(self, since: int, limit: int = 500) -> Dict[str, Any]:
+        """
+        Items changed and removed after change sequence `since`
+        Retorna {'seq', 'items', 'removidos', 'has_more'}; o cliente guarda
+        'seq' e pede de novo a partir dele. Com has_more, 'seq' é o da
+        última mudança devolvida (as seguintes vêm no próximo pedido).
+        """
+        # Leitura num único snapshot: contador e linhas consistentes
+        with self.transaction(immediate=False) as conn:
+            seq = conn.execute("SELECT seq FROM item_change_counter WHERE id = 1").fetchone()[0]
+            items = [dict(row) for row in conn.execute(
+                "SELECT * FROM items WHERE change_seq > ? ORDER BY change_seq LIMIT ?",
+                (since, limit + 1)
+            )]
+            removidos = [dict(row) for row in conn.execute(
+                "SELECT item_id, change_seq FROM items_removidos WHERE change_seq > ? ORDER BY change_seq LIMIT ?",
+                (since, limit + 1)
+            )]
+        
+        mudancas = sorted(
+            [(item['change_seq'], 'item', item) for item in items] +
+            [(removido['change_seq'], 'removido', removido['item_id']) for removido in removidos],
+            key=lambda mudanca: mudanca[0]
+        )
+        has_more = len(mudancas) > limit
+        if has_more:
+            mudancas = mudancas[:limit]
+            seq = mudancas[-1][0]
+        return {
+            'seq': seq,
+            'items': [valor for _, tipo, valor in mudancas if tipo == 'item'],
+            'removidos': [valor for _, tipo, valor in mudancas if tipo == 'removido'],
+            'has_more': has_more
+        }
     
     def get_item_by_id(self, item_id: int) -> Optional[Dict[str, Any]]:
         """Get item by ID"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM items WHERE id = ?", (item_id,))
+        cursor = self.get_connection().execute("SELECT * FROM items WHERE id = ?", (item_id,))
         row = cursor.fetchone()
-        conn.close()
         return dict(row) if row else None
     
     def get_item_by_name(self, nome: str) -> Optional[Dict[str, Any]]:
         """Get item by name"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM items WHERE nome = ?", (nome,))
+        cursor = self.get_connection().execute("SELECT * FROM items WHERE nome = ?", (nome,))
         row = cursor.fetchone()
-        conn.close()
         return dict(row) if row else None
     
     def get_item_by_name_and_aba(self, nome: str, aba_origem: str) -> Optional[Dict[str, Any]]:
         """Get item by name and aba_origem"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM items WHERE nome = ? AND aba_origem = ?", (nome, aba_origem))
+        cursor = self.get_connection().execute(
+            "SELECT * FROM items WHERE nome = ? AND aba_origem = ?", (nome, aba_origem)
+        )
         row = cursor.fetchone()
-        conn.close()
         return dict(row) if row else None
     
-    def search_items(self, query: str) -> List[Dict[str, Any]]:
-        """Search items by name"""
+    def get_items_by_key(
+        self,
+        chaves: Optional[Sequence[Tuple[str, str]]] = None
+    ) -> Dict[Tuple[str, str], Dict[str, Any]]:
+        """
+        Get items indexed by (nome, aba_origem)
+        Sem chaves carrega todos; com chaves busca só essas pelo índice único
+        """
         conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute(
-            "SELECT * FROM items WHERE nome LIKE ? ORDER BY nome LIMIT 20",
-            (f"%{query}%",)
-        )
-        items = [dict(row) for row in cursor.fetchall()]
-        conn.close()
-        return items
+        if chaves is None:
+            rows = conn.execute("SELECT * FROM items").fetchall()
+        else:
+            rows = []
+            for nome, aba_origem in chaves:
+                row = conn.execute(
+                    "SELECT * FROM items WHERE nome = ? AND aba_origem = ?", (nome, aba_origem)
+                ).fetchone()
+                if row:
+                    rows.append(row)
+        return {(row['nome'], row['aba_origem']): dict(row) for row in rows}
+    
+    def search_items(self, query: str, limit: int = 20) -> List[Dict[str, Any]]:
+        """
+        Search items by name, codes, category and location
+        Cada termo é buscado por prefixo, sem acentos; resultados por bm25
+        """
+        if not self._fts_enabled.get(self.db_path):
+            cursor = self.get_connection().execute(
+                "SELECT * FROM items WHERE nome LIKE ? ORDER BY nome LIMIT ?",
+                (f"%{query}%", limit)
+            )
+            return [dict(row) for row in cursor.fetchall()]
+        
+        match = self._fts_match_expression(query)
+        if not match:
+            return []
+        
+        # Pesos do bm25: nome > códigos > categoria > localização.
+        # Ordena dentro do FTS e só junta com items os `limit` melhores
+        cursor = self.get_connection().execute("""
+            SELECT items.*
+            FROM (
+                SELECT rowid, bm25(items_fts, 10.0, 5.0, 2.0, 1.0) AS score
+                FROM items_fts
+                WHERE items_fts MATCH ?
+                ORDER BY score
+                LIMIT ?
+            ) AS resultado
+            JOIN items ON items.id = resultado.rowid
+            ORDER BY resultado.score, items.nome
+        """, (match, limit))
+        return [dict(row) for row in cursor.fetchall()]
+    
+    @staticmethod
+    def _fts_match_expression(query: str) -> str:
+        """Build an FTS5 prefix query, quoting terms so user input is never syntax"""
+        termos = re.findall(r"\w+", query.lower())
+        return " ".join(f'"{termo}"*' for termo in termos)
     
     def upsert_item(self, item_data: dict) -> int:
         """Insert or update item"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        # Buscar por nome E aba_origem (índice único)
-        cursor.execute(
-            "SELECT id FROM items WHERE nome = ? AND aba_origem = ?", 
-            (item_data['nome'], item_data.get('aba_origem'))
-        )
-        existing = cursor.fetchone()
+        with self.transaction() as conn:
+            cursor = conn.cursor()
+            
+            # Buscar por nome E aba_origem (índice único)
+            cursor.execute(
+                "SELECT id FROM items WHERE nome = ? AND aba_origem = ?", 
+                (item_data['nome'], item_data.get('aba_origem'))
+            )
+            existing = cursor.fetchone()
+            
+            if existing:
+                # Update existing
+                item_id = existing['id']
+                cursor.execute("""
+                    UPDATE items 
+                    SET categoria = ?, localizacao = ?, quantidade_total = ?,
+                        quantidade_disponivel = ?, quantidade_em_uso = ?,
+                        estoque_minimo = ?, codigos_originais = ?, aba_origem = ?,
+                        ultima_sincronizacao = CURRENT_TIMESTAMP,
+                        updated_at = CURRENT_TIMESTAMP
+                    WHERE id = ?
+                """, (
+                    item_data.get('categoria'),
+                    item_data.get('localizacao'),
+                    item_data.get('quantidade_total', 0),
+                    item_data.get('quantidade_disponivel', 0),
+                    item_data.get('quantidade_em_uso', 0),
+                    item_data.get('estoque_minimo', 2),
+                    item_data.get('codigos_originais'),
+                    item_data.get('aba_origem'),
+                    item_id
+                ))
+            else:
+                # Insert new
+                cursor.execute("""
+                    INSERT INTO items (
+                        nome, categoria, localizacao, quantidade_total,
+                        quantidade_disponivel, quantidade_em_uso, estoque_minimo,
+                        codigos_originais, aba_origem, ultima_sincronizacao
+                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+                """, (
+                    item_data['nome'],
+                    item_data.get('categoria'),
+                    item_data.get('localizacao'),
+                    item_data.get('quantidade_total', 0),
+                    item_data.get('quantidade_disponivel', 0),
+                    item_data.get('quantidade_em_uso', 0),
+                    item_data.get('estoque_minimo', 2),
+                    item_data.get('codigos_originais'),
+                    item_data.get('aba_origem')
+                ))
+                item_id = cursor.lastrowid
+            
+            if 'codigos_originais' in item_data:
+                self._sync_item_units(conn, {item_id: split_codigos(item_data['codigos_originais'])})
         
-        if existing:
-            # Update existing
-            item_id = existing['id']
-            cursor.execute("""
-                UPDATE items 
-                SET categoria = ?, localizacao = ?, quantidade_total = ?,
-                    quantidade_disponivel = ?, quantidade_em_uso = ?,
-                    estoque_minimo = ?, codigos_originais = ?, aba_origem = ?,
-                    ultima_sincronizacao = CURRENT_TIMESTAMP,
-                    updated_at = CURRENT_TIMESTAMP
-                WHERE id = ?
-            """, (
-                item_data.get('categoria'),
-                item_data.get('localizacao'),
-                item_data.get('quantidade_total', 0),
-                item_data.get('quantidade_disponivel', 0),
-                item_data.get('quantidade_em_uso', 0),
-                item_data.get('estoque_minimo', 2),
-                item_data.get('codigos_originais'),
-                item_data.get('aba_origem'),
-                item_id
-            ))
-        else:
-            # Insert new
-            cursor.execute("""
+        return item_id
+    
+    def bulk_sync_items(
+        self,
+        novos: List[dict],
+        atualizados: List[dict],
+        snapshots: Sequence[dict] = ()
+    ):
+        """
+        Apply a sync diff in a single transaction
+        novos: itens a inserir; atualizados: itens existentes (com 'id')
+        cuja quantidade_total ou conjunto de códigos mudou. O disponível é
+        ajustado pela diferença no próprio UPDATE, sem perder movimentações
+        feitas durante o sync. Cada item traz 'codigos' (lista), aplicada
+        em item_units por diferença de conjuntos. snapshots (das abas lidas)
+        são gravados no mesmo commit, então só valem se o diff foi aplicado.
+        """
+        with self.transaction() as conn:
+            self._save_sheet_snapshots(conn, snapshots)
+            
+            conn.executemany("""
                 INSERT INTO items (
                     nome, categoria, localizacao, quantidade_total,
                     quantidade_disponivel, quantidade_em_uso, estoque_minimo,
                     codigos_originais, aba_origem, ultima_sincronizacao
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
-            """, (
-                item_data['nome'],
-                item_data.get('categoria'),
-                item_data.get('localizacao'),
-                item_data.get('quantidade_total', 0),
-                item_data.get('quantidade_disponivel', 0),
-                item_data.get('quantidade_em_uso', 0),
-                item_data.get('estoque_minimo', 2),
-                item_data.get('codigos_originais'),
-                item_data.get('aba_origem')
-            ))
-            item_id = cursor.lastrowid
-        
-        conn.commit()
-        conn.close()
-        return item_id
+                ) VALUES (?, ?, ?, ?, ?, 0, ?, ?, ?, CURRENT_TIMESTAMP)
+                ON CONFLICT(nome, aba_origem) DO NOTHING
+            """, [(
+                item['nome'],
+                item.get('categoria'),
+                item.get('localizacao'),
+                item['quantidade_total'],
+                item['quantidade_total'],
+                item.get('estoque_minimo', 2),
+                ','.join(item.get('codigos', [])),
+                item.get('aba_origem')
+            ) for item in novos])
+            
+            conn.executemany("""
+                INSERT OR IGNORE INTO item_units (item_id, codigo)
+                SELECT id, ? FROM items WHERE nome = ? AND aba_origem = ?
+            """, [
+                (codigo, item['nome'], item.get('aba_origem'))
+                for item in novos for codigo in item.get('codigos', [])
+            ])
+            
+            if not atualizados:
+                return
+            
+            conn.executemany("""
+                UPDATE items
+                SET categoria = ?, localizacao = ?,
+                    quantidade_disponivel = quantidade_disponivel + (? - quantidade_total),
+                    quantidade_total = ?,
+                    codigos_originais = ?,
+                    ultima_sincronizacao = CURRENT_TIMESTAMP,
+                    updated_at = CURRENT_TIMESTAMP
+                WHERE id = ?
+            """, [(
+                item.get('categoria'),
+                item.get('localizacao'),
+                item['quantidade_total'],
+                item['quantidade_total'],
+                ','.join(item.get('codigos', [])),
+                item['id']
+            ) for item in atualizados])
+            
+            self._sync_item_units(conn, {item['id']: item.get('codigos', []) for item in atualizados})
+    
+    def get_sheet_snapshots(self) -> Dict[str, Dict[str, Any]]:
+        """Get the last synced snapshot of each worksheet"""
+        rows = self.get_connection().execute("SELECT * FROM sheet_snapshots").fetchall()
+        snapshots = {}
+        for row in rows:
+            snapshot = dict(row)
+            snapshot['grupos'] = json.loads(snapshot['grupos'])
+            snapshots[snapshot['aba']] = snapshot
+        return snapshots
+    
+    def clear_sheet_snapshots(self):
+        """Forget the sync snapshots so the next sync re-reads every worksheet"""
+        with self.transaction() as conn:
+            conn.execute("DELETE FROM sheet_snapshots")
+    
+    @staticmethod
+    def _save_sheet_snapshots(conn: sqlite3.Connection, snapshots: Sequence[dict]):
+        agora = time.time()
+        conn.executemany("""
+            INSERT INTO sheet_snapshots (aba, fingerprint, grupos, linhas, modified_time, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT(aba) DO UPDATE SET
+                fingerprint = excluded.fingerprint,
+                grupos = excluded.grupos,
+                linhas = excluded.linhas,
+                modified_time = excluded.modified_time,
+                updated_at = excluded.updated_at
+        """, [(
+            snapshot['aba'],
+            snapshot['fingerprint'],
+            json.dumps(snapshot['grupos'], ensure_ascii=False),
+            snapshot.get('linhas', 0),
+            snapshot.get('modified_time'),
+            agora
+        ) for snapshot in snapshots])
+    
+    @staticmethod
+    def _sync_item_units(conn: sqlite3.Connection, codigos_por_item: Dict[int, List[str]]):
+        """Apply item_units changes by set difference against each item's codes"""
+        existentes: Dict[int, set] = {}
+        ids = list(codigos_por_item)
+        for inicio in range(0, len(ids), 500):
+            lote = ids[inicio:inicio + 500]
+            cursor = conn.execute(
+                f"SELECT item_id, codigo FROM item_units WHERE item_id IN ({','.join('?' * len(lote))})",
+                lote
+            )
+            for row in cursor.fetchall():
+                existentes.setdefault(row['item_id'], set()).add(row['codigo'])
+        
+        inserir = []
+        remover = []
+        for item_id, codigos in codigos_por_item.items():
+            atuais = existentes.get(item_id, set())
+            desejados = set(codigos)
+            inserir.extend((item_id, codigo) for codigo in codigos if codigo not in atuais)
+            remover.extend((item_id, codigo) for codigo in atuais - desejados)
+        
+        conn.executemany("INSERT OR IGNORE INTO item_units (item_id, codigo) VALUES (?, ?)", inserir)
+        conn.executemany("DELETE FROM item_units WHERE item_id = ? AND codigo = ?", remover)
     
     def update_item_quantity(self, item_id: int, new_quantity: int) -> bool:
         """Update item quantity"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute(
-            "UPDATE items SET quantidade_disponivel = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?",
-            (new_quantity, item_id)
-        )
-        success = cursor.rowcount > 0
-        conn.commit()
-        conn.close()
-        return success
+        with self.transaction() as conn:
+            cursor = conn.execute(
+                "UPDATE items SET quantidade_disponivel = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?",
+                (new_quantity, item_id)
+            )
+            return cursor.rowcount > 0
     
     # TRANSACTIONS OPERATIONS
     
     def create_transaction(self, transaction: Transaction) -> int:
         """Create a new transaction"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
+        with self.transaction() as conn:
+            cursor = conn.execute("""
+                INSERT INTO transactions (tipo, item_id, item_nome, quantidade, nome_pessoa, saldo_apos, timestamp)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            """, (transaction.tipo, transaction.item_id, transaction.item_nome, 
+                  transaction.quantidade, transaction.nome_pessoa, transaction.saldo_apos,
+                  transaction.timestamp))
+            return cursor.lastrowid
+    
+    def apply_stock_movement(
+        self,
+        tipo: str,
+        item_id: int,
+        quantidade: int,
+        nome_pessoa: str,
+        timestamp: Optional[datetime] = None,
+        eventos: Sequence[str] = ()
+    ) -> Dict[str, Any]:
+        """
+        Apply a retirada/devolucao atomically
+        Numa única transação: UPDATE condicional do saldo (sem race entre
+        leitura e escrita), registro no histórico, em items_em_uso e, para
+        cada nome em `eventos`, uma entrada no outbox com a movimentação.
+        Retorna {'transaction_id', 'item', 'codigos'} com o item já atualizado.
+        """
+        timestamp = timestamp or datetime.now()
         
-        cursor.execute("""
+        with self.transaction() as conn:
+            result, payload = self._apply_movement(conn, tipo, item_id, quantidade, nome_pessoa, timestamp)
+            self._enqueue_outbox(conn, eventos, payload)
+        
+        return result
+    
+    def apply_stock_movements(
+        self,
+        movimentos: Sequence[Dict[str, Any]],
+        nome_pessoa: str,
+        timestamp: Optional[datetime] = None,
+        eventos: Sequence[str] = (),
+        eventos_lote: Sequence[str] = ()
+    ) -> List[Dict[str, Any]]:
+        """
+        Apply several retiradas/devolucoes for one person, all-or-nothing
+        `movimentos` é uma lista de {'tipo', 'item_id', 'quantidade'},
+        aplicada em ordem numa única transação; qualquer falha desfaz todas.
+        Cada movimentação gera uma entrada por nome em `eventos` (mesmo payload
+        do apply_stock_movement) e o lote gera uma entrada por nome em
+        `eventos_lote` com {'nome_pessoa', 'timestamp', 'movimentos': [...]}.
+        Retorna um resultado como o do apply_stock_movement por movimentação.
+        """
+        timestamp = timestamp or datetime.now()
+        resultados, payloads = [], []
+        
+        with self.transaction() as conn:
+            for posicao, movimento in enumerate(movimentos, start=1):
+                try:
+                    result, payload = self._apply_movement(
+                        conn,
+                        movimento['tipo'],
+                        movimento['item_id'],
+                        movimento['quantidade'],
+                        nome_pessoa,
+                        timestamp
+                    )
+                except StockError as e:
+                    # Diz qual linha do carrinho falhou; o rollback desfaz as anteriores
+                    row = conn.execute("SELECT nome FROM items WHERE id = ?", (movimento['item_id'],)).fetchone()
+                    rotulo = row['nome'] if row else f"id {movimento['item_id']}"
+                    raise type(e)(f"Item {posicao} ({rotulo}): {e}") from e
+                resultados.append(result)
+                payloads.append(payload)
+            
+            for payload in payloads:
+                self._enqueue_outbox(conn, eventos, payload)
+            self._enqueue_outbox(conn, eventos_lote, {
+                'nome_pessoa': nome_pessoa,
+                'timestamp': timestamp.isoformat(),
+                'movimentos': payloads
+            })
+        
+        return resultados
+    
+    def _apply_movement(
+        self,
+        conn: sqlite3.Connection,
+        tipo: str,
+        item_id: int,
+        quantidade: int,
+        nome_pessoa: str,
+        timestamp: datetime
+    ) -> Tuple[Dict[str, Any], dict]:
+        """One stock movement inside the caller's transaction; (result, outbox payload)"""
+        if tipo == "retirada":
+            update_sql = """
+                UPDATE items
+                SET quantidade_disponivel = quantidade_disponivel - ?,
+                    quantidade_em_uso = quantidade_em_uso + ?,
+                    updated_at = CURRENT_TIMESTAMP
+                WHERE id = ? AND quantidade_disponivel >= ?
+                RETURNING *
+            """
+        else:  # devolucao
+            update_sql = """
+                UPDATE items
+                SET quantidade_disponivel = quantidade_disponivel + ?,
+                    quantidade_em_uso = quantidade_em_uso - ?,
+                    updated_at = CURRENT_TIMESTAMP
+                WHERE id = ? AND quantidade_em_uso >= ?
+                RETURNING *
+            """
+        
+        row = conn.execute(update_sql, (quantidade, quantidade, item_id, quantidade)).fetchone()
+        
+        if row is None:
+            current = conn.execute(
+                "SELECT quantidade_disponivel, quantidade_em_uso FROM items WHERE id = ?",
+                (item_id,)
+            ).fetchone()
+            if current is None:
+                raise ItemNotFoundError("Item não encontrado")
+            if tipo == "retirada":
+                raise InsufficientStockError(
+                    f"Estoque insuficiente! Disponível: {current['quantidade_disponivel']} unidades"
+                )
+            raise InsufficientStockError(
+                f"Quantidade inválida! Apenas {current['quantidade_em_uso']} unidades em uso"
+            )
+        
+        item = dict(row)
+        
+        cursor = conn.execute("""
             INSERT INTO transactions (tipo, item_id, item_nome, quantidade, nome_pessoa, saldo_apos, timestamp)
             VALUES (?, ?, ?, ?, ?, ?, ?)
-        """, (transaction.tipo, transaction.item_id, transaction.item_nome, 
-              transaction.quantidade, transaction.nome_pessoa, transaction.saldo_apos,
-              transaction.timestamp))
-        
+        """, (tipo, item_id, item['nome'], quantidade, nome_pessoa,
+              item['quantidade_disponivel'], timestamp))
         transaction_id = cursor.lastrowid
-        conn.commit()
-        conn.close()
-        return transaction_id
+        
+        if tipo == "retirada":
+            # Reserva unidades livres pelo índice (item_id, status)
+            codigos = [row['codigo'] for row in conn.execute("""
+                UPDATE item_units
+                SET status = 'em_uso', nome_pessoa = ?, updated_at = CURRENT_TIMESTAMP
+                WHERE id IN (
+                    SELECT id FROM item_units
+                    WHERE item_id = ? AND status = 'disponivel'
+                    ORDER BY id
+                    LIMIT ?
+                )
+                RETURNING codigo
+            """, (nome_pessoa, item_id, quantidade)).fetchall()]
+            
+            # Uma linha por unidade; sem código quando o item não tem 5S suficiente
+            codigos_em_uso = codigos + [None] * (quantidade - len(codigos))
+            conn.executemany("""
+                INSERT INTO items_em_uso (item_id, codigo_original, nome_pessoa)
+                VALUES (?, ?, ?)
+            """, [(item_id, codigo, nome_pessoa) for codigo in codigos_em_uso])
+        else:
+            codigos = self._delete_items_em_uso(conn, item_id, nome_pessoa, quantidade)
+            # Libera exatamente as unidades que estavam com essa pessoa
+            self._release_units(conn, item_id, codigos)
+        
+        payload = {
+            'transaction_id': transaction_id,
+            'tipo': tipo,
+            'item_id': item_id,
+            'item_nome': item['nome'],
+            'quantidade': quantidade,
+            'nome_pessoa': nome_pessoa,
+            'saldo_apos': item['quantidade_disponivel'],
+            'estoque_minimo': item['estoque_minimo'],
+            'codigos': codigos,
+            'timestamp': timestamp.isoformat()
+        }
+        return {"transaction_id": transaction_id, "item": item, "codigos": codigos}, payload
     
-    def get_transactions(self, limit: int = 50) -> List[Dict[str, Any]]:
-        """Get recent transactions"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute(
-            "SELECT * FROM transactions ORDER BY timestamp DESC LIMIT ?",
-            (limit,)
-        )
-        transactions = [dict(row) for row in cursor.fetchall()]
-        conn.close()
-        return transactions
+    def get_transactions(self, limit: int = 50, after: Optional[Tuple[str, int]] = None) -> List[Dict[str, Any]]:
+        """
+        Get recent transactions, newest first
+        after: (timestamp, id) da última linha da página anterior (keyset)
+        """
+        if after is None:
+            cursor = self.get_connection().execute(
+                "SELECT * FROM transactions ORDER BY timestamp DESC, id DESC LIMIT ?",
+                (limit,)
+            )
+        else:
+            cursor = self.get_connection().execute("""
+                SELECT * FROM transactions
+                WHERE (timestamp, id) < (?, ?)
+                ORDER BY timestamp DESC, id DESC
+                LIMIT ?
+            """, (*after, limit))
+        return [dict(row) for row in cursor.fetchall()]
     
-    def get_transactions_by_item(self, item_id: int, limit: int = 20) -> List[Dict[str, Any]]:
-        """Get transactions for a specific item"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute(
-            "SELECT * FROM transactions WHERE item_id = ? ORDER BY timestamp DESC LIMIT ?",
-            (item_id, limit)
+    def get_transactions_by_item(
+        self,
+        item_id: int,
+        limit: int = 20,
+        after: Optional[Tuple[str, int]] = None
+    ) -> List[Dict[str, Any]]:
+        """Get transactions for a specific item, newest first (keyset via `after`)"""
+        if after is None:
+            cursor = self.get_connection().execute("""
+                SELECT * FROM transactions
+                WHERE item_id = ?
+                ORDER BY timestamp DESC, id DESC
+                LIMIT ?
+            """, (item_id, limit))
+        else:
+            cursor = self.get_connection().execute("""
+                SELECT * FROM transactions
+                WHERE item_id = ? AND (timestamp, id) < (?, ?)
+                ORDER BY timestamp DESC, id DESC
+                LIMIT ?
+            """, (item_id, *after, limit))
+        return [dict(row) for row in cursor.fetchall()]
+    
+    # OUTBOX OPERATIONS
+    
+    @staticmethod
+    def _enqueue_outbox(conn: sqlite3.Connection, eventos: Sequence[str], payload: dict):
+        """Queue one outbox entry per event, inside the caller's transaction"""
+        agora = time.time()
+        corpo = json.dumps(payload, ensure_ascii=False)
+        conn.executemany(
+            "INSERT INTO outbox (evento, payload, proxima_tentativa) VALUES (?, ?, ?)",
+            [(evento, corpo, agora) for evento in eventos]
         )
-        transactions = [dict(row) for row in cursor.fetchall()]
-        conn.close()
-        return transactions
+    
+    def get_due_outbox(self, limit: int = 20, excluir: Sequence[str] = ()) -> List[Dict[str, Any]]:
+        """Get pending outbox entries that are due, oldest first (skipping `excluir` events)"""
+        marcadores = ",".join("?" * len(excluir))
+        filtro = f"AND evento NOT IN ({marcadores})" if excluir else ""
+        cursor = self.get_connection().execute(f"""
+            SELECT * FROM outbox
+            WHERE status = 'pendente' AND proxima_tentativa <= ? {filtro}
+            ORDER BY id
+            LIMIT ?
+        """, (time.time(), *excluir, limit))
+        return self._outbox_entries(cursor)
+    
+    def get_outbox_head(self, evento: str, limit: int) -> List[Dict[str, Any]]:
+        """Get the oldest pending entries of one event, due or not (for batched delivery)"""
+        cursor = self.get_connection().execute("""
+            SELECT * FROM outbox
+            WHERE status = 'pendente' AND evento = ?
+            ORDER BY id
+            LIMIT ?
+        """, (evento, limit))
+        return self._outbox_entries(cursor)
+    
+    @staticmethod
+    def _outbox_entries(cursor: sqlite3.Cursor) -> List[Dict[str, Any]]:
+        entries = [dict(row) for row in cursor.fetchall()]
+        for entry in entries:
+            entry['payload'] = json.loads(entry['payload'])
+        return entries
+    
+    def next_outbox_due(self, excluir: Sequence[str] = ()) -> Optional[float]:
+        """Epoch of the next pending outbox entry (skipping `excluir` events), or None"""
+        marcadores = ",".join("?" * len(excluir))
+        filtro = f"AND evento NOT IN ({marcadores})" if excluir else ""
+        row = self.get_connection().execute(
+            f"SELECT MIN(proxima_tentativa) FROM outbox WHERE status = 'pendente' {filtro}",
+            tuple(excluir)
+        ).fetchone()
+        return row[0]
+    
+    def complete_outbox(self, outbox_id: int):
+        """Remove a delivered outbox entry"""
+        self.complete_outbox_many([outbox_id])
+    
+    def complete_outbox_many(self, outbox_ids: Sequence[int]):
+        """Remove delivered outbox entries in one transaction"""
+        with self.transaction() as conn:
+            conn.executemany("DELETE FROM outbox WHERE id = ?", [(i,) for i in outbox_ids])
+    
+    def retry_outbox(self, outbox_id: int, erro: str, proxima_tentativa: Optional[float]):
+        """Record a failed attempt; proxima_tentativa None marks it as failed for good"""
+        self.retry_outbox_many([outbox_id], erro, proxima_tentativa)
+    
+    def retry_outbox_many(
+        self,
+        outbox_ids: Sequence[int],
+        erro: str,
+        proxima_tentativa: Optional[float],
+        contar_tentativa: bool = True
+    ):
+        """
+        Record a failed attempt for several entries
+        contar_tentativa=False reagenda sem gastar tentativa (ex.: cota da API)
+        """
+        with self.transaction() as conn:
+            conn.executemany("""
+                UPDATE outbox
+                SET tentativas = tentativas + ?,
+                    ultimo_erro = ?,
+                    status = CASE WHEN ? IS NULL THEN 'falhou' ELSE 'pendente' END,
+                    proxima_tentativa = COALESCE(?, proxima_tentativa)
+                WHERE id = ?
+            """, [
+                (1 if contar_tentativa else 0, erro, proxima_tentativa, proxima_tentativa, i)
+                for i in outbox_ids
+            ])
+    
+    # LOW-STOCK ALERTS
+    
+    def get_pending_stock_alerts(self, item_ids: Sequence[int]) -> List[Dict[str, Any]]:
+        """
+        Alert state of the given items whose side differs from the last notified one
+        Itens que cruzaram o limite e voltaram antes da entrega não aparecem.
+        """
+        if not item_ids:
+            return []
+        marcadores = ",".join("?" * len(item_ids))
+        return [dict(row) for row in self.get_connection().execute(f"""
+            SELECT a.item_id, a.abaixo, a.transicoes, a.mudou_em, i.nome, i.aba_origem, i.localizacao,
+                i.quantidade_total, i.quantidade_disponivel, i.estoque_minimo
+            FROM estoque_alertas a
+            JOIN items i ON i.id = a.item_id
+            WHERE a.item_id IN ({marcadores}) AND a.abaixo <> a.notificado_abaixo
+            ORDER BY a.abaixo DESC, i.nome
+        """, tuple(item_ids))]
+    
+    def mark_stock_alerts_notified(self, alertas: Sequence[Tuple[int, int]]):
+        """Record the side (abaixo 1/0) each item was last notified on"""
+        agora = time.time()
+        with self.transaction() as conn:
+            conn.executemany(
+                "UPDATE estoque_alertas SET notificado_abaixo = ?, notificado_em = ? WHERE item_id = ?",
+                [(abaixo, agora, item_id) for item_id, abaixo in alertas]
+            )
+    
+    # SLACK USER MAPPING (cópia local da aba PESSOAS)
+    
+    def get_slack_user_mapping_copy(self) -> Tuple[Dict[str, str], Optional[float]]:
+        """Get the persisted name → Slack mapping and when it was saved"""
+        rows = self.get_connection().execute(
+            "SELECT nome, slack_user, updated_at FROM slack_user_mapping"
+        ).fetchall()
+        if not rows:
+            return {}, None
+        return {row['nome']: row['slack_user'] for row in rows}, max(row['updated_at'] for row in rows)
+    
+    def save_slack_user_mapping_copy(self, mapping: Dict[str, str]):
+        """Replace the persisted name → Slack mapping"""
+        agora = time.time()
+        with self.transaction() as conn:
+            conn.execute("DELETE FROM slack_user_mapping")
+            conn.executemany(
+                "INSERT INTO slack_user_mapping (nome, slack_user, updated_at) VALUES (?, ?, ?)",
+                [(nome, slack_user, agora) for nome, slack_user in mapping.items()]
+            )
     
     # ITEMS EM USO OPERATIONS
     
     def add_item_em_uso(self, item_id: int, codigo: str, nome_pessoa: str) -> int:
         """Registra item em uso"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute("""
-            INSERT INTO items_em_uso (item_id, codigo_original, nome_pessoa)
-            VALUES (?, ?, ?)
-        """, (item_id, codigo, nome_pessoa))
-        uso_id = cursor.lastrowid
-        conn.commit()
-        conn.close()
-        return uso_id
+        with self.transaction() as conn:
+            cursor = conn.execute("""
+                INSERT INTO items_em_uso (item_id, codigo_original, nome_pessoa)
+                VALUES (?, ?, ?)
+            """, (item_id, codigo, nome_pessoa))
+            conn.execute("""
+                UPDATE item_units
+                SET status = 'em_uso', nome_pessoa = ?, updated_at = CURRENT_TIMESTAMP
+                WHERE item_id = ? AND codigo = ?
+            """, (nome_pessoa, item_id, codigo))
+            return cursor.lastrowid
     
     def remove_item_em_uso(self, item_id: int, nome_pessoa: str, quantidade: int = 1):
         """Remove item de em uso"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute("""
+        with self.transaction() as conn:
+            codigos = self._delete_items_em_uso(conn, item_id, nome_pessoa, quantidade)
+            self._release_units(conn, item_id, codigos)
+    
+    @staticmethod
+    def _delete_items_em_uso(conn: sqlite3.Connection, item_id: int, nome_pessoa: str, quantidade: int) -> List[str]:
+        """Delete up to `quantidade` in-use rows of a person, oldest first; return their codes"""
+        # DELETE ... LIMIT não está disponível no SQLite padrão
+        cursor = conn.execute("""
             DELETE FROM items_em_uso 
-            WHERE item_id = ? AND nome_pessoa = ?
-            LIMIT ?
+            WHERE id IN (
+                SELECT id FROM items_em_uso
+                WHERE item_id = ? AND nome_pessoa = ?
+                ORDER BY data_retirada, id
+                LIMIT ?
+            )
+            RETURNING codigo_original
         """, (item_id, nome_pessoa, quantidade))
-        conn.commit()
-        conn.close()
+        return [row['codigo_original'] for row in cursor.fetchall() if row['codigo_original']]
+    
+    @staticmethod
+    def _release_units(conn: sqlite3.Connection, item_id: int, codigos: List[str]):
+        """Mark the given unit codes of an item as available again"""
+        conn.executemany("""
+            UPDATE item_units
+            SET status = 'disponivel', nome_pessoa = NULL, updated_at = CURRENT_TIMESTAMP
+            WHERE item_id = ? AND codigo = ?
+        """, [(item_id, codigo) for codigo in codigos])
     
     def get_items_em_uso(self) -> List[Dict[str, Any]]:
         """Lista todos os itens em uso"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute("""
+        cursor = self.get_connection().execute("""
             SELECT ieu.*, i.nome as item_nome, i.categoria
             FROM items_em_uso ieu
             JOIN items i ON ieu.item_id = i.id
             ORDER BY ieu.data_retirada DESC
         """)
-        items = [dict(row) for row in cursor.fetchall()]
-        conn.close()
-        return items
+        return [dict(row) for row in cursor.fetchall()]
     
     def get_items_em_uso_by_item(self, item_id: int) -> List[Dict[str, Any]]:
         """Lista itens em uso de um item específico"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute("""
+        cursor = self.get_connection().execute("""
             SELECT * FROM items_em_uso 
             WHERE item_id = ?
             ORDER BY data_retirada DESC
         """, (item_id,))
-        items = [dict(row) for row in cursor.fetchall()]
-        conn.close()
-        return items
+        return [dict(row) for row in cursor.fetchall()]
     
     def clear_all_data(self):
         """Clear all data (for sync purposes)"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute("DELETE FROM items")
-        conn.commit()
-        conn.close()
+        with self.transaction() as conn:
+            conn.execute("DELETE FROM items")
+            conn.execute("DELETE FROM sheet_snapshots")  # próximo sync relê tudo
 
+
+class AsyncDatabase:
+    """
+    Async facade over Database for the API routes
+    Cada método de Database vira uma corrotina executada num pool de
+    threads limitado; cada thread do pool reaproveita sua conexão
+    persistente. Ex.: item = await db.get_item_by_id(1)
+    """
+    
+    _executor: Optional[ThreadPoolExecutor] = None
+    _executor_lock = threading.Lock()
+    
+    def __init__(self, db_path: Optional[str] = None):
+        self.sync = Database(db_path)
+    
+    @classmethod
+    def _get_executor(cls) -> ThreadPoolExecutor:
+        """Get the shared, bounded database thread pool"""
+        if cls._executor is None:
+            with cls._executor_lock:
+                if cls._executor is None:
+                    cls._executor = ThreadPoolExecutor(
+                        max_workers=settings.DATABASE_MAX_WORKERS,
+                        thread_name_prefix="db"
+                    )
+        return cls._executor
+    
+    async def run(self, func, *args, **kwargs):
+        """Run a blocking database function in the pool"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._get_executor(), partial(func, *args, **kwargs))
+    
+    def __getattr__(self, name: str):
+        attr = getattr(self.sync, name)
+        if not callable(attr):
+            return attr
+        
+        async def call(*args, **kwargs):
+            return await self.run(attr, *args, **kwargs)
+        
+        call.__name__ = name
+        return call
+    
+    @classmethod
+    def shutdown(cls):
+        """Stop the database thread pool (application shutdown)"""
+        with cls._executor_lock:
+            executor, cls._executor = cls._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
@@ -3,201 +3,211 @@ Google Sheets Service
 Handles synchronization with Google Sheets using service account
 """
 
+import hashlib
+import re
 import gspread
-from google.oauth2.service_account import Credentials
-from typing import List, Dict, Any
+from gspread.utils import numericise
+from fastapi.concurrency import run_in_threadpool
+from typing import List, Dict, Any, Iterable, Iterator, Optional
 from datetime import datetime
-from app.config import settings
 from app.services.database import Database
-from app.models.item import Item
-import os
+from app.services.inventory_sync import (
+    ItemKey, apply_groups, group_rows, iter_grid_records, normalize
+)
+from app.services.sheets_client import SheetsClient, sheets_client
+
+# Abas com o inventário 5S (cada linha é uma unidade)
+ABAS_SINCRONIZADAS = ["Produto", "Mecânica", "Eletrônica"]
+
+# Só valores com cara de número passam pelo numericise do gspread (que
+# levanta duas exceções por texto comum); o resultado é o mesmo
+_PARECE_NUMERO = re.compile(
+    r"\s*[+-]?((\d+\.?\d*|\.\d+)([eE][+-]?\d+)?|inf|infinity|nan)\s*",
+    re.IGNORECASE
+)
+
+
+def _numericise(valor: Any) -> Any:
+    if isinstance(valor, str) and "_" not in valor and not _PARECE_NUMERO.fullmatch(valor.replace(",", "")):
+        return valor
+    return numericise(valor)
 
 
 class GoogleSheetsService:
-    """Google Sheets integration service"""
-    
-    # Required scopes for Google Sheets API
-    SCOPES = [
-        'https://www.googleapis.com/auth/spreadsheets',
-        'https://www.googleapis.com/auth/drive'
-    ]
+    """
+    Google Sheets integration service
+    Leve de construir: a conexão (token, sessão HTTP e abas) fica no
+    SheetsClient compartilhado pelo processo
+    """
     
-    def __init__(self):
-        self.spreadsheet_id = settings.GOOGLE_SHEETS_SPREADSHEET_ID
-        self.credentials_file = settings.GOOGLE_SHEETS_CREDENTIALS_FILE
-        self.db = Database()
-        self.client = None
+    def __init__(self, client: SheetsClient = None, db: Database = None):
+        self.sheets = client or sheets_client
+        self.spreadsheet_id = self.sheets.spreadsheet_id
+        self.credentials_file = self.sheets.credentials_file
+        self.db = db or Database()
         self.spreadsheet = None
     
+    def is_configured(self) -> bool:
+        """Check if spreadsheet ID and credentials file are available"""
+        return self.sheets.is_configured()
+    
     def connect(self):
-        """Connect to Google Sheets"""
-        if not os.path.exists(self.credentials_file):
-            raise FileNotFoundError(
-                f"Arquivo de credenciais não encontrado: {self.credentials_file}"
-            )
-        
-        if not self.spreadsheet_id:
-            raise ValueError("GOOGLE_SHEETS_SPREADSHEET_ID não configurado")
-        
-        # Authenticate
-        creds = Credentials.from_service_account_file(
-            self.credentials_file,
-            scopes=self.SCOPES
-        )
-        self.client = gspread.authorize(creds)
-        self.spreadsheet = self.client.open_by_key(self.spreadsheet_id)
+        """Connect to Google Sheets (reuses the shared connection)"""
+        self.spreadsheet = self.sheets.spreadsheet()
+        return self.spreadsheet
     
-    async def sync_from_sheets(self):
+    async def sync_from_sheets(self, full: bool = False):
         """
         Sync items from Google Sheets to local database
+        Roda em thread separada para não bloquear o event loop
+        """
+        return await run_in_threadpool(self._sync_from_sheets, full)
+    
+    @staticmethod
+    def _serialize_row(linha: Dict[str, Any]) -> str:
+        return "\x1f".join(
+            str(linha[campo]) for campo in ('nome', 'codigo', 'categoria', 'localizacao')
+        )
+    
+    @classmethod
+    def _hash_rows(cls, linhas: Iterable[Dict[str, Any]], hashes: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+        """
+        Pipeline stage: pass rows through while hashing them
+        Preenche hashes com o hash da aba inteira ('aba'), um hash por nome
+        ('grupos') e o total de linhas; mesmo sha1 das linhas serializadas
+        unidas por \x1e (a ordem conta: a 1ª linha define a categoria),
+        sem guardá-las
+        """
+        aba = hashlib.sha1()
+        grupos: Dict[str, Any] = {}
+        total = 0
+        for linha in linhas:
+            serializada = cls._serialize_row(linha).encode('utf-8')
+            if total:
+                aba.update(b"\x1e")
+            aba.update(serializada)
+            grupo = grupos.get(linha['nome'])
+            if grupo is None:
+                grupo = grupos[linha['nome']] = hashlib.sha1()
+            else:
+                grupo.update(b"\x1e")
+            grupo.update(serializada)
+            total += 1
+            yield linha
+        hashes.update(aba=aba, grupos=grupos, linhas=total)
+    
+    def _spreadsheet_modified_time(self) -> Optional[str]:
+        """Drive modifiedTime of the spreadsheet (None if unavailable)"""
+        try:
+            return self.sheets.modified_time()
+        except Exception as e:
+            print(f"modifiedTime indisponivel, comparando conteudo das abas: {e}")
+            return None
+    
+    def _sync_from_sheets(self, full: bool = False):
+        """
+        Sync items from Google Sheets to local database (blocking)
         Agrega itens por nome (5S individual → estoque consolidado)
+        
+        Incremental: cada aba tem um snapshot no SQLite (hash do conteúdo e
+        hash por grupo de nome). Se o modifiedTime da planilha não mudou,
+        nada é baixado; aba com o mesmo hash é pulada; aba alterada só
+        reprocessa os grupos (nome, aba) cujas linhas mudaram.
+        full=True ignora os snapshots e reprocessa tudo.
         """
         try:
-            self.connect()
+            snapshots = {} if full else self.db.get_sheet_snapshots()
+            modified_time = self._spreadsheet_modified_time()
             
-            all_items = []
+            if (modified_time and snapshots and all(
+                    aba in snapshots and snapshots[aba]['modified_time'] == modified_time
+                    for aba in ABAS_SINCRONIZADAS)):
+                print("Planilha sem alteracoes desde o ultimo sync, nada a fazer")
+                return {
+                    "success": True,
+                    "registros_lidos": 0,
+                    "itens_unicos": sum(len(snapshots[aba]['grupos']) for aba in ABAS_SINCRONIZADAS),
+                    "items_novos": 0,
+                    "items_atualizados": 0,
+                    "abas_inalteradas": list(ABAS_SINCRONIZADAS)
+                }
+            
+            items_agrupados: Dict[ItemKey, Dict[str, Any]] = {}
             total_records = 0
+            total_grupos = 0
+            abas_inalteradas = []
+            novos_snapshots = []
             
-            # Ler todas as 3 abas
-            for aba_nome in ["Produto", "Mecânica", "Eletrônica"]:
-                try:
-                    sheet = self.spreadsheet.worksheet(aba_nome)
-                    records = sheet.get_all_records()
-                    
-                    for record in records:
-                        # Pegar nome do item (pode variar o nome da coluna)
-                        nome = (record.get('Nome_do_Recurso') or 
-                               record.get('Nome') or 
-                               record.get('Item') or 
-                               record.get('nome'))
-                        
-                        if not nome or str(nome).strip() == '':
-                            continue  # Pula linhas vazias
-                        
-                        all_items.append({
-                            'nome': str(nome).strip(),
-                            'codigo': record.get('ID_do_Recurso') or record.get('ID'),
-                            'categoria': record.get('Categoria'),
-                            'localizacao': record.get('Localizacao_de_armazenamento') or record.get('Localização'),
-                            'aba_origem': aba_nome
-                        })
-                        total_records += 1
-                    
-                    print(f"Lidos {len(records)} registros da aba '{aba_nome}'")
-                    
-                except gspread.WorksheetNotFound:
+            # Ler as 3 abas numa única requisição (values_batchGet)
+            grades = self.sheets.batch_values(ABAS_SINCRONIZADAS)
+            
+            for aba_nome in ABAS_SINCRONIZADAS:
+                if aba_nome not in grades:
                     print(f"Aba '{aba_nome}' nao encontrada, pulando...")
                     continue
-            
-            if not all_items:
-                print("Nenhum item encontrado nas planilhas")
-                return {"success": False, "error": "Nenhum item encontrado"}
-            
-            # Agrupar itens por (nome, aba_origem)
-            # Importante: um item pode aparecer em várias abas!
-            items_agrupados = {}
-            for item in all_items:
-                nome = item['nome']
-                aba = item['aba_origem']
-                chave = f"{nome}|{aba}"  # Chave única: nome + aba
-                if chave not in items_agrupados:
-                    items_agrupados[chave] = []
-                items_agrupados[chave].append(item)
-            
-            # Sincronizar itens agrupados
-            items_novos = 0
-            items_atualizados = 0
-            
-            for chave, grupo in items_agrupados.items():
-                # Extrair nome e aba da chave
-                nome_chave, aba_origem = chave.split('|')
-                
-                quantidade_total = len(grupo)
-                codigos = [item['codigo'] for item in grupo if item.get('codigo')]
                 
-                # Pega dados do primeiro (todos deveriam ter mesmos dados)
-                primeiro = grupo[0]
-                nome = primeiro.get('nome')  # Nome real do item (sem a chave)
-                categoria = primeiro.get('categoria')
-                localizacao = primeiro.get('localizacao')
+                # grade → records → linhas → hashes → grupos, sem listas intermediárias
+                hashes: Dict[str, Any] = {}
+                grupos_aba = group_rows(self._hash_rows(
+                    normalize(iter_grid_records(aba_nome, grades[aba_nome], _numericise)),
+                    hashes
+                ))
+                total_records += hashes['linhas']
+                print(f"Lidos {max(len(grades[aba_nome]) - 1, 0)} registros da aba '{aba_nome}'")
                 
-                # DEBUG: Log para os primeiros itens
-                if items_novos + items_atualizados < 3:
-                    print(f"DEBUG: Item '{nome}' -> aba_origem='{aba_origem}' (grupo de {len(grupo)} unidades)")
+                fingerprint = hashes['aba'].hexdigest()
+                anterior = snapshots.get(aba_nome)
                 
-                # Busca item existente no banco (considerando nome E aba)
-                item_existente = self.db.get_item_by_name_and_aba(nome, aba_origem)
-                
-                if item_existente:
-                    # Verifica se quantidade mudou (itens novos adicionados)
-                    if item_existente['quantidade_total'] != quantidade_total:
-                        diferenca = quantidade_total - item_existente['quantidade_total']
-                        
-                        # Atualiza quantidades
-                        item_data = {
-                            'nome': nome,
-                            'categoria': categoria,
-                            'localizacao': localizacao,
-                            'quantidade_total': quantidade_total,
-                            'quantidade_disponivel': item_existente['quantidade_disponivel'] + diferenca,
-                            'quantidade_em_uso': item_existente['quantidade_em_uso'],
-                            'estoque_minimo': item_existente.get('estoque_minimo', 2),
-                            'codigos_originais': ','.join(codigos),
-                            'aba_origem': aba_origem
-                        }
-                        
-                        self.db.upsert_item(item_data)
-                        items_atualizados += 1
-                        
-                        if diferenca > 0:
-                            print(f"+{diferenca} unidade(s) de '{nome}'")
-                    else:
-                        # Atualiza metadados mesmo sem mudança de quantidade
-                        # (importante para corrigir aba_origem)
-                        if item_existente.get('aba_origem') != aba_origem:
-                            item_data = {
-                                'nome': nome,
-                                'categoria': categoria,
-                                'localizacao': localizacao,
-                                'quantidade_total': quantidade_total,
-                                'quantidade_disponivel': item_existente['quantidade_disponivel'],
-                                'quantidade_em_uso': item_existente['quantidade_em_uso'],
-                                'estoque_minimo': item_existente.get('estoque_minimo', 2),
-                                'codigos_originais': ','.join(codigos),
-                                'aba_origem': aba_origem
-                            }
-                            self.db.upsert_item(item_data)
-                            items_atualizados += 1
-                            print(f"Atualizado setor de '{nome}': {item_existente.get('aba_origem')} -> {aba_origem}")
+                if anterior is not None and anterior['fingerprint'] == fingerprint:
+                    abas_inalteradas.append(aba_nome)
+                    grupos = anterior['grupos']
                 else:
-                    # Criar novo item
-                    item_data = {
-                        'nome': nome,
-                        'categoria': categoria,
-                        'localizacao': localizacao,
-                        'quantidade_total': quantidade_total,
-                        'quantidade_disponivel': quantidade_total,  # Tudo disponível inicialmente
-                        'quantidade_em_uso': 0,
-                        'estoque_minimo': max(2, int(quantidade_total * 0.2)),  # 20% ou mínimo 2
-                        'codigos_originais': ','.join(codigos),
-                        'aba_origem': aba_origem
-                    }
+                    # Hash por grupo de nome: diff contra o snapshot
+                    grupos = {nome: digest.hexdigest() for nome, digest in hashes['grupos'].items()}
                     
-                    self.db.upsert_item(item_data)
-                    items_novos += 1
-                    print(f"Novo item: '{nome}' ({quantidade_total} unidades)")
+                    if anterior is None:
+                        items_agrupados.update(grupos_aba)
+                    else:
+                        alterados = {
+                            nome for nome, digest in grupos.items()
+                            if anterior['grupos'].get(nome) != digest
+                        }
+                        items_agrupados.update(
+                            (chave, grupo) for chave, grupo in grupos_aba.items() if chave[0] in alterados
+                        )
+                        print(f"Aba '{aba_nome}': {len(alterados)} grupo(s) alterado(s)")
+                
+                total_grupos += len(grupos)
+                novos_snapshots.append({
+                    'aba': aba_nome,
+                    'fingerprint': fingerprint,
+                    'grupos': grupos,
+                    'linhas': hashes['linhas'],
+                    'modified_time': modified_time
+                })
+            
+            if not total_records:
+                print("Nenhum item encontrado nas planilhas")
+                return {"success": False, "error": "Nenhum item encontrado"}
+            
+            # Aplica os grupos alterados numa única transação
+            # (snapshots gravados no mesmo commit)
+            items_novos, items_atualizados = apply_groups(self.db, items_agrupados, novos_snapshots)
             
             resultado = {
                 "success": True,
                 "registros_lidos": total_records,
-                "itens_unicos": len(items_agrupados),
+                "itens_unicos": total_grupos,
                 "items_novos": items_novos,
-                "items_atualizados": items_atualizados
+                "items_atualizados": items_atualizados,
+                "abas_inalteradas": abas_inalteradas
             }
             
             print(f"Sincronizacao concluida:")
             print(f"   - {total_records} registros lidos")
-            print(f"   - {len(items_agrupados)} itens unicos")
+            print(f"   - {total_grupos} itens unicos ({len(items_agrupados)} reprocessados)")
+            if abas_inalteradas:
+                print(f"   - abas sem alteracao: {', '.join(abas_inalteradas)}")
             print(f"   - {items_novos} novos | {items_atualizados} atualizados")
             
             return resultado
@@ -214,28 +224,34 @@ class GoogleSheetsService:
         # O controle de quantidade fica no banco local
         pass
     
+    HISTORY_HEADER = [
+        "Data/Hora", "Tipo", "Item", "Quantidade",
+        "Usuário", "Saldo Após", "Observações"
+    ]
+    
     async def append_to_history(self, transaction: Dict[str, Any]):
-        """Append transaction to HISTÓRICO worksheet"""
-        try:
-            self.connect()
-            
-            # Get or create HISTÓRICO worksheet
-            try:
-                history_sheet = self.spreadsheet.worksheet("HISTÓRICO")
-            except gspread.WorksheetNotFound:
-                history_sheet = self.spreadsheet.add_worksheet(
-                    title="HISTÓRICO",
-                    rows=1000,
-                    cols=10
-                )
-                # Add headers
-                history_sheet.append_row([
-                    "Data/Hora", "Tipo", "Item", "Quantidade", 
-                    "Usuário", "Saldo Após", "Observações"
-                ])
-            
-            # Append transaction
-            row = [
+        """
+        Append transaction to HISTÓRICO worksheet
+        Propaga erros: quem chama (OutboxWorker) decide quando tentar de novo
+        """
+        await self.append_rows_to_history([transaction])
+    
+    async def append_rows_to_history(self, transactions: List[Dict[str, Any]]):
+        """Append several transactions to HISTÓRICO in one API call, in order"""
+        await run_in_threadpool(self._append_rows_to_history, transactions)
+    
+    def _append_rows_to_history(self, transactions: List[Dict[str, Any]]):
+        """Append transactions to HISTÓRICO worksheet (blocking)"""
+        if not transactions:
+            return
+        
+        # Get or create HISTÓRICO worksheet (uma vez por processo)
+        self.sheets.get_or_create_worksheet(
+            "HISTÓRICO", rows=1000, cols=10, header=self.HISTORY_HEADER
+        )
+        
+        rows = [
+            [
                 transaction.get('timestamp', datetime.now().isoformat()),
                 transaction.get('tipo', '').upper(),
                 transaction.get('item_nome', ''),
@@ -244,37 +260,40 @@ class GoogleSheetsService:
                 transaction.get('saldo_apos', 0),
                 ''  # Observações
             ]
-            
-            history_sheet.append_row(row)
-            
-        except Exception as e:
-            print(f"⚠️  Erro ao adicionar ao histórico: {e}")
+            for transaction in transactions
+        ]
+        
+        self.sheets.run("HISTÓRICO", lambda ws: ws.append_rows(rows))
     
     def get_slack_user_mapping(self) -> Dict[str, str]:
-        """Get name to Slack username mapping from PESSOAS worksheet"""
+        """
+        Get name to Slack username mapping from PESSOAS worksheet
+        Servido pelo cache com TTL (slack_user_cache); vazio se indisponível
+        """
+        from app.services.slack_user_cache import slack_user_cache
         try:
-            self.connect()
-            
-            try:
-                people_sheet = self.spreadsheet.worksheet("PESSOAS")
-                records = people_sheet.get_all_records()
-                
-                # Create mapping: nome -> slack_username
-                mapping = {}
-                for record in records:
-                    nome = record.get('Nome', '').strip().lower()
-                    slack_user = record.get('Slack_Username', '') or record.get('Slack_User_ID', '')
-                    if nome and slack_user:
-                        mapping[nome] = slack_user
-                
-                return mapping
-                
-            except gspread.WorksheetNotFound:
-                # Silenciosamente retorna vazio se não encontrar
-                # (não é crítico para o funcionamento)
-                return {}
-                
-        except Exception as e:
+            return slack_user_cache.mapping()
+        except Exception:
             # Silenciosamente retorna vazio em caso de erro
             return {}
-
+    
+    def fetch_slack_user_mapping(self) -> Dict[str, str]:
+        """
+        Download the PESSOAS worksheet and build the name → Slack mapping
+        Propaga erros de rede/credenciais para o cache manter a cópia anterior
+        """
+        try:
+            records = self.sheets.run("PESSOAS", lambda ws: ws.get_all_records())
+        except gspread.WorksheetNotFound:
+            # Não é crítico para o funcionamento
+            return {}
+        
+        # Create mapping: nome -> slack_username
+        mapping = {}
+        for record in records:
+            nome = str(record.get('Nome', '')).strip().lower()
+            slack_user = record.get('Slack_Username', '') or record.get('Slack_User_ID', '')
+            if nome and slack_user:
+                mapping[nome] = str(slack_user)
+        
+        return mapping
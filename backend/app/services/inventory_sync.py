@@ -0,0 +1,214 @@
+"""
+Inventory Sync
+Streaming pipeline shared by every inventory source:
+fonte → normalize → group_rows → diff_groups → bulk_sync_items
+
+Uma fonte é qualquer iterável de (aba, record), com record no formato
+cabeçalho → valor (Sheets, xlsx, CSV, fixture). As etapas são geradores:
+só o resumo de cada item (contador + códigos) fica em memória.
+"""
+
+import csv
+import os
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+from app.services.database import Database, split_codigos
+from app.services.catalog_cache import catalog_cache
+from app.services.change_feed import change_feed
+
+# Cabeçalhos lidos do inventário (os nomes de coluna variam entre as abas)
+COLUNAS_INVENTARIO = {
+    'Nome_do_Recurso', 'Nome', 'Item', 'nome', 'ID_do_Recurso', 'ID',
+    'Categoria', 'Localizacao_de_armazenamento', 'Localização'
+}
+
+ItemKey = Tuple[str, str]  # (nome, aba_origem)
+Record = Dict[str, Any]
+Source = Iterable[Tuple[str, Record]]  # (aba, record)
+
+
+def iter_grid_records(
+    aba_nome: str,
+    grid: Iterable[Sequence[Any]],
+    convert: Optional[Callable[[Any], Any]] = None
+) -> Iterator[Tuple[str, Record]]:
+    """
+    Source over a value grid (header row + rows), e.g. a values_batchGet range
+    Só monta as colunas que o parse_record usa; convert trata cada célula
+    """
+    linhas = iter(grid)
+    header = next(linhas, None)
+    if not header:
+        return
+    colunas = [(i, nome) for i, nome in enumerate(header) if nome in COLUNAS_INVENTARIO]
+    for row in linhas:
+        if convert is None:
+            yield aba_nome, {nome: row[i] if i < len(row) else "" for i, nome in colunas}
+        else:
+            yield aba_nome, {nome: convert(row[i]) if i < len(row) else "" for i, nome in colunas}
+
+
+def iter_csv_records(path: str, aba_nome: Optional[str] = None) -> Iterator[Tuple[str, Record]]:
+    """
+    Source over one exported tab in CSV (aba = nome do arquivo por padrão)
+    """
+    aba_nome = aba_nome or os.path.splitext(os.path.basename(path))[0]
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        yield from iter_grid_records(aba_nome, csv.reader(f))
+
+
+def iter_fixture_records(abas: Dict[str, Iterable[Record]]) -> Iterator[Tuple[str, Record]]:
+    """Source over in-memory records per tab (testes e benchmarks)"""
+    for aba_nome, records in abas.items():
+        for record in records:
+            yield aba_nome, record
+
+
+def parse_record(record: Dict[str, Any], aba_nome: str) -> Optional[Dict[str, Any]]:
+    """Normalize one inventory row (one 5S unit), or None for empty rows"""
+    # Pegar nome do item (pode variar o nome da coluna)
+    nome = (record.get('Nome_do_Recurso') or
+           record.get('Nome') or
+           record.get('Item') or
+           record.get('nome'))
+
+    if not nome or str(nome).strip() == '':
+        return None  # Pula linhas vazias
+
+    return {
+        'nome': str(nome).strip(),
+        'codigo': record.get('ID_do_Recurso') or record.get('ID'),
+        'categoria': record.get('Categoria'),
+        'localizacao': record.get('Localizacao_de_armazenamento') or record.get('Localização'),
+        'aba_origem': aba_nome
+    }
+
+
+def normalize(fonte: Source) -> Iterator[Dict[str, Any]]:
+    """Parse the records of a source, dropping empty rows"""
+    for aba_nome, record in fonte:
+        linha = parse_record(record, aba_nome)
+        if linha is not None:
+            yield linha
+
+
+def group_rows(linhas: Iterable[Dict[str, Any]]) -> Dict[ItemKey, Dict[str, Any]]:
+    """
+    Aggregate unit rows into items by (nome, aba_origem)
+    Consome as linhas uma a uma (serve para geradores) e guarda só o
+    resumo de cada item. Importante: um item pode aparecer em várias abas!
+    Categoria e localização vêm da primeira linha do grupo.
+    """
+    grupos: Dict[ItemKey, Dict[str, Any]] = {}
+    for linha in linhas:
+        chave = (linha['nome'], linha['aba_origem'])
+        grupo = grupos.get(chave)
+        if grupo is None:
+            grupo = grupos[chave] = {
+                'nome': linha['nome'],
+                'aba_origem': linha['aba_origem'],
+                'categoria': linha.get('categoria'),
+                'localizacao': linha.get('localizacao'),
+                'quantidade_total': 0,
+                'codigos': []
+            }
+        grupo['quantidade_total'] += 1
+        if linha.get('codigo'):
+            grupo['codigos'].append(str(linha['codigo']).strip())
+    return grupos
+
+
+def diff_groups(db: Database, grupos: Dict[ItemKey, Dict[str, Any]]) -> Tuple[List[dict], List[dict]]:
+    """
+    Compare aggregated items with the database
+    Retorna (novos, atualizados); só atualiza se a quantidade ou os
+    códigos 5S mudaram.
+    """
+    # Poucos grupos: busca cada um pelo índice único; muitos: carrega tudo de uma vez
+    existentes = db.get_items_by_key(list(grupos) if len(grupos) < 500 else None)
+    novos = []
+    atualizados = []
+
+    for (nome, aba_origem), grupo in grupos.items():
+        quantidade_total = grupo['quantidade_total']
+        codigos = grupo['codigos']
+
+        # DEBUG: Log para os primeiros itens
+        if len(novos) + len(atualizados) < 3:
+            print(f"DEBUG: Item '{nome}' -> aba_origem='{aba_origem}' (grupo de {quantidade_total} unidades)")
+
+        item_existente = existentes.get((nome, aba_origem))
+
+        if item_existente:
+            codigos_mudaram = set(codigos) != set(split_codigos(item_existente['codigos_originais']))
+            if item_existente['quantidade_total'] != quantidade_total or codigos_mudaram:
+                diferenca = quantidade_total - item_existente['quantidade_total']
+                atualizados.append({
+                    'id': item_existente['id'],
+                    'categoria': grupo['categoria'],
+                    'localizacao': grupo['localizacao'],
+                    'quantidade_total': quantidade_total,
+                    'codigos': codigos
+                })
+
+                if diferenca > 0:
+                    print(f"+{diferenca} unidade(s) de '{nome}'")
+        else:
+            # Criar novo item (tudo disponível inicialmente)
+            novos.append({
+                'nome': nome,
+                'categoria': grupo['categoria'],
+                'localizacao': grupo['localizacao'],
+                'quantidade_total': quantidade_total,
+                'estoque_minimo': max(2, int(quantidade_total * 0.2)),  # 20% ou mínimo 2
+                'codigos': codigos,
+                'aba_origem': aba_origem
+            })
+            print(f"Novo item: '{nome}' ({quantidade_total} unidades)")
+
+    return novos, atualizados
+
+
+def apply_groups(
+    db: Database,
+    grupos: Dict[ItemKey, Dict[str, Any]],
+    snapshots: Sequence[dict] = ()
+) -> Tuple[int, int]:
+    """
+    Diff and apply aggregated items in a single transaction
+    Retorna (novos, atualizados); invalida o catálogo se algo mudou
+    """
+    novos, atualizados = diff_groups(db, grupos)
+    db.bulk_sync_items(novos, atualizados, snapshots)
+    if novos or atualizados:
+        catalog_cache.invalidate()
+        change_feed.notify()
+    return len(novos), len(atualizados)
+
+
+def sync_source(db: Database, fonte: Source, snapshots: Sequence[dict] = ()) -> dict:
+    """
+    Run the whole pipeline for one source (blocking)
+    Cada unidade lida soma 1 na quantidade do seu grupo, então as contagens
+    por aba saem do próprio resumo, sem guardar as linhas.
+    """
+    grupos = group_rows(normalize(fonte))
+
+    por_aba: Dict[str, int] = {}
+    for (_, aba_origem), grupo in grupos.items():
+        por_aba[aba_origem] = por_aba.get(aba_origem, 0) + grupo['quantidade_total']
+    for aba_nome, lidos in por_aba.items():
+        print(f"Lidos {lidos} registros da aba '{aba_nome}'")
+
+    if not grupos:
+        print("Nenhum item encontrado")
+        return {"success": False, "error": "Nenhum item encontrado"}
+
+    items_novos, items_atualizados = apply_groups(db, grupos, snapshots)
+    return {
+        "success": True,
+        "registros_lidos": sum(por_aba.values()),
+        "itens_unicos": len(grupos),
+        "items_novos": items_novos,
+        "items_atualizados": items_atualizados,
+        "registros_por_aba": por_aba
+    }
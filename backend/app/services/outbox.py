@@ -0,0 +1,293 @@
+"""
+Outbox Service
+Background delivery of side effects (Slack, Google Sheets) queued in SQLite
+"""
+
+import asyncio
+import random
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+import gspread
+from fastapi.concurrency import run_in_threadpool
+from app.config import settings
+from app.services.database import AsyncDatabase, EVENTO_ALERTA_ESTOQUE
+from app.services.google_sheets import GoogleSheetsService
+from app.services.slack_service import SlackService
+from app.services.slack_user_cache import slack_user_cache
+
+# Eventos gravados junto com cada movimentação de estoque
+EVENTO_SLACK_TRANSACAO = "slack_transacao"
+EVENTO_SHEETS_HISTORICO = "sheets_historico"
+EVENTO_SLACK_LOTE = "slack_lote"  # Uma mensagem para o carrinho inteiro (/api/transactions/batch)
+# EVENTO_ALERTA_ESTOQUE vem do trigger de estoque_minimo (services/database.py)
+
+Handler = Callable[[dict], Awaitable[None]]
+BatchHandler = Callable[[List[dict]], Awaitable[None]]
+
+
+class RetryLater(Exception):
+    """
+    Raised by a handler when the remote side asked us to slow down
+    A entrada é reagendada para daqui a `retry_after` segundos sem gastar
+    uma das OUTBOX_MAX_ATTEMPTS tentativas.
+    """
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class OutboxWorker:
+    """
+    Drains the outbox table in the background
+    Cada entrada é entregue ao handler do seu evento; em caso de erro é
+    reagendada com backoff exponencial (com jitter) até OUTBOX_MAX_ATTEMPTS,
+    depois fica marcada como 'falhou'. Como a fila está no SQLite, o que
+    estiver pendente sobrevive a um reinício.
+    """
+
+    def __init__(self, db: Optional[AsyncDatabase] = None):
+        self.db = db or AsyncDatabase()
+        self.handlers: Dict[str, Handler] = {}
+        self.batch_handlers: Dict[str, Tuple[BatchHandler, int, float]] = {}
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def register(self, evento: str, handler: Handler):
+        """Register the coroutine that delivers an event"""
+        self.handlers[evento] = handler
+
+    def register_batch(self, evento: str, handler: BatchHandler, max_size: int, window: float = 0.0):
+        """
+        Register a coroutine that delivers several entries of an event at once
+        As entradas seguem a ordem de id: enquanto a mais antiga estiver
+        aguardando nova tentativa, as seguintes esperam junto. Entradas novas
+        esperam até `window` segundos (ou max_size entradas) para juntar.
+        """
+        self.batch_handlers[evento] = (handler, max_size, window)
+
+    def notify(self):
+        """Wake the worker up (call after committing new entries)"""
+        self._wakeup.set()
+
+    def start(self):
+        """Start the background task on the running event loop"""
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run(), name="outbox-worker")
+
+    async def stop(self):
+        """Stop the worker; entries in flight stay pending for the next start"""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _run(self):
+        while True:
+            self._wakeup.clear()
+            try:
+                if await self.drain():
+                    continue
+                proxima = await self.next_due()
+            except Exception as e:
+                print(f"⚠️  Erro no processamento do outbox: {e}")
+                proxima = None
+
+            espera = settings.OUTBOX_POLL_SECONDS
+            if proxima is not None:
+                espera = min(espera, max(0.0, proxima - time.time()))
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=espera)
+            except asyncio.TimeoutError:
+                pass
+
+    async def drain(self, limit: int = 20) -> int:
+        """Deliver due entries in order; returns how many were attempted"""
+        entries = await self.db.get_due_outbox(limit, excluir=tuple(self.batch_handlers))
+        for entry in entries:
+            await self._deliver(entry)
+        tentadas = len(entries)
+
+        for evento in self.batch_handlers:
+            tentadas += await self._drain_batch(evento)
+        return tentadas
+
+    async def next_due(self) -> Optional[float]:
+        """Epoch when the next delivery (single or batch) should happen"""
+        proximas = [await self.db.next_outbox_due(excluir=tuple(self.batch_handlers))]
+        for evento, (_, max_size, window) in self.batch_handlers.items():
+            entries = await self.db.get_outbox_head(evento, max_size)
+            if entries:
+                proximas.append(self._batch_due_at(entries, max_size, window))
+        proximas = [p for p in proximas if p is not None]
+        return min(proximas) if proximas else None
+
+    @staticmethod
+    def _batch_due_at(entries: List[dict], max_size: int, window: float) -> float:
+        primeira = entries[0]
+        if primeira['tentativas'] or len(entries) >= max_size:
+            return primeira['proxima_tentativa']
+        return primeira['proxima_tentativa'] + window
+
+    async def _drain_batch(self, evento: str) -> int:
+        handler, max_size, window = self.batch_handlers[evento]
+        entries = await self.db.get_outbox_head(evento, max_size)
+        if not entries or self._batch_due_at(entries, max_size, window) > time.time():
+            return 0
+        try:
+            await handler([entry['payload'] for entry in entries])
+        except Exception as e:
+            await self._failed(entries, e)
+        else:
+            await self.db.complete_outbox_many([entry['id'] for entry in entries])
+        return len(entries)
+
+    async def _deliver(self, entry: dict):
+        handler = self.handlers.get(entry['evento'])
+        try:
+            if handler is None:
+                raise LookupError(f"Nenhum handler para o evento '{entry['evento']}'")
+            await handler(entry['payload'])
+        except Exception as e:
+            await self._failed([entry], e)
+        else:
+            await self.db.complete_outbox(entry['id'])
+
+    async def _failed(self, entries: List[dict], erro: Exception):
+        """Reschedule entries with exponential backoff, or give up on them"""
+        ids = [entry['id'] for entry in entries]
+        rotulo = f"Outbox #{ids[0]}" + (f" (+{len(ids) - 1})" if len(ids) > 1 else "")
+        evento = entries[0]['evento']
+
+        if isinstance(erro, RetryLater):
+            proxima = time.time() + erro.retry_after * random.uniform(1.0, 1.2)
+            print(f"⏳ {rotulo} ({evento}) adiado por {erro.retry_after:.0f}s: {erro}")
+            await self.db.retry_outbox_many(ids, str(erro), proxima, contar_tentativa=False)
+            return
+
+        tentativas = max(entry['tentativas'] for entry in entries) + 1
+        if tentativas >= settings.OUTBOX_MAX_ATTEMPTS:
+            proxima = None
+            print(f"❌ {rotulo} ({evento}) falhou após {tentativas} tentativas: {erro}")
+        else:
+            atraso = min(
+                settings.OUTBOX_BACKOFF_MAX_SECONDS,
+                settings.OUTBOX_BACKOFF_BASE_SECONDS * (2 ** (tentativas - 1))
+            )
+            proxima = time.time() + atraso * random.uniform(0.8, 1.2)
+            print(f"⚠️  {rotulo} ({evento}) falhou, nova tentativa em {atraso:.0f}s: {erro}")
+        await self.db.retry_outbox_many(ids, str(erro), proxima)
+
+
+async def _slack_user_id(slack_service: SlackService, nome_pessoa: str) -> Optional[str]:
+    """Slack user ID of a person, or None (the message falls back to the name)"""
+    user_slack_id = None
+    try:
+        # Mapeamento da aba PESSOAS em cache (só bloqueia a frio)
+        if slack_user_cache.ready:
+            user_slack_id = slack_user_cache.get(nome_pessoa)
+        else:
+            user_slack_id = await run_in_threadpool(slack_user_cache.get, nome_pessoa)
+
+        # If not found in mapping, try to search Slack directly
+        if not user_slack_id:
+            user_slack_id = await run_in_threadpool(slack_service.find_user_by_name, nome_pessoa)
+    except Exception as e:
+        print(f"⚠️  Erro ao buscar usuário no Slack: {e}")
+    return user_slack_id
+
+
+async def notify_slack(payload: dict):
+    """Send the transaction notification to Slack, mentioning the person"""
+    slack_service = SlackService()
+    if not slack_service.is_configured():
+        return  # Slack desligado: nada a entregar
+
+    enviado = await slack_service.send_transaction_notification(
+        tipo=payload['tipo'],
+        item_nome=payload['item_nome'],
+        quantidade=payload['quantidade'],
+        nome_pessoa=payload['nome_pessoa'],
+        user_id=await _slack_user_id(slack_service, payload['nome_pessoa']),
+        saldo_atual=payload['saldo_apos'],
+        estoque_minimo=payload['estoque_minimo']
+    )
+    if not enviado:
+        raise RuntimeError("Slack não confirmou o envio da mensagem")
+
+
+async def notify_slack_batch(payload: dict):
+    """Send one Slack message for all movements of a batch checkout"""
+    slack_service = SlackService()
+    if not slack_service.is_configured():
+        return  # Slack desligado: nada a entregar
+
+    enviado = await slack_service.send_batch_notification(
+        movimentos=payload['movimentos'],
+        nome_pessoa=payload['nome_pessoa'],
+        user_id=await _slack_user_id(slack_service, payload['nome_pessoa'])
+    )
+    if not enviado:
+        raise RuntimeError("Slack não confirmou o envio da mensagem")
+
+
+async def notify_low_stock(payloads: List[dict]):
+    """
+    Send the estoque_minimo crossings gathered in the window as one Slack message
+    Cada entrada só traz o item_id; o estado atual vem de estoque_alertas,
+    então várias transições do mesmo item viram uma linha e quem voltou ao
+    lado já avisado não gera mensagem.
+    """
+    db = AsyncDatabase()
+    item_ids = list(dict.fromkeys(payload['item_id'] for payload in payloads))
+    alertas = await db.get_pending_stock_alerts(item_ids)
+    if not alertas:
+        return
+
+    slack_service = SlackService()
+    if settings.LOW_STOCK_ALERTS_ENABLED and slack_service.is_configured():
+        if not await slack_service.send_low_stock_alert(alertas):
+            raise RuntimeError("Slack não confirmou o envio do alerta de estoque")
+
+    # Sem Slack o estado avança do mesmo jeito: não acumula alertas velhos
+    await db.mark_stock_alerts_notified([(alerta['item_id'], alerta['abaixo']) for alerta in alertas])
+
+
+async def append_history(payloads: List[dict]):
+    """Append a batch of transactions to the HISTÓRICO worksheet (one API call)"""
+    sheets_service = GoogleSheetsService()
+    if not sheets_service.is_configured():
+        return  # Sem planilha configurada: nada a entregar
+    try:
+        await sheets_service.append_rows_to_history(payloads)
+    except gspread.exceptions.APIError as e:
+        if e.response is not None and e.response.status_code == 429:
+            # Cota de escrita por minuto estourada: espera a janela virar
+            raise RetryLater(
+                "Cota de escrita do Google Sheets excedida",
+                settings.SHEETS_QUOTA_BACKOFF_SECONDS
+            ) from e
+        raise
+
+
+# Instância compartilhada pela aplicação
+outbox_worker = OutboxWorker()
+outbox_worker.register(EVENTO_SLACK_TRANSACAO, notify_slack)
+outbox_worker.register(EVENTO_SLACK_LOTE, notify_slack_batch)
+outbox_worker.register_batch(
+    EVENTO_SHEETS_HISTORICO,
+    append_history,
+    max_size=settings.HISTORY_BATCH_MAX_ROWS,
+    window=settings.HISTORY_BATCH_WINDOW_SECONDS
+)
+outbox_worker.register_batch(
+    EVENTO_ALERTA_ESTOQUE,
+    notify_low_stock,
+    max_size=settings.LOW_STOCK_ALERT_MAX_ITEMS,
+    window=settings.LOW_STOCK_ALERT_WINDOW_SECONDS
+)
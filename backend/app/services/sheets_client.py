@@ -0,0 +1,200 @@
+"""
+Sheets Client
+App-scoped gspread client with cached spreadsheet and worksheet handles
+"""
+
+import os
+import threading
+from typing import Any, Callable, Dict, List, Optional, TypeVar
+import gspread
+from google.auth.exceptions import RefreshError
+from google.oauth2.service_account import Credentials
+from app.config import settings
+
+T = TypeVar("T")
+
+# Required scopes for Google Sheets API
+SCOPES = [
+    'https://www.googleapis.com/auth/spreadsheets',
+    'https://www.googleapis.com/auth/drive'
+]
+
+
+class SheetsClient:
+    """
+    Shared Google Sheets connection
+    Autentica uma vez por processo e reaproveita a sessão HTTP (o token é
+    renovado sozinho pelo google-auth). A planilha e as abas ficam em cache;
+    só voltamos a buscar metadados quando um handle deixa de ser válido
+    (aba renomeada/apagada) e só reautenticamos se o token for recusado
+    ou a configuração mudar.
+    """
+
+    def __init__(self, spreadsheet_id: Optional[str] = None, credentials_file: Optional[str] = None):
+        self._spreadsheet_id = spreadsheet_id
+        self._credentials_file = credentials_file
+        self._lock = threading.RLock()
+        self._config: Optional[tuple] = None
+        self._client: Optional[gspread.Client] = None
+        self._spreadsheet: Optional[gspread.Spreadsheet] = None
+        self._worksheets: Dict[str, gspread.Worksheet] = {}
+        self._stats = {"connects": 0, "worksheet_lookups": 0, "reconnects": 0}
+
+    @property
+    def spreadsheet_id(self) -> str:
+        return self._spreadsheet_id or settings.GOOGLE_SHEETS_SPREADSHEET_ID
+
+    @property
+    def credentials_file(self) -> str:
+        return self._credentials_file or settings.GOOGLE_SHEETS_CREDENTIALS_FILE
+
+    def is_configured(self) -> bool:
+        """Check if spreadsheet ID and credentials file are available"""
+        return bool(self.spreadsheet_id and os.path.exists(self.credentials_file))
+
+    def spreadsheet(self) -> gspread.Spreadsheet:
+        """Get the spreadsheet, authenticating on first use"""
+        with self._lock:
+            config = (self.spreadsheet_id, self.credentials_file)
+            if self._spreadsheet is not None and self._config == config:
+                return self._spreadsheet
+
+            if not os.path.exists(self.credentials_file):
+                raise FileNotFoundError(
+                    f"Arquivo de credenciais não encontrado: {self.credentials_file}"
+                )
+            if not self.spreadsheet_id:
+                raise ValueError("GOOGLE_SHEETS_SPREADSHEET_ID não configurado")
+
+            creds = Credentials.from_service_account_file(self.credentials_file, scopes=SCOPES)
+            self._client = gspread.authorize(creds)
+            self._client.set_timeout(settings.SHEETS_HTTP_TIMEOUT_SECONDS)
+            self._spreadsheet = self._client.open_by_key(self.spreadsheet_id)
+            self._worksheets = {}
+            self._config = config
+            self._stats["connects"] += 1
+            return self._spreadsheet
+
+    def worksheet(self, title: str) -> gspread.Worksheet:
+        """Get a cached worksheet handle (raises gspread.WorksheetNotFound)"""
+        with self._lock:
+            spreadsheet = self.spreadsheet()
+            handle = self._worksheets.get(title)
+            if handle is None:
+                self._stats["worksheet_lookups"] += 1
+                handle = spreadsheet.worksheet(title)
+                self._worksheets[title] = handle
+            return handle
+
+    def add_worksheet(self, title: str, rows: int, cols: int) -> gspread.Worksheet:
+        """Create a worksheet and cache its handle"""
+        with self._lock:
+            handle = self.spreadsheet().add_worksheet(title=title, rows=rows, cols=cols)
+            self._worksheets[title] = handle
+            return handle
+
+    def get_or_create_worksheet(
+        self,
+        title: str,
+        rows: int,
+        cols: int,
+        header: Optional[List[Any]] = None
+    ) -> gspread.Worksheet:
+        """
+        Get a worksheet, creating it (with its header row) if missing
+        Atômico no processo: duas threads não criam a aba duas vezes
+        """
+        with self._lock:
+            try:
+                return self.worksheet(title)
+            except gspread.WorksheetNotFound:
+                handle = self.add_worksheet(title, rows, cols)
+                if header:
+                    handle.append_row(header)
+                return handle
+
+    def modified_time(self) -> str:
+        """Drive modifiedTime of the spreadsheet (one metadata request)"""
+        return self.spreadsheet().get_lastUpdateTime()
+
+    def run(self, title: str, func: Callable[[gspread.Worksheet], T]) -> T:
+        """
+        Call func(worksheet) with the cached handle
+        Se o handle estiver inválido ou o token for recusado, descarta o
+        cache e tenta uma única vez de novo.
+        """
+        try:
+            return func(self.worksheet(title))
+        except (RefreshError, gspread.exceptions.APIError) as e:
+            self._recover(e, title)
+        return func(self.worksheet(title))
+
+    def batch_values(self, titles: List[str]) -> Dict[str, List[List[Any]]]:
+        """
+        Read the raw value grids of several worksheets in one request
+        Usa values_batchGet (uma ida à API para todas as abas). Abas que não
+        existem ficam fora do resultado; como uma aba inexistente derruba o
+        batch inteiro (400), nesse caso lê aba por aba.
+        """
+        ranges = [gspread.utils.absolute_range_name(title) for title in titles]
+        try:
+            try:
+                resposta = self.spreadsheet().values_batch_get(ranges)
+            except (RefreshError, gspread.exceptions.APIError) as e:
+                self._recover(e)
+                resposta = self.spreadsheet().values_batch_get(ranges)
+        except gspread.exceptions.APIError as e:
+            if self._status(e) != 400:
+                raise
+            grids = {}
+            for title in titles:
+                try:
+                    grids[title] = self.run(title, lambda ws: ws.get_all_values())
+                except gspread.WorksheetNotFound:
+                    pass
+            return grids
+
+        value_ranges = resposta.get('valueRanges', [])
+        return {title: value_range.get('values', []) for title, value_range in zip(titles, value_ranges)}
+
+    @staticmethod
+    def _status(erro: gspread.exceptions.APIError) -> Optional[int]:
+        return erro.response.status_code if erro.response is not None else None
+
+    def _recover(self, erro: Exception, title: Optional[str] = None):
+        """Drop what the error invalidated, or re-raise if a retry won't help"""
+        if isinstance(erro, RefreshError):
+            self.reset()
+        elif self._status(erro) in (401, 403):
+            self.reset()
+        elif self._status(erro) in (400, 404) and title is not None:
+            self.invalidate(title)  # aba renomeada/apagada
+        else:
+            raise erro
+        with self._lock:
+            self._stats["reconnects"] += 1
+
+    def invalidate(self, title: Optional[str] = None):
+        """Drop one cached worksheet handle (or all of them)"""
+        with self._lock:
+            if title is None:
+                self._worksheets = {}
+            else:
+                self._worksheets.pop(title, None)
+
+    def reset(self):
+        """Drop the client; next call authenticates again"""
+        with self._lock:
+            self._client = None
+            self._spreadsheet = None
+            self._worksheets = {}
+            self._config = None
+
+    def stats(self) -> dict:
+        """How many times we authenticated and fetched worksheet metadata"""
+        with self._lock:
+            return dict(self._stats, cached_worksheets=sorted(self._worksheets))
+
+
+# Instância compartilhada pela aplicação
+sheets_client = SheetsClient()
@@ -3,9 +3,10 @@ Slack Service
 Handles Slack notifications
 """
 
+from fastapi.concurrency import run_in_threadpool
 from slack_sdk import WebClient
 from slack_sdk.errors import SlackApiError
-from typing import Optional, Dict
+from typing import Any, Dict, List, Optional
 from app.config import settings
 
 
@@ -81,7 +82,7 @@ class SlackService:
             # Get user mention
             user_mention = self.get_user_mention(user_id, nome_pessoa)
             
-            # Build message (sem alerta de estoque baixo)
+            # Build message (o alerta de estoque baixo sai à parte, só no cruzamento do mínimo)
             message = (
                 f"{emoji} *{action}*\n"
                 f"*Item:* {item_nome}\n"
@@ -90,8 +91,9 @@ class SlackService:
                 f"*Saldo atual:* {saldo_atual} unidade(s)"
             )
             
-            # Send message
-            response = self.client.chat_postMessage(
+            # Send message (em thread, o WebClient é bloqueante)
+            response = await run_in_threadpool(
+                self.client.chat_postMessage,
                 channel=self.channel,
                 text=message,
                 mrkdwn=True
@@ -103,6 +105,88 @@ class SlackService:
             print(f"Erro ao enviar mensagem ao Slack: {e}")
             return False
     
+    async def send_batch_notification(
+        self,
+        movimentos: List[Dict[str, Any]],
+        nome_pessoa: str,
+        user_id: Optional[str]
+    ) -> bool:
+        """Send one Slack message for a whole cart (POST /api/transactions/batch)"""
+        
+        if not self.is_configured():
+            print("Slack nao configurado ou desabilitado")
+            return False
+        
+        try:
+            tipos = {movimento['tipo'] for movimento in movimentos}
+            if tipos == {"retirada"}:
+                titulo = "📤 *RETIRADA*"
+            elif tipos == {"devolucao"}:
+                titulo = "📥 *DEVOLUÇÃO*"
+            else:
+                titulo = "🔄 *RETIRADA E DEVOLUÇÃO*"
+            
+            # Uma linha por item, na ordem do carrinho
+            linhas = [
+                f"{'📤' if movimento['tipo'] == 'retirada' else '📥'} {movimento['item_nome']}: "
+                f"{movimento['quantidade']} unidade(s) (saldo atual: {movimento['saldo_apos']})"
+                for movimento in movimentos
+            ]
+            message = (
+                f"{titulo} de {len(movimentos)} item(ns)\n"
+                f"*Responsável:* {self.get_user_mention(user_id, nome_pessoa)}\n"
+                + "\n".join(linhas)
+            )
+            
+            response = await run_in_threadpool(
+                self.client.chat_postMessage,
+                channel=self.channel,
+                text=message,
+                mrkdwn=True
+            )
+            
+            return response['ok']
+            
+        except SlackApiError as e:
+            print(f"Erro ao enviar mensagem ao Slack: {e}")
+            return False
+    
+    async def send_low_stock_alert(self, alertas: List[Dict[str, Any]]) -> bool:
+        """Send the estoque_minimo crossings (below and back to normal) in one message"""
+        
+        if not self.is_configured():
+            print("Slack nao configurado ou desabilitado")
+            return False
+        
+        def linha(alerta: Dict[str, Any]) -> str:
+            local = f" ({alerta['localizacao']})" if alerta.get('localizacao') else ""
+            return (
+                f"• {alerta['nome']}{local}: {alerta['quantidade_disponivel']} de "
+                f"{alerta['quantidade_total']} disponível(is), mínimo {alerta['estoque_minimo']}"
+            )
+        
+        try:
+            abaixo = [linha(a) for a in alertas if a['abaixo']]
+            normalizados = [linha(a) for a in alertas if not a['abaixo']]
+            blocos = []
+            if abaixo:
+                blocos.append("⚠️ *ESTOQUE BAIXO*\n" + "\n".join(abaixo))
+            if normalizados:
+                blocos.append("✅ *ESTOQUE NORMALIZADO*\n" + "\n".join(normalizados))
+            
+            response = await run_in_threadpool(
+                self.client.chat_postMessage,
+                channel=self.channel,
+                text="\n\n".join(blocos),
+                mrkdwn=True
+            )
+            
+            return response['ok']
+            
+        except SlackApiError as e:
+            print(f"Erro ao enviar alerta de estoque ao Slack: {e}")
+            return False
+    
     async def send_custom_message(self, message: str) -> bool:
         """Send custom message to Slack channel"""
         
@@ -110,7 +194,8 @@ class SlackService:
             return False
         
         try:
-            response = self.client.chat_postMessage(
+            response = await run_in_threadpool(
+                self.client.chat_postMessage,
                 channel=self.channel,
                 text=message,
                 mrkdwn=True
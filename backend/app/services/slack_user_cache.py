@@ -0,0 +1,175 @@
+"""
+Slack User Cache Service
+Process-wide TTL cache of the PESSOAS name → Slack user mapping
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional
+from app.config import settings
+from app.services.database import Database
+
+
+def _fetch_from_sheets() -> Dict[str, str]:
+    """Default loader: download the PESSOAS worksheet"""
+    from app.services.google_sheets import GoogleSheetsService
+    return GoogleSheetsService().fetch_slack_user_mapping()
+
+
+class SlackUserMappingCache:
+    """
+    TTL cache with stale-while-revalidate
+    Consultas são servidas da memória. Quando a cópia passa do TTL ela
+    continua sendo usada enquanto um worker em segundo plano (sempre a
+    mesma thread, com a mesma conexão SQLite) baixa a aba PESSOAS de
+    novo; se o Google falhar, a cópia anterior é mantida. A cópia também
+    é gravada no SQLite para uma partida a frio sem rede.
+    """
+
+    def __init__(
+        self,
+        loader: Callable[[], Dict[str, str]] = _fetch_from_sheets,
+        ttl_seconds: Optional[float] = None,
+        db_path: Optional[str] = None,
+        persist: Optional[bool] = None
+    ):
+        self.loader = loader
+        self.ttl_seconds = ttl_seconds
+        self.db_path = db_path
+        self.persist = settings.SLACK_USER_CACHE_PERSIST if persist is None else persist
+        self._lock = threading.Lock()
+        self._mapping: Optional[Dict[str, str]] = None
+        self._loaded_at = 0.0
+        self._refreshing = False
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._stats = {
+            "hits": 0,
+            "stale_hits": 0,
+            "misses": 0,
+            "refreshes": 0,
+            "refresh_errors": 0,
+            "last_refresh_seconds": None,
+            "last_refresh_at": None,
+            "last_error": None,
+        }
+
+    @property
+    def ttl(self) -> float:
+        return settings.SLACK_USER_CACHE_TTL_SECONDS if self.ttl_seconds is None else self.ttl_seconds
+
+    @property
+    def ready(self) -> bool:
+        """True when lookups are served from memory without blocking"""
+        return self._mapping is not None
+
+    def get(self, nome: str) -> Optional[str]:
+        """Look up the Slack user of a person (case-insensitive)"""
+        return self.mapping().get(nome.strip().lower())
+
+    def mapping(self) -> Dict[str, str]:
+        """
+        Get the whole mapping
+        Só bloqueia na primeira consulta sem cópia em memória nem no SQLite
+        """
+        with self._lock:
+            if self._mapping is None and self.persist:
+                self._load_persisted()
+
+            if self._mapping is None:
+                self._stats["misses"] += 1
+            else:
+                if time.time() - self._loaded_at < self.ttl:
+                    self._stats["hits"] += 1
+                else:
+                    self._stats["stale_hits"] += 1
+                    self._start_background_refresh()
+                return self._mapping
+
+        # Cache vazio: carrega de forma síncrona (fora do lock)
+        self.refresh()
+        with self._lock:
+            return self._mapping or {}
+
+    def refresh(self) -> bool:
+        """Download the mapping now; keeps the previous copy on error"""
+        inicio = time.perf_counter()
+        try:
+            mapping = self.loader()
+        except Exception as e:
+            with self._lock:
+                self._stats["refresh_errors"] += 1
+                self._stats["last_error"] = str(e)
+                self._refreshing = False
+                if self._mapping is None:
+                    # Sem cópia nenhuma: serve vazio e tenta de novo em 1 minuto
+                    self._mapping = {}
+                    self._loaded_at = time.time() - self.ttl + 60
+            print(f"⚠️  Erro ao atualizar mapeamento PESSOAS → Slack: {e}")
+            return False
+
+        duracao = time.perf_counter() - inicio
+        with self._lock:
+            self._mapping = mapping
+            self._loaded_at = time.time()
+            self._refreshing = False
+            self._stats["refreshes"] += 1
+            self._stats["last_refresh_seconds"] = round(duracao, 4)
+            self._stats["last_refresh_at"] = self._loaded_at
+            self._stats["last_error"] = None
+
+        if self.persist:
+            try:
+                Database(self.db_path).save_slack_user_mapping_copy(mapping)
+            except Exception as e:
+                print(f"⚠️  Erro ao salvar cópia local do mapeamento Slack: {e}")
+        return True
+
+    def invalidate(self):
+        """Force the next lookup to start a refresh"""
+        with self._lock:
+            self._loaded_at = 0.0
+
+    def stats(self) -> dict:
+        """Hit rate, refresh timing and size of the cache"""
+        with self._lock:
+            stats = dict(self._stats)
+            consultas = stats["hits"] + stats["stale_hits"] + stats["misses"]
+            stats["lookups"] = consultas
+            stats["hit_rate"] = round((stats["hits"] + stats["stale_hits"]) / consultas, 4) if consultas else None
+            stats["size"] = len(self._mapping) if self._mapping is not None else 0
+            stats["age_seconds"] = round(time.time() - self._loaded_at, 1) if self._mapping is not None else None
+            stats["ttl_seconds"] = self.ttl
+            stats["refreshing"] = self._refreshing
+            return stats
+
+    def _load_persisted(self):
+        """Load the SQLite copy into memory (lock held)"""
+        try:
+            mapping, saved_at = Database(self.db_path).get_slack_user_mapping_copy()
+        except Exception as e:
+            print(f"⚠️  Erro ao ler cópia local do mapeamento Slack: {e}")
+            return
+        if saved_at is not None:
+            self._mapping = mapping
+            self._loaded_at = saved_at
+
+    def _start_background_refresh(self):
+        """Queue one refresh on the background worker if none is running (lock held)"""
+        if self._refreshing:
+            return
+        self._refreshing = True
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="slack-user-cache")
+        self._executor.submit(self.refresh)
+
+    def shutdown(self):
+        """Stop the background worker (application shutdown)"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False)
+
+
+# Instância compartilhada pela aplicação
+slack_user_cache = SlackUserMappingCache()
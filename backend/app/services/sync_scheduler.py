@@ -0,0 +1,164 @@
+"""
+Sync Scheduler
+Periodic Google Sheets sync with single-flight execution
+"""
+
+import asyncio
+import time
+from datetime import datetime
+from typing import Awaitable, Callable, Optional
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
+from apscheduler.triggers.interval import IntervalTrigger
+from app.config import settings
+
+SyncFunc = Callable[[bool], Awaitable[dict]]
+
+
+class SyncTimeoutError(Exception):
+    """The sync did not finish within SYNC_TIMEOUT_SECONDS (it keeps running)"""
+    pass
+
+
+async def _sync_from_sheets(full: bool) -> dict:
+    """Default sync: incremental sync from Google Sheets"""
+    from app.services.google_sheets import GoogleSheetsService
+    return await GoogleSheetsService().sync_from_sheets(full=full)
+
+
+class SyncScheduler:
+    """
+    Runs the Sheets sync on a schedule and on demand, one at a time
+    Quem pede um sync enquanto outro está rodando (botão, agendamento,
+    startup) espera o mesmo resultado em vez de começar outro. Se o sync
+    passar de SYNC_TIMEOUT_SECONDS quem espera recebe SyncTimeoutError,
+    mas o lock só é liberado quando a thread do sync realmente termina.
+    """
+
+    def __init__(self, sync_func: SyncFunc = _sync_from_sheets):
+        self.sync_func = sync_func
+        self._work: Optional[asyncio.Future] = None  # o sync em si
+        self._result: Optional[asyncio.Future] = None  # o que os chamadores aguardam
+        self._scheduler: Optional[AsyncIOScheduler] = None
+        self._started = 0.0  # perf_counter do início do sync atual
+        self._timed_out = False  # quem esperava desistiu; o resultado vem por _on_work_done
+        self._status = {
+            "trigger": None,
+            "started_at": None,
+            "finished_at": None,
+            "duration_seconds": None,
+            "result": None,
+            "error": None,
+            "last_success_at": None,
+            "runs": 0,
+            "failures": 0,
+            "joined": 0,
+        }
+
+    @property
+    def running(self) -> bool:
+        return self._work is not None and not self._work.done()
+
+    async def run(self, trigger: str = "manual", full: bool = False) -> dict:
+        """Run a sync, or join the one already running"""
+        if self.running:
+            self._status["joined"] += 1
+        else:
+            self._work = asyncio.ensure_future(self.sync_func(full))
+            self._work.add_done_callback(self._on_work_done)
+            self._result = asyncio.ensure_future(self._track(self._work, trigger))
+        return await asyncio.shield(self._result)
+
+    async def _track(self, work: asyncio.Future, trigger: str) -> dict:
+        inicio = self._started = time.perf_counter()
+        self._timed_out = False
+        self._status.update(
+            trigger=trigger,
+            started_at=datetime.now().isoformat(),
+            finished_at=None,
+            duration_seconds=None,
+            error=None
+        )
+        self._status["runs"] += 1
+        try:
+            result = await asyncio.wait_for(asyncio.shield(work), timeout=settings.SYNC_TIMEOUT_SECONDS)
+        except asyncio.TimeoutError:
+            self._timed_out = True
+            self._status["failures"] += 1
+            self._status["error"] = f"Sync excedeu {settings.SYNC_TIMEOUT_SECONDS:g}s (ainda em andamento)"
+            raise SyncTimeoutError(self._status["error"])
+        except Exception as e:
+            self._status["failures"] += 1
+            self._status["result"] = None
+            self._status["error"] = str(e)
+            self._finish(inicio)
+            raise
+        self._status["result"] = result
+        self._status["last_success_at"] = datetime.now().isoformat()
+        self._finish(inicio)
+        return result
+
+    def _finish(self, inicio: float):
+        self._status["finished_at"] = datetime.now().isoformat()
+        self._status["duration_seconds"] = round(time.perf_counter() - inicio, 3)
+
+    def _on_work_done(self, work: asyncio.Future):
+        """Record a sync that only finished after its callers timed out"""
+        if not self._timed_out or work.cancelled():
+            return
+        erro = work.exception()
+        if erro is None:
+            self._status["result"] = work.result()
+            self._status["last_success_at"] = datetime.now().isoformat()
+            self._status["error"] = None
+        else:
+            # O timeout já contou como falha; fica o erro real no lugar dele
+            self._status["result"] = None
+            self._status["error"] = str(erro)
+            print(f"Erro no sync (depois do timeout): {erro}")
+        self._finish(self._started)
+
+    async def _scheduled_run(self):
+        try:
+            await self.run(trigger="agendado")
+        except Exception as e:
+            print(f"Erro no sync agendado: {e}")
+
+    def start(self):
+        """Schedule the periodic sync on the running event loop"""
+        if settings.SYNC_INTERVAL_MINUTES <= 0 or self._scheduler is not None:
+            return
+        self._scheduler = AsyncIOScheduler()
+        self._scheduler.add_job(
+            self._scheduled_run,
+            IntervalTrigger(minutes=settings.SYNC_INTERVAL_MINUTES, jitter=settings.SYNC_JITTER_SECONDS),
+            id="sheets-sync",
+            max_instances=1,
+            coalesce=True
+        )
+        self._scheduler.start()
+        print(f"Sync agendado a cada {settings.SYNC_INTERVAL_MINUTES} min (jitter {settings.SYNC_JITTER_SECONDS}s)")
+
+    def shutdown(self):
+        """Stop scheduling (a sync in progress finishes on its own)"""
+        if self._scheduler is not None:
+            self._scheduler.shutdown(wait=False)
+            self._scheduler = None
+
+    def status(self) -> dict:
+        """Last run, duration, result and next scheduled run"""
+        proxima = None
+        if self._scheduler is not None:
+            job = self._scheduler.get_job("sheets-sync")
+            if job is not None and job.next_run_time is not None:
+                proxima = job.next_run_time.isoformat()
+        return dict(
+            self._status,
+            running=self.running,
+            interval_minutes=settings.SYNC_INTERVAL_MINUTES,
+            timeout_seconds=settings.SYNC_TIMEOUT_SECONDS,
+            next_run_at=proxima
+        )
+
+
+# Instância compartilhada pela aplicação
+sync_scheduler = SyncScheduler()
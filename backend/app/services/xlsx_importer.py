@@ -0,0 +1,59 @@
+"""
+XLSX Importer
+Offline import of the 5S inventory workbook into the local database
+"""
+
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from openpyxl import load_workbook
+from app.services.database import Database
+from app.services.inventory_sync import iter_grid_records, sync_source
+
+# Abas com o inventário 5S (mesmas do sync com o Google Sheets)
+ABAS_INVENTARIO = ["Produto", "Mecânica", "Eletrônica"]
+
+
+def _cell_value(valor: Any) -> Any:
+    """Excel guarda números como float: 123.0 vira 123, como no Sheets"""
+    if isinstance(valor, float) and valor.is_integer():
+        return int(valor)
+    if valor is None:
+        return ""
+    return valor
+
+
+def iter_xlsx_records(path: str, abas: Optional[List[str]] = None, workbook=None) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """
+    Source over the inventory tabs of a workbook, as (aba, record)
+    Modo read_only do openpyxl: as linhas são lidas do XML sob demanda,
+    então a memória não cresce com o tamanho da planilha
+    """
+    wb = workbook or load_workbook(path, read_only=True, data_only=True)
+    try:
+        for aba_nome in abas or ABAS_INVENTARIO:
+            if aba_nome not in wb.sheetnames:
+                print(f"Aba '{aba_nome}' nao encontrada, pulando...")
+                continue
+            yield from iter_grid_records(aba_nome, wb[aba_nome].iter_rows(values_only=True), _cell_value)
+    finally:
+        if workbook is None:
+            wb.close()
+
+
+def import_xlsx(path: str, db: Optional[Database] = None, abas: Optional[List[str]] = None) -> dict:
+    """
+    Import the inventory workbook (blocking)
+    Mesmo pipeline do sync com o Google Sheets. Os snapshots do sync
+    incremental são descartados: depois de um import, o próximo sync
+    relê todas as abas.
+    """
+    db = db or Database()
+    db.init_db()
+    db.clear_sheet_snapshots()
+
+    resultado = sync_source(db, iter_xlsx_records(path, abas))
+    if resultado["success"]:
+        print(f"Importacao concluida:")
+        print(f"   - {resultado['registros_lidos']} registros lidos")
+        print(f"   - {resultado['itens_unicos']} itens unicos")
+        print(f"   - {resultado['items_novos']} novos | {resultado['items_atualizados']} atualizados")
+    return resultado
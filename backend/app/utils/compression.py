@@ -0,0 +1,192 @@
+"""
+Response Compression Utilities
+gzip sempre; brotli quando o pacote `brotli` estiver instalado (opcional)
+"""
+
+import gzip
+import zlib
+from pathlib import Path
+from typing import List, Optional
+
+import anyio.to_thread
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:  # Sem brotli o servidor só oferece gzip
+    brotli = None
+
+# Extensões que vale a pena pré-comprimir (imagens e fontes já vêm comprimidas)
+COMPRESSIBLE_SUFFIXES = {".html", ".css", ".js", ".json", ".svg", ".txt"}
+
+# Tipos que passam sem compressão: SSE precisa de cada evento na hora e os
+# demais já são comprimidos
+EXCLUDED_CONTENT_TYPES = (
+    "text/event-stream", "image/", "audio/", "video/", "font/woff",
+    "application/gzip", "application/x-gzip", "application/zip"
+)
+
+# Pedaços a partir deste tamanho são comprimidos numa thread (o mesmo corte
+# do GZipMiddleware do Starlette): comprimir 1 MB de JSON no event loop
+# seguraria todas as outras requisições do Pi
+THREAD_MINIMUM_BYTES = 128 * 1024
+
+
+def accepted_encodings(accept_encoding: Optional[str]) -> List[str]:
+    """Encodings from Accept-Encoding the server can produce, best first"""
+    aceitos = set()
+    for parte in (accept_encoding or "").split(","):
+        nome, _, params = parte.strip().partition(";")
+        chave, _, valor = params.strip().partition("=")
+        try:
+            if chave.strip() == "q" and float(valor) <= 0:
+                continue  # "gzip;q=0" recusa explicitamente
+        except ValueError:
+            pass
+        aceitos.add(nome.strip().lower())
+    ordem = ["br", "gzip"] if brotli is not None else ["gzip"]
+    return [encoding for encoding in ordem if encoding in aceitos]
+
+
+class CompressionResponder:
+    """
+    Compress one response with `encoding` ("br" or "gzip")
+    O start é segurado até o primeiro pedaço do corpo: corpo pequeno sai
+    como está; corpo em streaming é comprimido com flush a cada pedaço.
+    """
+
+    def __init__(self, app: ASGIApp, encoding: str, minimum_size: int, compresslevel: int, brotli_quality: int):
+        self.app = app
+        self.encoding = encoding
+        self.minimum_size = minimum_size
+        self.compresslevel = compresslevel
+        self.brotli_quality = brotli_quality
+        self.send: Optional[Send] = None
+        self.initial_message: Optional[Message] = None
+        self.passthrough = False
+        self.started = False
+        self._compressor = None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        self.send = send
+        await self.app(scope, receive, self.send_with_compression)
+
+    async def send_with_compression(self, message: Message) -> None:
+        tipo = message["type"]
+        if tipo == "http.response.start":
+            headers = Headers(raw=message["headers"])
+            media_type = headers.get("content-type", "").partition(";")[0].strip().lower()
+            # Já comprimida (.br/.gz do StaticAssets), parcial ou de tipo excluído: passa direto
+            self.passthrough = (
+                "content-encoding" in headers
+                or message["status"] == 206
+                or media_type.startswith(EXCLUDED_CONTENT_TYPES)
+            )
+            if self.passthrough:
+                await self.send(message)
+            else:
+                self.initial_message = message
+            return
+
+        if self.passthrough or tipo not in ("http.response.body", "http.response.pathsend"):
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        if not self.started:
+            self.started = True
+            if tipo == "http.response.pathsend" or (len(body) < self.minimum_size and not more_body):
+                self.passthrough = True
+                await self.send(self.initial_message)
+                await self.send(message)
+                return
+            headers = MutableHeaders(raw=self.initial_message["headers"])
+            headers.add_vary_header("Accept-Encoding")
+            headers["Content-Encoding"] = self.encoding
+            message["body"] = await self.compress(body, more_body)
+            if more_body:
+                del headers["Content-Length"]
+            else:
+                headers["Content-Length"] = str(len(message["body"]))
+            await self.send(self.initial_message)
+            await self.send(message)
+            return
+
+        message["body"] = await self.compress(body, more_body)
+        await self.send(message)
+
+    async def compress(self, body: bytes, more_body: bool) -> bytes:
+        """Compress one chunk, off the event loop when it is large"""
+        if len(body) >= THREAD_MINIMUM_BYTES:
+            return await anyio.to_thread.run_sync(self._compress, body, more_body)
+        return self._compress(body, more_body)
+
+    def _compress(self, body: bytes, more_body: bool) -> bytes:
+        if self.encoding == "br":
+            if self._compressor is None:
+                self._compressor = brotli.Compressor(quality=self.brotli_quality)
+            if more_body:
+                # Flush a cada pedaço: mensagens em streaming chegam sem atraso
+                return self._compressor.process(body) + self._compressor.flush()
+            return self._compressor.process(body) + self._compressor.finish()
+
+        if self._compressor is None:
+            self._compressor = zlib.compressobj(self.compresslevel, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        if more_body:
+            return self._compressor.compress(body) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+        return self._compressor.compress(body) + self._compressor.flush()
+
+
+class CompressionMiddleware:
+    """
+    Compress responses above `minimum_size` with brotli or gzip
+    Respostas que já têm Content-Encoding (arquivos .br/.gz servidos pelo
+    StaticAssets) passam direto, assim como text/event-stream (SSE).
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: int = 1000, compresslevel: int = 6, brotli_quality: int = 5):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.compresslevel = compresslevel
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        encodings = accepted_encodings(Headers(scope=scope).get("accept-encoding")) if scope["type"] == "http" else []
+        if not encodings:
+            await self.app(scope, receive, send)
+            return
+        responder = CompressionResponder(
+            self.app,
+            encodings[0],
+            self.minimum_size,
+            self.compresslevel,
+            self.brotli_quality
+        )
+        await responder(scope, receive, send)
+
+
+def precompress_file(path: Path, minimum_size: int = 1000) -> List[Path]:
+    """
+    Write path.gz (and path.br with brotli) next to a static file
+    Só regrava quando o original mudou depois da última compressão.
+    Retorna os arquivos gerados.
+    """
+    dados = None
+    gerados = []
+    if path.stat().st_size < minimum_size:
+        return gerados
+
+    alvos = [(path.with_name(path.name + ".gz"), lambda d: gzip.compress(d, compresslevel=9, mtime=0))]
+    if brotli is not None:
+        alvos.append((path.with_name(path.name + ".br"), lambda d: brotli.compress(d, quality=11)))
+
+    for destino, comprimir in alvos:
+        if destino.exists() and destino.stat().st_mtime_ns >= path.stat().st_mtime_ns:
+            continue
+        if dados is None:
+            dados = path.read_bytes()
+        destino.write_bytes(comprimir(dados))
+        gerados.append(destino)
+    return gerados
@@ -0,0 +1,37 @@
+"""
+Keyset Pagination Utilities
+Cursores opacos: a chave de ordenação da última linha, em base64url
+"""
+
+import base64
+import json
+from typing import Any, List, Optional, Tuple
+
+
+def encode_cursor(values: List[Any]) -> str:
+    """Encode the sort key of the last returned row"""
+    raw = json.dumps(values, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str], types: Tuple[type, ...]) -> Optional[tuple]:
+    """
+    Decode a cursor into a tuple matching `types`; ValueError if invalid
+    Ex.: decode_cursor(cursor, (str, int)) para a chave (nome, id). Confere
+    a quantidade e o tipo de cada valor, então um cursor forjado vira 400
+    em vez de estourar na comparação com as chaves.
+    """
+    if not cursor:
+        return None
+    try:
+        padding = "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(cursor + padding))
+    except (ValueError, TypeError) as e:
+        raise ValueError("Cursor inválido") from e
+    if not isinstance(values, list) or len(values) != len(types):
+        raise ValueError("Cursor inválido")
+    for value, expected in zip(values, types):
+        # bool é subclasse de int no Python, mas não é um id válido
+        if not isinstance(value, expected) or isinstance(value, bool):
+            raise ValueError("Cursor inválido")
+    return tuple(values)
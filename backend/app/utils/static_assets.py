@@ -0,0 +1,115 @@
+"""
+Static Frontend Serving
+URLs com hash do conteúdo (?v=<hash>), cache immutable e arquivos .br/.gz
+pré-comprimidos (gerados por compress_static.py)
+"""
+
+import hashlib
+import os
+import re
+from mimetypes import guess_type
+from typing import Dict, Optional, Tuple
+
+import anyio.to_thread
+from starlette.datastructures import Headers, QueryParams
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+from starlette.types import Scope
+
+from app.utils.compression import accepted_encodings
+
+PRECOMPRESSED_SUFFIXES = {"br": ".br", "gzip": ".gz"}
+
+# href="/static/..." e src="/static/..." do index.html (com ou sem ?v=)
+ASSET_URL = re.compile(r'(?P<attr>(?:href|src)=")/static/(?P<path>[^"?#]+)(?:\?v=[^"#]*)?"')
+
+# caminho → (mtime_ns, tamanho, hash); só refaz o hash quando o arquivo muda
+_versions: Dict[str, Tuple[int, int, str]] = {}
+
+
+def asset_version(path: str) -> Optional[str]:
+    """Short content hash of a static file, or None if it does not exist"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    cached = _versions.get(path)
+    if cached and cached[:2] == (stat.st_mtime_ns, stat.st_size):
+        return cached[2]
+    with open(path, "rb") as f:
+        version = hashlib.sha256(f.read()).hexdigest()[:12]
+    _versions[path] = (stat.st_mtime_ns, stat.st_size, version)
+    return version
+
+
+def render_index(frontend_path: str) -> Tuple[bytes, str]:
+    """
+    Get (html, etag) of index.html with content-hashed asset URLs
+    O ?v= escrito à mão no index.html é trocado pelo hash do arquivo, então
+    basta editar o JS/CSS: a URL muda sozinha e o cache antigo é ignorado.
+    """
+    with open(os.path.join(frontend_path, "index.html"), encoding="utf-8") as f:
+        html = f.read()
+
+    def versionar(match: re.Match) -> str:
+        version = asset_version(os.path.join(frontend_path, match.group("path")))
+        if version is None:
+            return match.group(0)
+        return f'{match.group("attr")}/static/{match.group("path")}?v={version}"'
+
+    body = ASSET_URL.sub(versionar, html).encode("utf-8")
+    # Fraco: o middleware de compressão pode mudar os bytes entregues
+    etag = f'W/"{hashlib.sha256(body).hexdigest()[:16]}"'
+    return body, etag
+
+
+class StaticAssets(StaticFiles):
+    """
+    StaticFiles with precompressed variants and cache headers
+    Com ?v= igual ao hash atual do arquivo a resposta é immutable por
+    `max_age` segundos; sem ele (ou com hash antigo) o navegador revalida
+    pelo ETag a cada uso.
+    """
+
+    def __init__(self, *, directory: str, max_age: int = 31536000, **kwargs):
+        super().__init__(directory=directory, **kwargs)
+        self.max_age = max_age
+
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        full_path, stat_result = await anyio.to_thread.run_sync(self.lookup_path, path)
+        response = None
+        if stat_result is not None and os.path.isfile(full_path):
+            response = await anyio.to_thread.run_sync(self._precompressed, full_path, stat_result, scope)
+        if response is None:
+            response = await super().get_response(path, scope)
+
+        if response.status_code in (200, 304) and full_path:
+            requested = QueryParams(scope.get("query_string", b"")).get("v")
+            if requested and requested == await anyio.to_thread.run_sync(asset_version, full_path):
+                response.headers["Cache-Control"] = f"public, max-age={self.max_age}, immutable"
+            else:
+                response.headers["Cache-Control"] = "no-cache"
+        return response
+
+    def _precompressed(self, full_path: str, stat_result: os.stat_result, scope: Scope) -> Optional[Response]:
+        """Serve full_path.br / full_path.gz when accepted and not older than the original"""
+        request_headers = Headers(scope=scope)
+        for encoding in accepted_encodings(request_headers.get("accept-encoding")):
+            candidate = full_path + PRECOMPRESSED_SUFFIXES[encoding]
+            try:
+                candidate_stat = os.stat(candidate)
+            except OSError:
+                continue
+            if candidate_stat.st_mtime_ns < stat_result.st_mtime_ns:
+                continue  # Original editado depois da compressão
+
+            response = FileResponse(
+                candidate,
+                stat_result=candidate_stat,
+                media_type=guess_type(full_path)[0] or "text/plain",
+                headers={"Content-Encoding": encoding, "Vary": "Accept-Encoding"}
+            )
+            if self.is_not_modified(response.headers, request_headers):
+                return NotModifiedResponse(response.headers)
+            return response
+        return None
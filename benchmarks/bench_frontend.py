@@ -0,0 +1,197 @@
+"""
+Bytes transferidos e tempo de carga da página do quiosque, antes/depois
+da compressão e do cache HTTP
+Sobe em processo (lifespan + httpx ASGITransport, banco temporário) duas
+montagens do mesmo app:
+  - antes:  StaticFiles sem cabeçalhos de cache, index.html direto, sem compressão
+  - depois: o app de app.main (CompressionMiddleware, StaticAssets, index com ETag)
+e carrega a página como o navegador faz: GET /, os CSS/JS do index.html,
+depois /api/items e /api/health. O "navegador" guarda o cache HTTP:
+  - frio:   cache vazio
+  - quente: segunda visita; o que é fresco (max-age/immutable) nem sai do
+            cache e o resto é revalidado com If-None-Match/If-Modified-Since
+            (resposta sem Cache-Control conta como revalidada, como no F5)
+
+Bytes = cabeçalhos + corpo como vão no fio. O tempo de carga soma o tempo
+medido do servidor a um modelo do Wi-Fi da oficina (--bandwidth-kbps,
+--rtt-ms): HTML, depois os assets em paralelo dividindo a banda, depois a
+API. Sem compress_static.py rodado, o "depois" comprime os assets na hora.
+
+Execute: python benchmarks/bench_frontend.py [--items 600] [--bandwidth-kbps 2000] [--rtt-ms 40]
+         [--encoding "gzip, deflate, br"] [--output resultado.json]
+"""
+import argparse
+import asyncio
+import json
+import os
+import re
+import sys
+import time
+
+# Add benchmarks to path (fixtures puts backend there too)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from fixtures import NOMES, banco_temporario, populate, sync_desligado
+banco_temporario("frontend.db")
+
+import httpx
+from fastapi import FastAPI
+from fastapi.responses import FileResponse
+from fastapi.staticfiles import StaticFiles
+from app.main import app, frontend_path
+from app.routes import items, transactions, settings as settings_routes
+from app.services.database import Database
+from app.services.sync_scheduler import sync_scheduler
+
+ASSET = re.compile(r'(?:href|src)="(/static/[^"]+)"')
+
+
+def app_antes():
+    """The app as it was mounted before compression and cache headers"""
+    antes = FastAPI()
+    antes.include_router(items.router, prefix="/api")
+    antes.include_router(transactions.router, prefix="/api")
+    antes.include_router(settings_routes.router, prefix="/api")
+    antes.mount("/static", StaticFiles(directory=frontend_path), name="static")
+
+    @antes.get("/")
+    async def serve_frontend():
+        return FileResponse(os.path.join(frontend_path, "index.html"))
+
+    @antes.get("/api/health")
+    async def health_check():
+        return {"status": "healthy", "version": "1.0.0"}
+
+    return antes
+
+
+class Navegador:
+    """HTTP cache of one kiosk browser: URL → (validators, freshness)"""
+
+    def __init__(self, http, encoding):
+        self.http = http
+        self.encoding = encoding
+        self.cache = {}
+
+    async def get(self, url):
+        """Fetch through the cache; (wire_bytes, server_s, status) or None if served from cache"""
+        guardado = self.cache.get(url)
+        if guardado and guardado["fresco_ate"] > time.time():
+            return None
+
+        headers = {"Accept-Encoding": self.encoding}
+        if guardado and guardado["etag"]:
+            headers["If-None-Match"] = guardado["etag"]
+        if guardado and guardado["last_modified"]:
+            headers["If-Modified-Since"] = guardado["last_modified"]
+
+        inicio = time.perf_counter()
+        resposta = await self.http.get(url, headers=headers)
+        servidor = time.perf_counter() - inicio
+        assert resposta.status_code in (200, 304), f"{url}: HTTP {resposta.status_code}"
+
+        cabecalhos = sum(len(k) + len(v) + 4 for k, v in resposta.headers.raw) + len("HTTP/1.1 200 OK\r\n\r\n")
+        if resposta.status_code == 200:
+            self.cache[url] = {
+                "etag": resposta.headers.get("etag"),
+                "last_modified": resposta.headers.get("last-modified"),
+                "fresco_ate": time.time() + max_age(resposta.headers.get("cache-control", "")),
+                "corpo": resposta.content
+            }
+        return cabecalhos + resposta.num_bytes_downloaded, servidor, resposta.status_code
+
+
+def max_age(cache_control):
+    """Seconds a response may be reused without asking (0 = revalidate)"""
+    if "no-cache" in cache_control or "no-store" in cache_control:
+        return 0
+    match = re.search(r"max-age=(\d+)", cache_control)
+    return int(match.group(1)) if match else 0
+
+
+async def carregar_pagina(navegador, banda, rtt):
+    """One page load: bytes, requests, 304s, cache hits and modeled seconds"""
+    totais = {"bytes": 0, "requisicoes": 0, "nao_modificados": 0, "do_cache": 0}
+
+    def contar(resultado):
+        if resultado is None:
+            totais["do_cache"] += 1
+            return 0, 0.0
+        tamanho, servidor, status = resultado
+        totais["bytes"] += tamanho
+        totais["requisicoes"] += 1
+        totais["nao_modificados"] += status == 304
+        return tamanho, servidor
+
+    tamanho, servidor = contar(await navegador.get("/"))
+    tempo = rtt + servidor + tamanho / banda
+
+    html = navegador.cache["/"]["corpo"].decode("utf-8")
+    resultados = await asyncio.gather(*(navegador.get(url) for url in ASSET.findall(html)))
+    medidos = [contar(r) for r in resultados]
+    if any(r is not None for r in resultados):
+        tempo += rtt + max(s for _, s in medidos) + sum(t for t, _ in medidos) / banda
+
+    api = [contar(await navegador.get(url)) for url in ("/api/items", "/api/health")]
+    tempo += rtt + max(s for _, s in api) + sum(t for t, _ in api) / banda
+
+    totais["tempo_s"] = tempo
+    return totais
+
+
+async def medir(nome, asgi_app, args):
+    banda = args.bandwidth_kbps * 1000 / 8
+    rtt = args.rtt_ms / 1000
+    transport = httpx.ASGITransport(app=asgi_app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://kiosk", timeout=60) as http:
+        navegador = Navegador(http, args.encoding)
+        frio = await carregar_pagina(navegador, banda, rtt)
+        quente = await carregar_pagina(navegador, banda, rtt)
+    return {"montagem": nome, "frio": frio, "quente": quente}
+
+
+async def rodar(args):
+    sync_scheduler.sync_func = sync_desligado
+    populate(args.items, unidades=5, nomes=NOMES)
+    async with app.router.lifespan_context(app):
+        return [await medir("antes", app_antes(), args), await medir("depois", app, args)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bytes e tempo de carga da página, antes/depois do cache HTTP")
+    parser.add_argument("--items", type=int, default=600)
+    parser.add_argument("--bandwidth-kbps", type=float, default=2000.0, help="Banda do Wi-Fi modelada")
+    parser.add_argument("--rtt-ms", type=float, default=40.0)
+    parser.add_argument("--encoding", default="gzip, deflate, br", help="Accept-Encoding do navegador")
+    parser.add_argument("--output", default=None, help="Salva o resultado em JSON")
+    args = parser.parse_args()
+
+    print("=" * 80)
+    print(f"CARGA DA PÁGINA: {args.items} itens | {args.bandwidth_kbps:.0f} kbit/s, RTT {args.rtt_ms:.0f}ms | "
+          f"Accept-Encoding: {args.encoding}")
+    print("=" * 80)
+
+    resultados = asyncio.run(rodar(args))
+
+    print(f"   {'montagem':<8} {'visita':<7} {'bytes':>10} {'req':>4} {'304':>4} {'cache':>5} {'tempo':>8}")
+    for resultado in resultados:
+        for visita in ("frio", "quente"):
+            r = resultado[visita]
+            print(f"   {resultado['montagem']:<8} {visita:<7} {r['bytes']:>10,} {r['requisicoes']:>4} "
+                  f"{r['nao_modificados']:>4} {r['do_cache']:>5} {r['tempo_s'] * 1000:>6.0f}ms")
+
+    antes, depois = resultados
+    for visita in ("frio", "quente"):
+        reducao = 1 - depois[visita]["bytes"] / antes[visita]["bytes"]
+        print(f"   {visita}: {reducao:.0%} menos bytes, "
+              f"{antes[visita]['tempo_s'] * 1000:.0f}ms → {depois[visita]['tempo_s'] * 1000:.0f}ms")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"parametros": vars(args), "resultados": resultados}, f, indent=2, ensure_ascii=False)
+        print(f"\nResultados salvos em {args.output}")
+
+    Database.close_all()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,326 @@
+"""
+Teste de carga dos endpoints de catálogo e de movimentação
+Sobe o app em processo (lifespan + httpx ASGITransport) com um banco
+temporário; Slack e HISTÓRICO são trocados por stubs com latência
+configurável (handlers do outbox) e o sync do Google por um no-op.
+
+Para cada nível de concorrência, N clientes rodam uma carga mista por
+--duration segundos:
+  - read:     GET /api/items
+  - search:   GET /api/items/search?q=...
+  - withdraw: POST /api/transactions (retirada)
+  - return:   POST /api/transactions (devolucao do que o cliente tem)
+e o relatório traz vazão e latência p50/p95/p99 por operação. Uma parte
+das retiradas mira poucos itens "quentes" para forçar disputa pelo saldo.
+
+No fim de cada nível o outbox é esvaziado e os invariantes de estoque
+são conferidos (saldos, items_em_uso, unidades 5S, histórico, outbox
+entregue uma vez, catálogo em memória = banco). O tempo para esvaziar o
+outbox também é medido: o Slack é entregue mensagem a mensagem, então a
+fila cresce com a vazão de movimentações. Sai com erro se algo falhar.
+
+Execute: python benchmarks/bench_load.py [--concurrency 1 8 32] [--duration 5] [--items 500]
+         [--mix read=50,search=20,withdraw=20,return=10] [--slack-latency 0.02] [--sheets-latency 0.3]
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+from collections import Counter, defaultdict
+
+# Add benchmarks to path (fixtures puts backend there too)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from fixtures import NOMES, banco_temporario, populate, sync_desligado
+banco_temporario("load.db", LOW_STOCK_ALERT_WINDOW_SECONDS="0")  # Alertas de estoque mínimo não seguram o esvaziamento do outbox
+
+import httpx
+from app.main import app
+from app.services.database import Database
+from app.services.outbox import outbox_worker, EVENTO_SLACK_TRANSACAO, EVENTO_SHEETS_HISTORICO
+from app.services.sync_scheduler import sync_scheduler
+from app.config import settings
+
+OPERACOES = ["read", "search", "withdraw", "return"]
+PALAVRAS = ["paqui", "micro", "torqui", "chave", "alicate", "multi", "oscilo", "ferro", "trena", "digital"]
+
+
+class Stubs:
+    """Slack e HISTÓRICO falsos: só esperam a latência e contam as entregas"""
+
+    def __init__(self, slack_latency, sheets_latency):
+        self.slack_latency = slack_latency
+        self.sheets_latency = sheets_latency
+        self.slack = Counter()       # transaction_id → mensagens
+        self.historico = Counter()   # transaction_id → linhas
+        self.lotes_historico = 0
+
+    async def notify_slack(self, payload):
+        await asyncio.sleep(self.slack_latency)
+        self.slack[payload['transaction_id']] += 1
+
+    async def append_history(self, payloads):
+        await asyncio.sleep(self.sheets_latency)
+        self.lotes_historico += 1
+        for payload in payloads:
+            self.historico[payload['transaction_id']] += 1
+
+
+def percentil(valores, p):
+    """Nearest-rank (valores já ordenados)"""
+    if not valores:
+        return 0.0
+    return valores[min(len(valores) - 1, max(0, int(round(p / 100 * len(valores))) - 1))]
+
+
+class Cliente:
+    """Um cliente da carga: uma pessoa no quiosque, com o que tem em mãos"""
+
+    def __init__(self, numero, http, ids, quentes, pesos, rng, medidas):
+        self.pessoa = f"Pessoa {numero:03d}"
+        self.http = http
+        self.ids = ids
+        self.quentes = quentes
+        self.pesos = pesos
+        self.rng = rng
+        self.medidas = medidas
+        self.em_maos = Counter()  # item_id → unidades com esta pessoa
+        self.operacoes = {"read": self.read, "search": self.search,
+                          "withdraw": self.withdraw, "return": self.return_}
+
+    async def rodar(self, ate):
+        while time.perf_counter() < ate:
+            operacao = self.rng.choices(OPERACOES, self.pesos)[0]
+            if operacao == "return" and not self.em_maos:
+                operacao = "withdraw"
+            await self.operacoes[operacao]()
+
+    async def _medir(self, operacao, request, esperados=(200,)):
+        inicio = time.perf_counter()
+        resposta = await request
+        decorrido = time.perf_counter() - inicio
+        medida = self.medidas[operacao]
+        medida["latencias"].append(decorrido)
+        if resposta.status_code == 200:
+            medida["ok"] += 1
+        elif resposta.status_code in esperados:
+            medida["rejeitadas"] += 1
+        else:
+            medida["erros"] += 1
+            if medida["erros"] <= 3:
+                print(f"   {operacao}: HTTP {resposta.status_code} {resposta.text[:120]}")
+        return resposta
+
+    async def read(self):
+        await self._medir("read", self.http.get("/api/items"))
+
+    async def search(self):
+        await self._medir("search", self.http.get("/api/items/search", params={"q": self.rng.choice(PALAVRAS)}))
+
+    async def withdraw(self):
+        item_id = self.rng.choice(self.quentes if self.rng.random() < 0.3 else self.ids)
+        quantidade = self.rng.randint(1, 2)
+        resposta = await self._medir("withdraw", self.http.post("/api/transactions", json={
+            "tipo": "retirada", "item_id": item_id, "quantidade": quantidade, "nome_pessoa": self.pessoa
+        }), esperados=(200, 400))  # 400 = estoque insuficiente (disputa esperada)
+        if resposta.status_code == 200:
+            self.em_maos[item_id] += quantidade
+
+    async def return_(self):
+        item_id = self.rng.choice(list(self.em_maos))
+        quantidade = self.rng.randint(1, self.em_maos[item_id])
+        resposta = await self._medir("return", self.http.post("/api/transactions", json={
+            "tipo": "devolucao", "item_id": item_id, "quantidade": quantidade, "nome_pessoa": self.pessoa
+        }))
+        if resposta.status_code == 200:
+            self.em_maos[item_id] -= quantidade
+            if not self.em_maos[item_id]:
+                del self.em_maos[item_id]
+
+
+async def esvaziar_outbox(timeout):
+    """Espera o worker entregar tudo o que está no outbox"""
+    conn = Database().get_connection()
+    limite = time.perf_counter() + timeout
+    while time.perf_counter() < limite:
+        pendentes = conn.execute("SELECT COUNT(*) FROM outbox").fetchone()[0]
+        if not pendentes:
+            return True
+        outbox_worker.notify()
+        await asyncio.sleep(0.05)
+    return False
+
+
+async def conferir(http, unidades, stubs, transacoes_ok, drenou):
+    """Invariantes de estoque depois da carga; lista de (descrição, ok)"""
+    conn = Database().get_connection()
+    items = {row['id']: dict(row) for row in conn.execute("SELECT * FROM items")}
+    em_uso = Counter(row['item_id'] for row in conn.execute("SELECT item_id FROM items_em_uso"))
+    codigos_em_uso = defaultdict(set)
+    for row in conn.execute("SELECT item_id, codigo_original FROM items_em_uso WHERE codigo_original IS NOT NULL"):
+        codigos_em_uso[row['item_id']].add(row['codigo_original'])
+    unidades_em_uso = defaultdict(set)
+    for row in conn.execute("SELECT item_id, codigo FROM item_units WHERE status = 'em_uso'"):
+        unidades_em_uso[row['item_id']].add(row['codigo'])
+    liquido = Counter()
+    transacoes = 0
+    for row in conn.execute("SELECT item_id, tipo, quantidade FROM transactions"):
+        liquido[row['item_id']] += row['quantidade'] if row['tipo'] == 'retirada' else -row['quantidade']
+        transacoes += 1
+    ids_transacoes = {row[0] for row in conn.execute("SELECT id FROM transactions")}
+
+    catalogo = {item['id']: item for item in (await http.get("/api/items")).json()}
+
+    return [
+        ("saldo nunca negativo",
+         all(i['quantidade_disponivel'] >= 0 and i['quantidade_em_uso'] >= 0 for i in items.values())),
+        ("disponível + em uso == total",
+         all(i['quantidade_disponivel'] + i['quantidade_em_uso'] == i['quantidade_total'] for i in items.values())),
+        ("em uso == linhas de items_em_uso",
+         all(i['quantidade_em_uso'] == em_uso[i['id']] for i in items.values())),
+        ("unidades 5S em uso == códigos em items_em_uso",
+         all(unidades_em_uso[i] == codigos_em_uso[i] for i in items)),
+        ("histórico explica o saldo (total - retiradas + devoluções)",
+         all(i['quantidade_disponivel'] == unidades - liquido[i['id']] for i in items.values())),
+        ("uma transação por movimentação aceita", transacoes == transacoes_ok),
+        ("outbox esvaziado", drenou),
+        ("Slack: uma mensagem por transação",
+         set(stubs.slack) == ids_transacoes and all(n == 1 for n in stubs.slack.values())),
+        ("HISTÓRICO: uma linha por transação",
+         set(stubs.historico) == ids_transacoes and all(n == 1 for n in stubs.historico.values())),
+        ("catálogo em memória == banco",
+         all(catalogo[i]['quantidade_disponivel'] == item['quantidade_disponivel'] for i, item in items.items())),
+    ]
+
+
+def resumo(medidas, duracao):
+    linhas = []
+    for operacao in OPERACOES:
+        m = medidas[operacao]
+        latencias = sorted(m["latencias"])
+        if not latencias:
+            continue
+        linhas.append({
+            "operacao": operacao,
+            "requisicoes": len(latencias),
+            "ok": m["ok"],
+            "rejeitadas": m["rejeitadas"],
+            "erros": m["erros"],
+            "rps": round(len(latencias) / duracao, 1),
+            "p50_ms": round(percentil(latencias, 50) * 1000, 2),
+            "p95_ms": round(percentil(latencias, 95) * 1000, 2),
+            "p99_ms": round(percentil(latencias, 99) * 1000, 2),
+        })
+    return linhas
+
+
+async def carga(args, pesos):
+    stubs = Stubs(args.slack_latency, args.sheets_latency)
+    outbox_worker.register(EVENTO_SLACK_TRANSACAO, stubs.notify_slack)
+    outbox_worker.register_batch(
+        EVENTO_SHEETS_HISTORICO,
+        stubs.append_history,
+        max_size=settings.HISTORY_BATCH_MAX_ROWS,
+        window=settings.HISTORY_BATCH_WINDOW_SECONDS
+    )
+
+    sync_scheduler.sync_func = sync_desligado
+
+    ids = [item['id'] for item in populate(args.items, args.units, NOMES).get_all_items()]
+    rng = random.Random(args.seed)
+    quentes = rng.sample(ids, min(args.hot_items, len(ids)))
+    resultados = []
+    ok = True
+
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://kiosk", timeout=60) as http:
+            transacoes_ok = 0
+            for concorrencia in args.concurrency:
+                medidas = defaultdict(lambda: {"latencias": [], "ok": 0, "rejeitadas": 0, "erros": 0})
+                clientes = [
+                    Cliente(n, http, ids, quentes, pesos, random.Random(rng.random()), medidas)
+                    for n in range(concorrencia)
+                ]
+                inicio = time.perf_counter()
+                await asyncio.gather(*(c.rodar(inicio + args.duration) for c in clientes))
+                duracao = time.perf_counter() - inicio
+
+                # Devolve o que ficou em mãos: o próximo nível começa com o estoque cheio
+                for cliente in clientes:
+                    while cliente.em_maos:
+                        await cliente.return_()
+                transacoes_ok += medidas["withdraw"]["ok"] + medidas["return"]["ok"]
+
+                inicio_outbox = time.perf_counter()
+                drenou = await esvaziar_outbox(args.drain_timeout)
+                esvaziamento = time.perf_counter() - inicio_outbox
+                checks = await conferir(http, args.units, stubs, transacoes_ok, drenou)
+                linhas = resumo(medidas, duracao)
+                total = sum(linha["requisicoes"] for linha in linhas)
+
+                print(f"\nConcorrência {concorrencia}: {total} requisições em {duracao:.1f}s "
+                      f"({total / duracao:.0f} req/s)")
+                print(f"   outbox esvaziado {esvaziamento:.1f}s após a carga | "
+                      f"lotes no HISTÓRICO até aqui: {stubs.lotes_historico}")
+                print(f"   {'operação':<9} {'req':>6} {'ok':>6} {'rejeit.':>7} {'erros':>5} {'req/s':>7} "
+                      f"{'p50':>8} {'p95':>8} {'p99':>8}")
+                for linha in linhas:
+                    print(f"   {linha['operacao']:<9} {linha['requisicoes']:>6} {linha['ok']:>6} "
+                          f"{linha['rejeitadas']:>7} {linha['erros']:>5} {linha['rps']:>7.1f} "
+                          f"{linha['p50_ms']:>6.1f}ms {linha['p95_ms']:>6.1f}ms {linha['p99_ms']:>6.1f}ms")
+                for descricao, passed in checks:
+                    print(f"   {'✅' if passed else '❌'} {descricao}")
+                    ok = ok and passed
+                ok = ok and not any(linha["erros"] for linha in linhas)
+
+                resultados.append({
+                    "concorrencia": concorrencia,
+                    "duracao_s": round(duracao, 2),
+                    "req_s": round(total / duracao, 1),
+                    "outbox_esvaziado_s": round(esvaziamento, 2),
+                    "operacoes": linhas,
+                    "invariantes": {descricao: passed for descricao, passed in checks}
+                })
+    return resultados, ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Teste de carga em processo")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--duration", type=float, default=5.0, help="Segundos por nível")
+    parser.add_argument("--items", type=int, default=500)
+    parser.add_argument("--units", type=int, default=5, help="Unidades 5S por item")
+    parser.add_argument("--hot-items", type=int, default=5, help="Itens disputados (30%% das retiradas)")
+    parser.add_argument("--mix", default="read=50,search=20,withdraw=20,return=10")
+    parser.add_argument("--slack-latency", type=float, default=0.02,
+                        help="Latência do stub do Slack (s); as mensagens saem uma a uma")
+    parser.add_argument("--sheets-latency", type=float, default=0.3)
+    parser.add_argument("--drain-timeout", type=float, default=300.0)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default=None, help="Salva o resultado em JSON")
+    args = parser.parse_args()
+
+    mix = dict(parte.split("=") for parte in args.mix.split(","))
+    pesos = [float(mix.get(operacao, 0)) for operacao in OPERACOES]
+
+    print("=" * 80)
+    print(f"CARGA: {args.items} itens x {args.units} unidades | mix {args.mix} | "
+          f"Slack {args.slack_latency * 1000:.0f}ms, HISTÓRICO {args.sheets_latency * 1000:.0f}ms")
+    print("=" * 80)
+
+    resultados, ok = asyncio.run(carga(args, pesos))
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"parametros": vars(args), "resultados": resultados}, f, indent=2, ensure_ascii=False)
+        print(f"\nResultados salvos em {args.output}")
+
+    Database.close_all()
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
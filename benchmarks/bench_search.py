@@ -0,0 +1,106 @@
+"""
+Benchmark da busca de itens: LIKE (antigo) x índice FTS5
+Gera um catálogo sintético num banco temporário e mede cada consulta.
+
+Execute: python benchmarks/bench_search.py [--items 50000] [--runs 200]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+# Add backend to path
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'backend'))
+
+from app.services.database import Database
+
+FERRAMENTAS = [
+    "Paquímetro", "Micrômetro", "Torquímetro", "Chave de Fenda", "Chave Philips",
+    "Alicate Universal", "Multímetro", "Osciloscópio", "Ferro de Solda", "Relógio Comparador",
+    "Trena", "Esquadro", "Nível de Bolha", "Estilete", "Martelo de Borracha",
+]
+VARIANTES = ["Digital", "Analógico", "Pequeno", "Médio", "Grande", "Isolado", "Profissional", "Mecânico"]
+CATEGORIAS = ["Mecânica", "Eletrônica", "Medição", "Manutenção", "Produção"]
+ABAS = ["Produto", "Mecânica", "Eletrônica"]
+
+QUERIES = ["paq", "mecanica", "chave fenda", "torquimetro digital", "5s-01234", "osciloscópio"]
+CODE_QUERY = "5s-01234"  # Só o FTS procura nos códigos 5S
+
+
+def populate(db: Database, total: int, seed: int = 42):
+    """Insert `total` synthetic items in bulk"""
+    rng = random.Random(seed)
+    novos = []
+    for i in range(total):
+        nome = f"{rng.choice(FERRAMENTAS)} {rng.choice(VARIANTES)} {i:05d}"
+        unidades = rng.randint(1, 4)
+        novos.append({
+            'nome': nome,
+            'categoria': rng.choice(CATEGORIAS),
+            'localizacao': f"Armário {rng.randint(1, 40)} - Gaveta {rng.randint(1, 8)}",
+            'quantidade_total': unidades,
+            'estoque_minimo': 2,
+            'codigos': [f"5S-{i:05d}{u}" for u in range(unidades)],
+            'aba_origem': rng.choice(ABAS)
+        })
+    db.bulk_sync_items(novos, [])
+
+
+def like_search(db: Database, query: str):
+    """Consulta usada antes do FTS5"""
+    cursor = db.get_connection().execute(
+        "SELECT * FROM items WHERE nome LIKE ? ORDER BY nome LIMIT 20",
+        (f"%{query}%",)
+    )
+    return [dict(row) for row in cursor.fetchall()]
+
+
+def measure(func, runs: int):
+    """Return (mean_ms, p95_ms, result_count)"""
+    timings = []
+    result = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = func()
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return sum(timings) / len(timings), timings[int(len(timings) * 0.95) - 1], len(result)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark LIKE x FTS5")
+    parser.add_argument("--items", type=int, default=50000)
+    parser.add_argument("--runs", type=int, default=200)
+    args = parser.parse_args()
+
+    db = Database(os.path.join(tempfile.mkdtemp(), "bench_search.db"))
+    db.init_db()
+
+    start = time.perf_counter()
+    populate(db, args.items)
+    print(f"Catálogo: {args.items} itens gerados em {time.perf_counter() - start:.1f}s\n")
+
+    print(f"{'consulta':<22}{'LIKE média':>12}{'LIKE p95':>10}{'n':>4}"
+          f"{'FTS média':>12}{'FTS p95':>10}{'n':>4}")
+    print("-" * 74)
+    encontrados = {}
+    for query in QUERIES:
+        like = measure(lambda: like_search(db, query), args.runs)
+        fts = measure(lambda: db.search_items(query), args.runs)
+        encontrados[query] = fts[2]
+        print(f"{query:<22}{like[0]:>10.2f}ms{like[1]:>8.2f}ms{like[2]:>4}"
+              f"{fts[0]:>10.2f}ms{fts[1]:>8.2f}ms{fts[2]:>4}")
+
+    Database.close_all()
+
+    # Sem códigos no catálogo a linha do código não mede nada
+    if not encontrados[CODE_QUERY]:
+        print(f"\n❌ A busca por código ({CODE_QUERY}) não encontrou itens: o catálogo saiu sem códigos 5S")
+        sys.exit(1)
+    print(f"\n✅ A busca por código ({CODE_QUERY}) encontrou {encontrados[CODE_QUERY]} itens")
+
+
+if __name__ == "__main__":
+    main()
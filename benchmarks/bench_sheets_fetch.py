@@ -0,0 +1,86 @@
+"""
+Benchmark da leitura das abas de inventário
+Compara, contra a planilha falsa com latência injetada:
+  - sequencial: worksheet() + get_all_records() aba por aba (sync antigo)
+  - paralelo:   get_all_records() das abas num pool de threads
+  - batch:      uma única values_batchGet + parse das grades (sync atual)
+
+Execute: python benchmarks/bench_sheets_fetch.py [--items 5000] [--latency 0.25] [--per-row 0.00002]
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_sheets import ABAS, FakeSheetsClient, FakeSpreadsheet, build_inventory
+from app.services.google_sheets import _numericise
+from app.services.inventory_sync import COLUNAS_INVENTARIO, iter_grid_records
+
+
+def sequencial(spreadsheet):
+    return {aba: spreadsheet.worksheet(aba).get_all_records() for aba in ABAS}
+
+
+def paralelo(spreadsheet):
+    with ThreadPoolExecutor(max_workers=len(ABAS)) as pool:
+        futuros = {aba: pool.submit(lambda a: spreadsheet.worksheet(a).get_all_records(), aba) for aba in ABAS}
+        return {aba: futuro.result() for aba, futuro in futuros.items()}
+
+
+def batch(spreadsheet):
+    grades = FakeSheetsClient(spreadsheet).batch_values(ABAS)
+    # Mesma conversão numérica do get_all_records(), só nas colunas que o sync usa
+    return {
+        aba: [record for _, record in iter_grid_records(aba, grade, _numericise)]
+        for aba, grade in grades.items()
+    }
+
+
+def somente_colunas_usadas(records_por_aba):
+    return {
+        aba: [{k: v for k, v in record.items() if k in COLUNAS_INVENTARIO} for record in records]
+        for aba, records in records_por_aba.items()
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark da leitura das abas")
+    parser.add_argument("--items", type=int, default=5000)
+    parser.add_argument("--latency", type=float, default=0.25, help="Latência por requisição (s)")
+    parser.add_argument("--per-row", type=float, default=0.00002, help="Transferência por linha (s)")
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    grids = build_inventory(items=args.items)
+    # Códigos numéricos: o parse próprio precisa converter igual ao gspread
+    grids["Produto"][1][0] = "00123"
+    grids["Produto"][2][0] = "42"
+    spreadsheet = FakeSpreadsheet(grids, latency=args.latency, per_row=args.per_row)
+    linhas = sum(len(grade) - 1 for grade in grids.values())
+
+    print("=" * 80)
+    print(f"LEITURA DAS ABAS: {linhas} linhas em {len(ABAS)} abas | "
+          f"latência {args.latency * 1000:.0f}ms + {args.per_row * 1e6:.0f}µs/linha")
+    print("=" * 80)
+
+    referencia = None
+    for nome, estrategia in (("sequencial", sequencial), ("paralelo", paralelo), ("batch", batch)):
+        tempos = []
+        for _ in range(args.runs):
+            spreadsheet.calls.clear()
+            inicio = time.perf_counter()
+            resultado = estrategia(spreadsheet)
+            tempos.append(time.perf_counter() - inicio)
+        requisicoes = sum(spreadsheet.calls.values())
+        resultado = somente_colunas_usadas(resultado)
+        if referencia is None:
+            referencia = resultado
+        igual = "ok" if resultado == referencia else "DIFERENTE"
+        print(f"{nome:<12} {min(tempos) * 1000:8.1f} ms   {requisicoes} requisições   registros: {igual}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""
+Benchmark de partida: tempo até a primeira requisição respondida
+Sobe o app em processo (lifespan + httpx ASGITransport) com um banco já
+populado e um sync do Google que demora --sync-delay segundos (rede lenta
+ou offline até o timeout), e mede quando GET /api/items responde.
+
+Execute: python benchmarks/bench_startup.py [--sync-delay 5] [--items 2000]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+# Add benchmarks to path (fixtures puts backend there too)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from fixtures import banco_temporario, populate
+banco_temporario("startup.db")
+
+import httpx
+from app.main import app
+from app.services.database import Database
+from app.services.sync_scheduler import sync_scheduler
+
+
+async def measure(sync_delay):
+    async def slow_sync(full):
+        await asyncio.sleep(sync_delay)  # Google lento / offline até o timeout
+        return {"success": False, "error": "simulado"}
+
+    sync_scheduler.sync_func = slow_sync
+    transport = httpx.ASGITransport(app=app)
+
+    inicio = time.perf_counter()
+    async with app.router.lifespan_context(app):
+        no_ar = time.perf_counter() - inicio
+        async with httpx.AsyncClient(transport=transport, base_url="http://kiosk") as client:
+            resposta = await client.get("/api/items")
+            primeira = time.perf_counter() - inicio
+            pronto = await client.get("/api/ready")
+    return no_ar, primeira, resposta.status_code, len(resposta.json()), pronto.status_code
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tempo até a primeira requisição")
+    parser.add_argument("--sync-delay", type=float, default=5.0)
+    parser.add_argument("--items", type=int, default=2000)
+    args = parser.parse_args()
+
+    populate(args.items)
+    no_ar, primeira, status, itens, pronto = asyncio.run(measure(args.sync_delay))
+
+    print("=" * 80)
+    print(f"PARTIDA com sync de {args.sync_delay:.1f}s e {args.items} itens locais")
+    print("=" * 80)
+    print(f"lifespan concluído:      {no_ar * 1000:8.1f} ms")
+    print(f"1ª resposta /api/items:  {primeira * 1000:8.1f} ms  (HTTP {status}, {itens} itens)")
+    print(f"/api/ready:              HTTP {pronto}")
+    Database.close_all()
+
+
+if __name__ == "__main__":
+    main()
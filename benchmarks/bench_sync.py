@@ -0,0 +1,222 @@
+"""
+Benchmark do sync com o Google Sheets, sem rede nem credenciais
+Roda GoogleSheetsService.sync_from_sheets contra a planilha falsa
+(fake_sheets) e mede, para cada tamanho de planilha:
+  - completo:    1º sync num banco vazio
+  - sem_mudanca: modifiedTime igual (nada é baixado)
+  - uma_aba:     uma célula alterada numa aba
+com o tempo total e por etapa (modifiedTime, leitura, agrupamento,
+gravação no banco) e o pico de RSS. Cada tamanho roda num processo
+próprio para o pico de memória não vazar de um para o outro.
+
+O resultado vai para um JSON; --compare mostra a diferença contra uma
+execução anterior e sai com erro se algo piorou além de --threshold.
+
+Execute: python benchmarks/bench_sync.py [--rows 1000 10000 100000] [--duplicates 0.5]
+         [--tabs 3] [--latency 0.25] [--per-row 0.00002] [--output saida.json] [--compare anterior.json]
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+CENARIOS = ["completo", "sem_mudanca", "uma_aba"]
+
+
+def rss_mb():
+    """RSS atual (Linux); cai para o pico se /proc não existir"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1e6
+    except OSError:
+        return pico_rss_mb()
+
+
+def pico_rss_mb():
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return pico / 1e6 if sys.platform == "darwin" else pico / 1e3  # bytes no macOS, KB no Linux
+
+
+class Etapas:
+    """Cronômetro por etapa: envolve as chamadas que o sync faz"""
+
+    def __init__(self):
+        self.tempos = {}
+
+    def medir(self, nome, func):
+        def medido(*args, **kwargs):
+            inicio = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.tempos[nome] = self.tempos.get(nome, 0.0) + time.perf_counter() - inicio
+        return medido
+
+
+def executar(linhas, duplicates, tabs, latency, per_row):
+    """Um tamanho de planilha (roda no processo filho)"""
+    from fake_sheets import ABAS, FakeSheetsClient, FakeSpreadsheet, build_rows
+    from app.services import google_sheets
+    from app.services.database import Database
+
+    abas = (ABAS + [f"Aba {i}" for i in range(len(ABAS) + 1, tabs + 1)])[:tabs]
+    google_sheets.ABAS_SINCRONIZADAS = abas
+
+    rss_inicial = rss_mb()
+    planilha = FakeSpreadsheet(build_rows(linhas, duplicates, abas), latency=latency, per_row=per_row)
+    rss_base = rss_mb()
+
+    db = Database(os.path.join(tempfile.mkdtemp(), "bench_sync.db"))
+    db.init_db()
+    client = FakeSheetsClient(planilha)
+    service = google_sheets.GoogleSheetsService(client=client, db=db)
+
+    etapas = Etapas()
+    client.modified_time = etapas.medir("modified_time", client.modified_time)
+    client.batch_values = etapas.medir("leitura", client.batch_values)
+    google_sheets.apply_groups = etapas.medir("gravacao", google_sheets.apply_groups)
+
+    cenarios = {}
+    for cenario in CENARIOS:
+        if cenario == "uma_aba":
+            planilha.set_cell(abas[0], 1, 0, "5S-ALTERADO")
+        etapas.tempos.clear()
+        inicio = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            resultado = asyncio.run(service.sync_from_sheets())
+        total = time.perf_counter() - inicio
+
+        tempos = {nome: etapas.tempos.get(nome, 0.0) for nome in ("modified_time", "leitura", "gravacao")}
+        # Parse, hash e agrupamento são geradores intercalados: ficam com o resto
+        tempos["agrupamento"] = max(total - sum(tempos.values()), 0.0)
+        cenarios[cenario] = dict(
+            {f"{nome}_ms": round(segundos * 1000, 2) for nome, segundos in tempos.items()},
+            total_ms=round(total * 1000, 2),
+            items_novos=resultado.get("items_novos"),
+            items_atualizados=resultado.get("items_atualizados"),
+            rss_pico_mb=round(pico_rss_mb(), 1)
+        )
+
+    itens = db.count_items()
+    Database.close_all()
+    return {
+        "linhas": linhas,
+        "itens": itens,
+        "abas": len(abas),
+        "rss_inicial_mb": round(rss_inicial, 1),
+        "rss_base_mb": round(rss_base, 1),
+        "rss_pico_mb": round(pico_rss_mb(), 1),
+        "cenarios": cenarios
+    }
+
+
+def rodar_filho(linhas, args):
+    """Roda um tamanho num processo novo e devolve o JSON que ele imprime"""
+    parametros = json.dumps({
+        "linhas": linhas, "duplicates": args.duplicates, "tabs": args.tabs,
+        "latency": args.latency, "per_row": args.per_row
+    })
+    saida = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--child", parametros],
+        capture_output=True, text=True, check=True
+    )
+    return json.loads(saida.stdout.strip().splitlines()[-1])
+
+
+def imprimir(resultados):
+    print(f"{'linhas':>9} {'itens':>8} {'cenário':<12} {'total':>9} {'modTime':>8} {'leitura':>9} "
+          f"{'agrupar':>9} {'gravar':>9} {'RSS pico':>9}")
+    for r in resultados:
+        for cenario, c in r["cenarios"].items():
+            print(f"{r['linhas']:>9} {r['itens']:>8} {cenario:<12} {c['total_ms']:>7.1f}ms "
+                  f"{c['modified_time_ms']:>6.1f}ms {c['leitura_ms']:>7.1f}ms {c['agrupamento_ms']:>7.1f}ms "
+                  f"{c['gravacao_ms']:>7.1f}ms {c['rss_pico_mb']:>7.1f}MB")
+        print(f"{'':>9} RSS: {r['rss_inicial_mb']:.1f}MB após imports, {r['rss_base_mb']:.1f}MB com a planilha "
+              f"falsa, pico {r['rss_pico_mb']:.1f}MB")
+
+
+def comparar(resultados, anterior_path, threshold):
+    """Diferença contra uma execução anterior; True se nada piorou além do limite"""
+    with open(anterior_path, encoding="utf-8") as f:
+        anterior = {r["linhas"]: r for r in json.load(f)["resultados"]}
+
+    print(f"\nComparação com {anterior_path} (limite {threshold:.0%}):")
+    ok = True
+    for r in resultados:
+        antes = anterior.get(r["linhas"])
+        if antes is None:
+            continue
+        medidas = [(cenario, c["total_ms"], antes["cenarios"].get(cenario, {}).get("total_ms"), "ms")
+                   for cenario, c in r["cenarios"].items()]
+        medidas.append(("RSS pico", r["rss_pico_mb"], antes.get("rss_pico_mb"), "MB"))
+        for nome, agora, antes_valor, unidade in medidas:
+            if not antes_valor:
+                continue
+            delta = agora / antes_valor - 1
+            piorou = delta > threshold
+            ok = ok and not piorou
+            print(f"{r['linhas']:>9} {nome:<12} {antes_valor:>9.1f}{unidade} → {agora:>9.1f}{unidade} "
+                  f"{delta:+7.1%}{'  ← PIOROU' if piorou else ''}")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do sync com a planilha falsa")
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 10000, 100000],
+                        help="Tamanhos (linhas = unidades 5S), de 1k a 1M")
+    parser.add_argument("--duplicates", type=float, default=0.5,
+                        help="Fração de linhas que repetem um item (0 = todas únicas)")
+    parser.add_argument("--tabs", type=int, default=3, help="Número de abas de inventário")
+    parser.add_argument("--latency", type=float, default=0.0, help="Latência por requisição (s)")
+    parser.add_argument("--per-row", type=float, default=0.0, help="Transferência por linha (s)")
+    parser.add_argument("--output", default=None, help="JSON de saída (padrão: benchmarks/results/)")
+    parser.add_argument("--compare", default=None, help="JSON de uma execução anterior")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Piora tolerada no --compare")
+    parser.add_argument("--child", default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(executar(**json.loads(args.child))))
+        return
+
+    print("=" * 80)
+    print(f"SYNC: {len(args.rows)} tamanho(s) | {args.tabs} abas | {args.duplicates:.0%} duplicadas | "
+          f"latência {args.latency * 1000:.0f}ms + {args.per_row * 1e6:.0f}µs/linha")
+    print("=" * 80)
+
+    resultados = [rodar_filho(linhas, args) for linhas in args.rows]
+    imprimir(resultados)
+
+    saida = args.output or os.path.join(RESULTS_DIR, f"bench_sync_{datetime.now():%Y%m%d_%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(saida)), exist_ok=True)
+    with open(saida, "w", encoding="utf-8") as f:
+        json.dump({
+            "gerado_em": datetime.now().isoformat(),
+            "python": platform.python_version(),
+            "plataforma": platform.platform(),
+            "parametros": {
+                "duplicates": args.duplicates, "tabs": args.tabs,
+                "latency": args.latency, "per_row": args.per_row
+            },
+            "resultados": resultados
+        }, f, indent=2, ensure_ascii=False)
+    print(f"\nResultados salvos em {saida}")
+
+    if args.compare and not comparar(resultados, args.compare, args.threshold):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+"""
+Planilha falsa (em memória) para testar e medir o sync sem o Google
+Imita o pedaço do gspread que o GoogleSheetsService usa e conta as
+chamadas feitas, para comparar quantas idas à API cada estratégia gasta.
+
+Com latency/per_row cada chamada "de rede" dorme como uma ida à API
+(latência fixa + tempo proporcional ao número de linhas transferidas).
+
+Uso:
+    spreadsheet = FakeSpreadsheet(build_inventory(items=2000), latency=0.3)
+    service = GoogleSheetsService(client=FakeSheetsClient(spreadsheet), db=Database(path))
+"""
+import json
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Dict, List
+
+# Add backend to path
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'backend'))
+
+import gspread
+from gspread.utils import numericise_all
+from app.services.sheets_client import SheetsClient
+
+HEADER = ["ID_do_Recurso", "Nome_do_Recurso", "Categoria", "Localizacao_de_armazenamento"]
+ABAS = ["Produto", "Mecânica", "Eletrônica"]
+FERRAMENTAS = [
+    "Paquímetro", "Micrômetro", "Torquímetro", "Chave de Fenda", "Chave Philips",
+    "Alicate Universal", "Multímetro", "Osciloscópio", "Ferro de Solda", "Trena",
+]
+VARIANTES = ["Digital", "Analógico", "Pequeno", "Médio", "Grande", "Isolado"]
+
+
+def build_inventory(items: int = 1000, max_units: int = 5, seed: int = 42) -> Dict[str, List[List]]:
+    """Grade de valores por aba (com cabeçalho); cada linha é uma unidade 5S"""
+    rng = random.Random(seed)
+    grids = {aba: [list(HEADER)] for aba in ABAS}
+    codigo = 0
+    for i in range(items):
+        aba = ABAS[i % len(ABAS)]
+        nome = f"{rng.choice(FERRAMENTAS)} {rng.choice(VARIANTES)} {i:05d}"
+        categoria = rng.choice(["Medição", "Manutenção", "Eletrônica"])
+        local = f"Armário {rng.randint(1, 20)}"
+        for _ in range(rng.randint(1, max_units)):
+            codigo += 1
+            grids[aba].append([f"5S-{codigo:06d}", nome, categoria, local])
+    return grids
+
+
+def build_rows(rows: int, duplicates: float = 0.5, abas: List[str] = ABAS, seed: int = 42) -> Dict[str, List[List]]:
+    """
+    Grade com um número exato de linhas (unidades)
+    duplicates é a fração de linhas que repete um item já existente:
+    0.0 → cada linha é um item; 0.9 → 10% das linhas viram itens únicos
+    """
+    rng = random.Random(seed)
+    items = max(1, min(rows, round(rows * (1 - duplicates))))
+    unidades = [1] * items
+    for _ in range(rows - items):
+        unidades[rng.randrange(items)] += 1
+
+    grids = {aba: [list(HEADER)] for aba in abas}
+    codigo = 0
+    for i, quantidade in enumerate(unidades):
+        grade = grids[abas[i % len(abas)]]
+        nome = f"{FERRAMENTAS[i % len(FERRAMENTAS)]} {VARIANTES[i % len(VARIANTES)]} {i:07d}"
+        categoria = ("Medição", "Manutenção", "Eletrônica")[i % 3]
+        local = f"Armário {i % 20 + 1}"
+        for _ in range(quantidade):
+            codigo += 1
+            grade.append([f"5S-{codigo:07d}", nome, categoria, local])
+    return grids
+
+
+class _FakeResponse:
+    """Resposta HTTP mínima para montar um gspread APIError"""
+
+    def __init__(self, status_code: int, message: str):
+        self.status_code = status_code
+        self.text = json.dumps({"error": {"code": status_code, "message": message, "status": "INVALID_ARGUMENT"}})
+
+    def json(self):
+        return json.loads(self.text)
+
+
+class FakeWorksheet:
+    """Uma aba: guarda a grade e conta as leituras/escritas"""
+
+    def __init__(self, spreadsheet: "FakeSpreadsheet", title: str, values: List[List]):
+        self.spreadsheet = spreadsheet
+        self.title = title
+        self.values = values
+
+    def get_all_values(self) -> List[List]:
+        self.spreadsheet.hit("get_all_values", rows=len(self.values))
+        return [list(row) for row in self.values]
+
+    def get_all_records(self) -> List[dict]:
+        """Mesma conversão do gspread (numericise + cabeçalho)"""
+        self.spreadsheet.hit("get_all_records", rows=len(self.values))
+        if not self.values:
+            return []
+        header = self.values[0]
+        return [
+            dict(zip(header, numericise_all(list(row) + [""] * (len(header) - len(row)))))
+            for row in self.values[1:]
+        ]
+
+    def append_row(self, row: List):
+        self.append_rows([row])
+
+    def append_rows(self, rows: List[List]):
+        self.spreadsheet.hit("append_rows")
+        self.values.extend(list(row) for row in rows)
+        self.spreadsheet.touch()
+
+
+class FakeSpreadsheet:
+    """Planilha inteira; cada alteração avança o modifiedTime"""
+
+    def __init__(
+        self,
+        grids: Dict[str, List[List]],
+        title: str = "Inventário (fake)",
+        latency: float = 0.0,
+        per_row: float = 0.0
+    ):
+        self.title = title
+        self.latency = latency
+        self.per_row = per_row
+        self.calls: Counter = Counter()
+        self._calls_lock = threading.Lock()
+        self.revision = 0
+        self.sheets = {aba: FakeWorksheet(self, aba, values) for aba, values in grids.items()}
+
+    def hit(self, name: str, rows: int = 0):
+        """Conta a chamada e simula o tempo de rede"""
+        with self._calls_lock:
+            self.calls[name] += 1
+        espera = self.latency + rows * self.per_row
+        if espera:
+            time.sleep(espera)
+
+    def touch(self):
+        self.revision += 1
+
+    def worksheet(self, title: str) -> FakeWorksheet:
+        self.hit("worksheet")
+        if title not in self.sheets:
+            raise gspread.WorksheetNotFound(title)
+        return self.sheets[title]
+
+    def worksheets(self) -> List[FakeWorksheet]:
+        return list(self.sheets.values())
+
+    def add_worksheet(self, title: str, rows: int, cols: int) -> FakeWorksheet:
+        self.hit("add_worksheet")
+        self.sheets[title] = FakeWorksheet(self, title, [])
+        self.touch()
+        return self.sheets[title]
+
+    def values_batch_get(self, ranges: List[str], params=None) -> dict:
+        """Todas as grades numa única 'requisição' (400 se alguma aba não existe)"""
+        titles = [r.strip("'").replace("''", "'") for r in ranges]
+        missing = [t for t in titles if t not in self.sheets]
+        if missing:
+            self.hit("values_batch_get")
+            raise gspread.exceptions.APIError(_FakeResponse(400, f"Unable to parse range: {missing[0]}"))
+        self.hit("values_batch_get", rows=sum(len(self.sheets[t].values) for t in titles))
+        return {"valueRanges": [
+            {"range": r, "values": [list(row) for row in self.sheets[t].values]}
+            for r, t in zip(ranges, titles)
+        ]}
+
+    def get_lastUpdateTime(self) -> str:
+        self.hit("get_lastUpdateTime")
+        return f"2026-01-01T00:00:00.{self.revision:06d}Z"
+
+    # Mutações usadas pelos testes
+    def set_cell(self, aba: str, row: int, col: int, value):
+        self.sheets[aba].values[row][col] = value
+        self.touch()
+
+    def add_unit(self, aba: str, row: List):
+        self.sheets[aba].values.append(list(row))
+        self.touch()
+
+    def remove_row(self, aba: str, row: int):
+        del self.sheets[aba].values[row]
+        self.touch()
+
+
+class FakeSheetsClient(SheetsClient):
+    """SheetsClient apontando para a planilha falsa (sem credenciais)"""
+
+    def __init__(self, spreadsheet: FakeSpreadsheet):
+        super().__init__(spreadsheet_id="fake", credentials_file=__file__)
+        self.fake = spreadsheet
+
+    def spreadsheet(self) -> FakeSpreadsheet:
+        return self.fake
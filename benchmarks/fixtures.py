@@ -0,0 +1,93 @@
+"""
+Peças comuns dos testes (test_*.py na raiz) e dos benchmarks
+Banco temporário no ambiente, sync do Google desligado, catálogo
+sintético para o bulk_sync_items e o retrato de um banco para comparar
+dois syncs.
+
+O app lê o ambiente (DATABASE_PATH, ...) quando é importado, então
+banco_temporario roda antes de qualquer import de app.*, e por isso as
+funções daqui importam o app só quando são chamadas.
+
+Uso:
+    sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'benchmarks'))
+    from fixtures import banco_temporario, populate, sync_desligado
+    banco_temporario("batch.db", HISTORY_BATCH_WINDOW_SECONDS="0")
+
+    from app.main import app
+"""
+import os
+import sys
+import tempfile
+from typing import Dict, List, Optional
+
+# Add backend to path
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'backend'))
+
+NOMES = ["Paquímetro", "Micrômetro", "Torquímetro", "Chave de Fenda", "Alicate Universal",
+         "Multímetro", "Osciloscópio", "Ferro de Solda", "Trena"]
+
+
+def banco_temporario(nome: str, **env: str) -> str:
+    """Point DATABASE_PATH at a fresh temp dir and turn the periodic sync off"""
+    caminho = os.path.join(tempfile.mkdtemp(), nome)
+    os.environ["DATABASE_PATH"] = caminho
+    os.environ["SYNC_INTERVAL_MINUTES"] = "0"
+    os.environ.update(env)
+    return caminho
+
+
+async def sync_desligado(full):
+    """Stand-in for the Google sync (sync_scheduler.sync_func)"""
+    return {"success": True, "items_novos": 0, "items_atualizados": 0}
+
+
+def item_sintetico(i: int, unidades: int = 3, nomes: Optional[List[str]] = None, **campos) -> Dict:
+    """
+    One bulk_sync_items entry with `unidades` 5S codes
+    Com `nomes`, o nome vem da lista e os itens se espalham por 20 armários
+    (catálogo com cara de oficina para busca e carga).
+    """
+    item = {
+        'nome': f"{nomes[i % len(nomes)]} {i:05d}" if nomes else f"Item {i:05d}",
+        'categoria': "Medição",
+        'localizacao': f"Armário {i % 20 + 1}" if nomes else "Armário 1",
+        'quantidade_total': unidades,
+        'codigos': [f"5S-{i:05d}-{u}" for u in range(unidades)],
+        'aba_origem': "Produto"
+    }
+    item.update(campos)
+    return item
+
+
+def populate(total: int, unidades: int = 3, nomes: Optional[List[str]] = None):
+    """Create the schema in DATABASE_PATH and load `total` synthetic items"""
+    from app.services.database import Database
+
+    db = Database()
+    db.init_db()
+    db.bulk_sync_items([item_sintetico(i, unidades, nomes) for i in range(total)], [])
+    return db
+
+
+def novo_banco(nome: str):
+    """Empty database in its own temp dir (ignores DATABASE_PATH)"""
+    from app.services.database import Database
+
+    db = Database(os.path.join(tempfile.mkdtemp(), nome))
+    db.init_db()
+    return db
+
+
+def estado(db) -> Dict:
+    """(nome, aba) → (total, disponível, categoria, códigos) de todos os itens"""
+    from app.services.database import split_codigos
+
+    return {
+        (item['nome'], item['aba_origem']): (
+            item['quantidade_total'],
+            item['quantidade_disponivel'],
+            item['categoria'],
+            sorted(split_codigos(item['codigos_originais']))
+        )
+        for item in db.get_all_items()
+    }
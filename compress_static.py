@@ -0,0 +1,61 @@
+"""
+Pré-comprime o frontend (.br e .gz ao lado de cada arquivo)
+O servidor entrega a versão pré-comprimida quando o navegador aceita e
+ela não é mais antiga que o original; sem ela, comprime na hora com
+nível mais baixo. Rode de novo depois de editar o frontend (só refaz o
+que mudou). Sem o pacote `brotli`, gera apenas .gz.
+
+Execute: python compress_static.py [--dir frontend] [--clean]
+"""
+import argparse
+import os
+import sys
+from pathlib import Path
+
+# Add backend to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'backend'))
+
+from app.config import settings
+from app.utils.compression import COMPRESSIBLE_SUFFIXES, brotli, precompress_file
+
+DEFAULT_DIR = os.path.join(os.path.dirname(__file__), "frontend")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gera as versões .br/.gz dos arquivos do frontend")
+    parser.add_argument("--dir", default=DEFAULT_DIR)
+    parser.add_argument("--clean", action="store_true", help="Apaga os .br/.gz em vez de gerar")
+    args = parser.parse_args()
+
+    raiz = Path(args.dir)
+    if args.clean:
+        apagados = [p for p in raiz.rglob("*") if p.suffix in (".br", ".gz") and p.with_suffix("").suffix in COMPRESSIBLE_SUFFIXES]
+        for p in apagados:
+            p.unlink()
+        print(f"✅ {len(apagados)} arquivos comprimidos removidos")
+        return
+
+    if brotli is None:
+        print("⚠️  Pacote brotli não instalado: gerando só .gz")
+
+    total_original = total_br = total_gz = 0
+    gerados = 0
+    for path in sorted(raiz.rglob("*")):
+        if not path.is_file() or path.suffix not in COMPRESSIBLE_SUFFIXES:
+            continue
+        gerados += len(precompress_file(path, settings.COMPRESSION_MINIMUM_BYTES))
+        gz, br = path.with_name(path.name + ".gz"), path.with_name(path.name + ".br")
+        if not gz.exists():
+            continue
+        tamanho = path.stat().st_size
+        total_original += tamanho
+        total_gz += gz.stat().st_size
+        total_br += br.stat().st_size if br.exists() else gz.stat().st_size
+        print(f"   {path.relative_to(raiz)}: {tamanho:,} → gzip {gz.stat().st_size:,}"
+              + (f" / br {br.stat().st_size:,}" if br.exists() else "") + " bytes")
+
+    print(f"✅ {gerados} arquivos gerados; {total_original:,} bytes → gzip {total_gz:,} / br {total_br:,}")
+
+
+if __name__ == "__main__":
+    main()
@@ -44,6 +44,20 @@ const API = {
         return this.request(CONFIG.ENDPOINTS.ITEMS);
     },
 
+    /**
+     * Get items changed or removed after a change sequence
+     */
+    async getItemChanges(since) {
+        return this.request(`${CONFIG.ENDPOINTS.CHANGES}?since=${since}`);
+    },
+
+    /**
+     * URL of the Server-Sent Events stream of item changes
+     */
+    itemsStreamUrl(since) {
+        return `${CONFIG.API_BASE_URL}${CONFIG.ENDPOINTS.STREAM}?since=${since}`;
+    },
+
     /**
      * Get item by ID
      */
@@ -61,6 +75,24 @@ const API = {
         });
     },
 
+    /**
+     * Create several transactions for one person (all-or-nothing)
+     * itens: [{ tipo, item_id, quantidade }]
+     */
+    async createTransactionBatch(nomePessoa, itens) {
+        return this.request(CONFIG.ENDPOINTS.TRANSACTION_BATCH, {
+            method: 'POST',
+            body: JSON.stringify({ nome_pessoa: nomePessoa, itens }),
+        });
+    },
+
+    /**
+     * Get dashboard totals (per aba/categoria aggregates kept by the server)
+     */
+    async getStats() {
+        return this.request(CONFIG.ENDPOINTS.STATS);
+    },
+
     /**
      * Get transaction history
      */
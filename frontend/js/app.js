@@ -263,15 +263,23 @@ const App = {
     },
 
     /**
-     * Load items count for settings page
+     * Load inventory totals for settings page
      */
     async loadItemsCount() {
         try {
-            const items = await API.getAllItems();
-            const totalItemsEl = document.getElementById('totalItems');
-            if (totalItemsEl) {
-                totalItemsEl.textContent = items.length;
-            }
+            // Totais agregados no servidor (não baixa o catálogo inteiro)
+            const stats = await API.getStats();
+            const totais = {
+                totalItems: stats.totais.itens,
+                totalUnitsInUse: `${stats.totais.quantidade_em_uso} de ${stats.totais.quantidade_total}`,
+                totalBelowMinimum: stats.totais.abaixo_minimo
+            };
+            Object.entries(totais).forEach(([id, valor]) => {
+                const el = document.getElementById(id);
+                if (el) {
+                    el.textContent = valor;
+                }
+            });
             
             // Setup sync button
             const btnSync = document.getElementById('btnSync');
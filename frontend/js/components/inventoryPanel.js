@@ -6,6 +6,8 @@ const InventoryPanel = {
     currentFilter: 'all',
     searchQuery: '',
     debounceTimer: null,
+    changeSeq: 0,
+    eventSource: null,
 
     async init() {
         console.log('Initializing Inventory Panel...');
@@ -28,9 +30,9 @@ const InventoryPanel = {
     async loadItems() {
         try {
             this.allItems = await API.getAllItems();
-            this.filteredItems = [...this.allItems];
-            this.updateItemsCount();
-            this.renderItemsList();
+            this.changeSeq = this.allItems.reduce((max, item) => Math.max(max, item.change_seq || 0), 0);
+            this.filterItems();
+            this.subscribeChanges();
         } catch (error) {
             console.error('Error loading items:', error);
             document.getElementById('itemsList').innerHTML = `
@@ -42,6 +44,61 @@ const InventoryPanel = {
         }
     },
 
+    /**
+     * Receive item deltas pushed by the server instead of re-fetching the list
+     */
+    subscribeChanges() {
+        if (this.eventSource) {
+            this.eventSource.close();
+        }
+        if (typeof EventSource === 'undefined') {
+            return;
+        }
+        // Na reconexão o navegador manda Last-Event-ID e o servidor continua dali
+        this.eventSource = new EventSource(API.itemsStreamUrl(this.changeSeq));
+        this.eventSource.addEventListener('items', (e) => this.applyChanges(JSON.parse(e.data)));
+        this.eventSource.addEventListener('reset', () => this.loadItems());
+    },
+
+    applyChanges(delta) {
+        const byId = new Map(this.allItems.map(item => [item.id, item]));
+        let structural = delta.removidos.length > 0;
+
+        delta.items.forEach(changed => {
+            const current = byId.get(changed.id);
+            if (!current) {
+                this.allItems.push(changed);
+                structural = true;
+                return;
+            }
+            if (current.nome !== changed.nome || current.aba_origem !== changed.aba_origem ||
+                current.codigos_originais !== changed.codigos_originais) {
+                structural = true;
+            }
+            // Mesmo objeto da lista filtrada e do item selecionado
+            Object.assign(current, changed);
+        });
+
+        if (delta.removidos.length > 0) {
+            const removidos = new Set(delta.removidos);
+            this.allItems = this.allItems.filter(item => !removidos.has(item.id));
+        }
+        this.changeSeq = Math.max(this.changeSeq, delta.seq);
+
+        if (structural) {
+            // Mesma ordem do servidor (nome, id)
+            this.allItems.sort((a, b) => (a.nome < b.nome ? -1 : a.nome > b.nome ? 1 : a.id - b.id));
+            this.filterItems();
+        } else {
+            // Só saldos mudaram: atualiza as linhas afetadas
+            delta.items.forEach(changed => this.updateItemRow(byId.get(changed.id)));
+        }
+
+        if (this.selectedItem && delta.items.some(changed => changed.id === this.selectedItem.id)) {
+            this.renderItemCard(this.selectedItem);
+        }
+    },
+
     handleSearch(query) {
         this.searchQuery = query.toLowerCase();
         
@@ -102,8 +159,6 @@ const InventoryPanel = {
         }
         
         listEl.innerHTML = this.filteredItems.map(item => {
-            const totalItems = item.quantidade_total || item.quantidade_disponivel;
-            
             return `
                 <div class="item-row ${this.selectedItem?.id === item.id ? 'selected' : ''}" data-item-id="${item.id}">
                     <div class="item-row-header">
@@ -113,7 +168,7 @@ const InventoryPanel = {
                     <div class="item-row-meta">
                         <div class="item-row-stat">
                             <span>📦</span>
-                            <span>${item.quantidade_disponivel}/${totalItems}</span>
+                            <span class="item-row-stock">${this.formatStock(item)}</span>
                         </div>
                     </div>
                 </div>
@@ -132,6 +187,18 @@ const InventoryPanel = {
         });
     },
 
+    formatStock(item) {
+        const totalItems = item.quantidade_total || item.quantidade_disponivel;
+        return `${item.quantidade_disponivel}/${totalItems}`;
+    },
+
+    updateItemRow(item) {
+        const stockEl = document.querySelector(`.item-row[data-item-id="${item.id}"] .item-row-stock`);
+        if (stockEl) {
+            stockEl.textContent = this.formatStock(item);
+        }
+    },
+
     getItemIcon(aba) {
         switch(aba) {
             case 'Mecânica': return '🔧';
@@ -161,7 +228,7 @@ const InventoryPanel = {
         if (detailPanel) detailPanel.scrollTop = 0;
     },
 
-    renderItemDetails(item) {
+    renderItemCard(item) {
         const totalItems = item.quantidade_total || item.quantidade_disponivel;
         const emUso = item.quantidade_em_uso || 0;
         const codigos = item.codigos_originais ? item.codigos_originais.split(',').slice(0, 3) : [];
@@ -229,6 +296,10 @@ const InventoryPanel = {
             ` : ''}
             
         `;
+    },
+
+    renderItemDetails(item) {
+        this.renderItemCard(item);
         
         // Render action controls
         document.getElementById('itemDetailsContent').innerHTML = `
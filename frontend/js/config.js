@@ -16,8 +16,12 @@ const CONFIG = {
     ENDPOINTS: {
         ITEMS: '/items',
         SEARCH: '/items/search',
+        CHANGES: '/items/changes',
+        STREAM: '/items/stream',
         TRANSACTION: '/transactions',
+        TRANSACTION_BATCH: '/transactions/batch',
         HISTORY: '/history',
+        STATS: '/stats',
         SYNC: '/sync',
         SLACK_SETTINGS: '/settings/slack'
     }
@@ -0,0 +1,46 @@
+"""
+Importa o inventário 5S de um .xlsx para o banco local (sem rede)
+Útil para popular ou restaurar um Raspberry Pi offline. Lê a planilha
+em streaming e usa a mesma agregação do sync com o Google Sheets.
+
+Execute: python import_xlsx.py ["Inventário ... 5S.xlsx"] [--db backend/data/estoque.db] [--abas Produto Mecânica]
+"""
+import argparse
+import os
+import sys
+
+# Add backend to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'backend'))
+
+from app.services.database import Database
+from app.services.xlsx_importer import ABAS_INVENTARIO, import_xlsx
+
+DEFAULT_XLSX = os.path.join(os.path.dirname(__file__), "Inventário de Recursos Operacionais da Qualidade _ 5S.xlsx")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Importa o inventário 5S de um arquivo .xlsx")
+    parser.add_argument("arquivo", nargs="?", default=DEFAULT_XLSX)
+    parser.add_argument("--db", default=None, help="Caminho do banco (padrão: DATABASE_PATH)")
+    parser.add_argument("--abas", nargs="+", default=ABAS_INVENTARIO)
+    args = parser.parse_args()
+
+    print("=" * 80)
+    print(f"IMPORTANDO: {args.arquivo}")
+    print("=" * 80)
+
+    try:
+        resultado = import_xlsx(args.arquivo, db=Database(args.db), abas=args.abas)
+    except Exception as e:
+        print(f"ERRO ao importar arquivo: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
+    finally:
+        Database.close_all()
+
+    sys.exit(0 if resultado.get("success") else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -25,6 +25,10 @@ echo "📥 Instalando dependências..."
 pip install --upgrade pip
 pip install -r requirements.txt
 
+# Pre-compress the frontend (.br/.gz)
+echo "🗜️  Comprimindo o frontend..."
+python ../compress_static.py
+
 # Create necessary directories
 echo "📁 Criando diretórios..."
 mkdir -p ../data
@@ -0,0 +1,155 @@
+"""
+Teste do checkout em lote (POST /api/transactions/batch)
+Confere que o carrinho é aplicado tudo-ou-nada numa única transação,
+que gera uma única mensagem no Slack e que as linhas do HISTÓRICO saem
+num único append (handlers do outbox trocados por stubs).
+
+Execute: python test_batch_checkout.py
+"""
+import asyncio
+import os
+import sys
+from collections import Counter
+
+# Add benchmarks to path (fixtures puts backend there too)
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'benchmarks'))
+from fixtures import banco_temporario, populate, sync_desligado
+banco_temporario("batch.db", HISTORY_BATCH_WINDOW_SECONDS="0")
+
+import httpx
+from app.main import app
+from app.services.database import Database
+from app.services.outbox import outbox_worker, EVENTO_SLACK_TRANSACAO, EVENTO_SLACK_LOTE, EVENTO_SHEETS_HISTORICO
+from app.services.sync_scheduler import sync_scheduler
+from app.config import settings
+
+entregas = {"slack": [], "slack_lote": [], "historico": []}
+
+
+async def slack_stub(payload):
+    entregas["slack"].append(payload)
+
+
+async def slack_lote_stub(payload):
+    entregas["slack_lote"].append(payload)
+
+
+async def historico_stub(payloads):
+    entregas["historico"].append(payloads)
+
+
+def estado(db):
+    """Everything a failed batch must leave untouched"""
+    conn = db.get_connection()
+    return (
+        [tuple(row) for row in conn.execute("SELECT id, quantidade_disponivel, quantidade_em_uso FROM items ORDER BY id")],
+        conn.execute("SELECT COUNT(*) FROM transactions").fetchone()[0],
+        conn.execute("SELECT COUNT(*) FROM items_em_uso").fetchone()[0],
+        conn.execute("SELECT COUNT(*) FROM item_units WHERE status = 'em_uso'").fetchone()[0],
+        conn.execute("SELECT COUNT(*) FROM outbox").fetchone()[0]
+    )
+
+
+async def esvaziar_outbox():
+    for _ in range(50):
+        if not await outbox_worker.drain():
+            return
+        await asyncio.sleep(0)
+
+
+async def checar(db, checks):
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app):
+        await outbox_worker.stop()  # O teste entrega o outbox na mão
+        async with httpx.AsyncClient(transport=transport, base_url="http://kiosk") as http:
+            ids = [item['id'] for item in (await http.get("/api/items")).json()]
+
+            carrinho = {"nome_pessoa": "Ana", "itens": [
+                {"tipo": "retirada", "item_id": ids[0], "quantidade": 1},
+                {"tipo": "retirada", "item_id": ids[1], "quantidade": 2},
+                {"tipo": "retirada", "item_id": ids[2], "quantidade": 3},
+            ]}
+            resposta = await http.post("/api/transactions/batch", json=carrinho)
+            corpo = resposta.json()
+            checks.append(("lote de 3 retiradas aplicado",
+                           resposta.status_code == 200 and
+                           [t['novo_saldo'] for t in corpo['transactions']] == [2, 1, 0] and
+                           [len(t['codigos']) for t in corpo['transactions']] == [1, 2, 3]))
+
+            eventos = Counter(row[0] for row in db.get_connection().execute(
+                "SELECT evento FROM outbox WHERE evento IN (?, ?, ?)",
+                (EVENTO_SLACK_TRANSACAO, EVENTO_SLACK_LOTE, EVENTO_SHEETS_HISTORICO)
+            ))
+            checks.append(("outbox: 1 Slack do lote + 3 linhas do HISTÓRICO, nenhum Slack individual",
+                           eventos == Counter({EVENTO_SLACK_LOTE: 1, EVENTO_SHEETS_HISTORICO: 3})))
+
+            await esvaziar_outbox()
+            checks.append(("Slack: uma mensagem com os 3 itens",
+                           not entregas["slack"] and len(entregas["slack_lote"]) == 1 and
+                           [m['item_id'] for m in entregas["slack_lote"][0]['movimentos']] == ids[:3]))
+            checks.append(("HISTÓRICO: um único append com as 3 linhas em ordem",
+                           len(entregas["historico"]) == 1 and
+                           [p['transaction_id'] for p in entregas["historico"][0]] ==
+                           [t['transaction_id'] for t in corpo['transactions']]))
+
+            catalogo = {item['id']: item for item in (await http.get("/api/items")).json()}
+            checks.append(("catálogo em memória atualizado",
+                           [catalogo[i]['quantidade_disponivel'] for i in ids[:3]] == [2, 1, 0]))
+
+            # Terceiro item sem estoque: os dois primeiros não podem ficar aplicados
+            antes = estado(db)
+            resposta = await http.post("/api/transactions/batch", json={"nome_pessoa": "Bruno", "itens": [
+                {"tipo": "retirada", "item_id": ids[3], "quantidade": 1},
+                {"tipo": "retirada", "item_id": ids[4], "quantidade": 1},
+                {"tipo": "retirada", "item_id": ids[2], "quantidade": 1},
+            ]})
+            checks.append(("item sem estoque: 400 apontando o item 3",
+                           resposta.status_code == 400 and resposta.json()['detail'].startswith("Item 3 (Item 00002)")))
+            checks.append(("lote com falha não deixa rastro (saldos, histórico, unidades, outbox)", estado(db) == antes))
+
+            resposta = await http.post("/api/transactions/batch", json={"nome_pessoa": "Bruno", "itens": [
+                {"tipo": "retirada", "item_id": ids[3], "quantidade": 1},
+                {"tipo": "retirada", "item_id": 999999, "quantidade": 1},
+            ]})
+            checks.append(("item inexistente: 404 e rollback", resposta.status_code == 404 and estado(db) == antes))
+
+            resposta = await http.post("/api/transactions/batch", json={"nome_pessoa": "Bruno", "itens": []})
+            checks.append(("carrinho vazio: 422", resposta.status_code == 422))
+
+            # Devolve parte e retira outro item no mesmo lote
+            resposta = await http.post("/api/transactions/batch", json={"nome_pessoa": "Ana", "itens": [
+                {"tipo": "devolucao", "item_id": ids[2], "quantidade": 3},
+                {"tipo": "retirada", "item_id": ids[5], "quantidade": 1},
+            ]})
+            em_uso = db.get_connection().execute(
+                "SELECT COUNT(*) FROM items_em_uso WHERE nome_pessoa = 'Ana'"
+            ).fetchone()[0]
+            checks.append(("lote misto (devolução + retirada)",
+                           resposta.status_code == 200 and
+                           [t['novo_saldo'] for t in resposta.json()['transactions']] == [3, 2] and em_uso == 4))
+
+
+def main():
+    sync_scheduler.sync_func = sync_desligado
+    outbox_worker.register(EVENTO_SLACK_TRANSACAO, slack_stub)
+    outbox_worker.register(EVENTO_SLACK_LOTE, slack_lote_stub)
+    outbox_worker.register_batch(EVENTO_SHEETS_HISTORICO, historico_stub, max_size=settings.HISTORY_BATCH_MAX_ROWS)
+    db = populate(6)
+
+    print("=" * 80)
+    print("TESTE DO CHECKOUT EM LOTE")
+    print("=" * 80)
+    checks = []
+    asyncio.run(checar(db, checks))
+
+    ok = True
+    for descricao, passed in checks:
+        print(f"{'✅' if passed else '❌'} {descricao}")
+        ok = ok and passed
+
+    Database.close_all()
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
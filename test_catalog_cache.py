@@ -0,0 +1,131 @@
+"""
+Teste do catálogo em memória (/api/items) contra escritas de fora do servidor
+Grava no banco por outra conexão (como o import_xlsx com o servidor no
+ar) e confere que /api/items e /api/items/{id} mudam de corpo e de ETag
+assim que o feed de mudanças vê o seq andar, e que as leituras não
+esperam uma atualização do cache em andamento.
+
+Execute: python test_catalog_cache.py
+"""
+import asyncio
+import os
+import sys
+import threading
+import time
+
+# Add benchmarks to path (fixtures puts backend there too)
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'benchmarks'))
+from fixtures import banco_temporario, populate, sync_desligado
+banco_temporario("catalogo.db", CHANGE_FEED_POLL_SECONDS="0.1")
+
+import httpx
+from app.main import app
+from app.services.catalog_cache import ITEM_FIELDS, PATCH_MAX_CHANGES, catalog_cache
+from app.services.database import Database
+from app.services.sync_scheduler import sync_scheduler
+from app.utils.pagination import encode_cursor
+
+
+def escrever_de_fora(*comandos):
+    """Run SQL on a second connection (its own thread), like another process"""
+    def gravar():
+        db = Database()
+        with db.transaction() as conn:
+            for sql, params in comandos:
+                conn.execute(sql, params)
+    thread = threading.Thread(target=gravar)
+    thread.start()
+    thread.join()
+
+
+def varredura():
+    """What /api/items should return, read straight from the database"""
+    return [{field: row.get(field) for field in ITEM_FIELDS} for row in Database().get_all_items()]
+
+
+async def checar(checks):
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://kiosk") as http:
+            async def ler():
+                await asyncio.sleep(0.4)  # Algumas voltas do feed (CHANGE_FEED_POLL_SECONDS)
+                return await http.get("/api/items")
+
+            primeira = await http.get("/api/items")
+            etag = primeira.headers["etag"]
+            ids = [i['id'] for i in primeira.json()]
+            item_etag = (await http.get(f"/api/items/{ids[5]}")).headers["etag"]
+            checks.append(("sem mudanças: 304",
+                           (await http.get("/api/items", headers={"If-None-Match": etag})).status_code == 304))
+
+            escrever_de_fora(("UPDATE items SET localizacao = 'Armário 9', quantidade_disponivel = 0 WHERE id = ?", (ids[5],)))
+            resposta = await ler()
+            um = await http.get(f"/api/items/{ids[5]}", headers={"If-None-Match": item_etag})
+            checks.append(("escrita de outra conexão: corpo e ETag novos em /api/items",
+                           resposta.headers["etag"] != etag and resposta.json() == varredura() and
+                           (await http.get("/api/items", headers={"If-None-Match": etag})).status_code == 200))
+            checks.append(("/api/items/{id} também atualizado",
+                           um.status_code == 200 and um.json()['localizacao'] == "Armário 9"))
+
+            escrever_de_fora(
+                ("INSERT INTO items (nome, quantidade_total, quantidade_disponivel, aba_origem) VALUES ('Item 00002b', 1, 1, 'Produto')", ()),
+                ("UPDATE items SET nome = 'Item 99999' WHERE id = ?", (ids[0],)),
+                ("DELETE FROM item_units WHERE item_id = ?", (ids[7],)),
+                ("DELETE FROM items WHERE id = ?", (ids[7],)),
+            )
+            resposta = await ler()
+            checks.append(("inserido, renomeado e removido de fora: ordem (nome, id) mantida",
+                           resposta.json() == varredura()))
+            checks.append(("item removido de fora: 404",
+                           (await http.get(f"/api/items/{ids[7]}")).status_code == 404))
+
+            pagina = await http.get("/api/items", params={"limit": 3})
+            seguinte = await http.get("/api/items", params={"limit": 3, "cursor": pagina.headers["x-next-cursor"]})
+            checks.append(("paginação usa o catálogo atualizado",
+                           pagina.json() + seguinte.json() == varredura()[:6]))
+
+            # Cursores bem formados com tipos trocados: 400, não 500
+            forjados = [encode_cursor(valores) for valores in ([1, "x"], ["Item", "7"], ["Item", True], [None, 1])]
+            status = [(await http.get(rota, params={"limit": 3, "cursor": cursor})).status_code
+                      for rota in ("/api/items", "/api/history", f"/api/history/item/{ids[5]}") for cursor in forjados]
+            checks.append(("cursor com tipos errados (items e histórico): 400", set(status) == {400}))
+
+            # Delta maior que PATCH_MAX_CHANGES: relê o catálogo inteiro
+            escrever_de_fora(("UPDATE items SET localizacao = 'Armário 2'", ()))
+            resposta = await ler()
+            checks.append((f"mais de {PATCH_MAX_CHANGES} mudanças de fora: recarga completa",
+                           resposta.json() == varredura()))
+
+            # Uma atualização demorada segura o lock: a leitura não pode esperar por ela
+            catalog_cache._lock.acquire()
+            try:
+                inicio = time.perf_counter()
+                resposta = await http.get("/api/items")
+                duracao = time.perf_counter() - inicio
+            finally:
+                catalog_cache._lock.release()
+            checks.append(("leitura não espera o lock de quem atualiza o cache",
+                           resposta.status_code == 200 and duracao < 0.5))
+
+
+def main():
+    sync_scheduler.sync_func = sync_desligado
+    populate(PATCH_MAX_CHANGES + 100, unidades=2)
+
+    print("=" * 80)
+    print("TESTE DO CATÁLOGO EM MEMÓRIA")
+    print("=" * 80)
+    checks = []
+    asyncio.run(checar(checks))
+
+    ok = True
+    for descricao, passed in checks:
+        print(f"{'✅' if passed else '❌'} {descricao}")
+        ok = ok and passed
+
+    Database.close_all()
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""
+Teste do feed de mudanças dos itens (/api/items/changes e /api/items/stream)
+Sobe o servidor de verdade (uvicorn numa thread, banco temporário, sync
+desligado) e confere que movimentações, sync e remoções aparecem no
+delta e chegam pelo stream SSE.
+
+Execute: python test_change_feed.py
+"""
+import json
+import os
+import socket
+import sys
+import threading
+import time
+
+# Add benchmarks to path (fixtures puts backend there too)
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'benchmarks'))
+from fixtures import banco_temporario, item_sintetico, populate, sync_desligado
+banco_temporario("changes.db")
+
+import httpx
+import uvicorn
+from app.main import app
+from app.services.database import Database
+from app.services.inventory_sync import apply_groups
+from app.services.sync_scheduler import sync_scheduler
+
+
+def porta_livre():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def ler_evento(linhas):
+    """Próximo evento SSE (ignora comentários/retry); (evento, id, dados)"""
+    evento, event_id, dados = None, None, None
+    for linha in linhas:
+        if linha.startswith("event: "):
+            evento = linha[7:]
+        elif linha.startswith("id: "):
+            event_id = int(linha[4:])
+        elif linha.startswith("data: "):
+            dados = json.loads(linha[6:])
+        elif linha == "" and evento:
+            return evento, event_id, dados
+    return None, None, None
+
+
+def main():
+    sync_scheduler.sync_func = sync_desligado
+    db = populate(20)
+
+    porta = porta_livre()
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=porta, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+
+    base = f"http://127.0.0.1:{porta}/api"
+    http = httpx.Client(base_url=base, timeout=10)
+
+    print("=" * 80)
+    print("TESTE DO FEED DE MUDANÇAS")
+    print("=" * 80)
+    checks = []
+
+    items = http.get("/items").json()
+    base_seq = max(item['change_seq'] for item in items)
+    vazio = http.get("/items/changes", params={"since": base_seq}).json()
+    checks.append(("since = último seq do catálogo: nada novo",
+                   not vazio['items'] and not vazio['removidos'] and vazio['seq'] == base_seq))
+
+    alvo = items[0]
+    http.post("/transactions", json={"tipo": "retirada", "item_id": alvo['id'], "quantidade": 1, "nome_pessoa": "Teste"})
+    delta = http.get("/items/changes", params={"since": base_seq}).json()
+    checks.append(("retirada: só o item movimentado, com o saldo novo",
+                   [i['id'] for i in delta['items']] == [alvo['id']] and
+                   delta['items'][0]['quantidade_disponivel'] == alvo['quantidade_disponivel'] - 1 and
+                   delta['seq'] == base_seq + 1))
+
+    # Sync mexendo em 2 itens (mesmo caminho do Google Sheets / xlsx)
+    seq_sync = delta['seq']
+    grupos = {(f"Item {i:05d}", "Produto"): item_sintetico(i, unidades=4) for i in (5, 6)}
+    apply_groups(db, grupos)
+    delta = http.get("/items/changes", params={"since": seq_sync}).json()
+    checks.append(("sync: os 2 itens alterados",
+                   sorted(i['nome'] for i in delta['items']) == ["Item 00005", "Item 00006"]))
+
+    paginas, since, vistos = 0, seq_sync, []
+    while True:
+        pagina = http.get("/items/changes", params={"since": since, "limit": 1}).json()
+        vistos += [i['id'] for i in pagina['items']]
+        since = pagina['seq']
+        paginas += 1
+        if not pagina['has_more']:
+            break
+    checks.append(("paginação com limit=1", paginas >= 2 and len(vistos) == 2))
+
+    # Item apagado vira remoção no feed
+    removido = items[-1]['id']
+    with db.transaction() as conn:
+        conn.execute("DELETE FROM item_units WHERE item_id = ?", (removido,))
+        conn.execute("DELETE FROM items WHERE id = ?", (removido,))
+    delta = http.get("/items/changes", params={"since": since}).json()
+    checks.append(("remoção aparece em removidos", delta['removidos'] == [removido]))
+
+    checks.append(("cliente à frente do banco recebe reset",
+                   http.get("/items/changes", params={"since": 10 ** 9}).json()['reset'] is True))
+
+    # Stream: a retirada chega como evento 'items'
+    seq = delta['seq']
+    recebido = {}
+
+    def escutar():
+        with httpx.stream("GET", f"{base}/items/stream", params={"since": seq}, timeout=10) as resposta:
+            recebido['evento'] = ler_evento(resposta.iter_lines())
+            recebido['em'] = time.perf_counter()
+
+    ouvinte = threading.Thread(target=escutar, daemon=True)
+    ouvinte.start()
+    time.sleep(0.3)
+    inicio = time.perf_counter()
+    http.post("/transactions", json={"tipo": "devolucao", "item_id": alvo['id'], "quantidade": 1, "nome_pessoa": "Teste"})
+    ouvinte.join(timeout=5)
+    evento, event_id, dados = recebido.get('evento', (None, None, None))
+    checks.append(("stream entrega a devolução como evento 'items'",
+                   evento == "items" and [i['id'] for i in dados['items']] == [alvo['id']] and event_id == seq + 1))
+    if 'em' in recebido:
+        print(f"Latência do push: {(recebido['em'] - inicio) * 1000:.1f} ms")
+
+    # Reconexão com Last-Event-ID: continua de onde parou
+    with httpx.stream("GET", f"{base}/items/stream", headers={"Last-Event-ID": str(seq)}, timeout=10) as resposta:
+        evento, event_id, _ = ler_evento(resposta.iter_lines())
+    checks.append(("Last-Event-ID retoma o stream", evento == "items" and event_id == seq + 1))
+
+    server.should_exit = True
+    thread.join(timeout=10)
+
+    ok = True
+    for descricao, passed in checks:
+        print(f"{'✅' if passed else '❌'} {descricao}")
+        ok = ok and passed
+
+    Database.close_all()
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
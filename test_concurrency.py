@@ -0,0 +1,134 @@
+"""
+Teste de concorrência das movimentações de estoque
+Vários workers retiram e devolvem o mesmo item ao mesmo tempo, cada um
+com sua própria conexão, e no final o saldo precisa fechar.
+
+Execute: python test_concurrency.py [--workers 16] [--ops 200] [--estoque 25]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+
+# Add backend to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'backend'))
+
+from app.services.database import Database, InsufficientStockError
+
+
+def worker(db_path, item_id, ops, barrier, stats, lock, seed):
+    """Retira/devolve aleatoriamente, contando o que foi aceito"""
+    db = Database(db_path)
+    rng = random.Random(seed)
+    nome_pessoa = f"Worker {seed}"
+    em_maos = 0
+    local = {"retiradas": 0, "devolucoes": 0, "recusadas": 0}
+
+    barrier.wait()
+    for _ in range(ops):
+        quantidade = rng.randint(1, 3)
+        tipo = "devolucao" if em_maos >= quantidade and rng.random() < 0.4 else "retirada"
+        try:
+            db.apply_stock_movement(tipo, item_id, quantidade, nome_pessoa)
+        except InsufficientStockError:
+            local["recusadas"] += 1
+            continue
+
+        if tipo == "retirada":
+            em_maos += quantidade
+            local["retiradas"] += quantidade
+        else:
+            em_maos -= quantidade
+            local["devolucoes"] += quantidade
+
+    with lock:
+        for key, value in local.items():
+            stats[key] += value
+        stats["em_maos"] += em_maos
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Teste de concorrência do estoque")
+    parser.add_argument("--workers", type=int, default=16)
+    parser.add_argument("--ops", type=int, default=200, help="Operações por worker")
+    parser.add_argument("--estoque", type=int, default=25, help="Unidades do item")
+    args = parser.parse_args()
+
+    db_path = os.path.join(tempfile.mkdtemp(), "concorrencia.db")
+    db = Database(db_path)
+    db.init_db()
+
+    codigos = [f"5S-{i:04d}" for i in range(args.estoque)]
+    item_id = db.upsert_item({
+        'nome': 'Paquímetro Digital',
+        'quantidade_total': args.estoque,
+        'quantidade_disponivel': args.estoque,
+        'quantidade_em_uso': 0,
+        'codigos_originais': ','.join(codigos),
+        'aba_origem': 'Mecânica'
+    })
+
+    print("=" * 80)
+    print("TESTE DE CONCORRÊNCIA")
+    print("=" * 80)
+    print(f"{args.workers} workers x {args.ops} operações sobre {args.estoque} unidades")
+
+    stats = {"retiradas": 0, "devolucoes": 0, "recusadas": 0, "em_maos": 0}
+    lock = threading.Lock()
+    barrier = threading.Barrier(args.workers)
+    threads = [
+        threading.Thread(target=worker, args=(db_path, item_id, args.ops, barrier, stats, lock, i))
+        for i in range(args.workers)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    # Só a conexão da thread principal continua aberta
+    conexoes_abertas = len(Database._threads)
+
+    item = db.get_item_by_id(item_id)
+    conn = db.get_connection()
+    ledger = conn.execute("""
+        SELECT
+            COALESCE(SUM(CASE WHEN tipo = 'retirada' THEN quantidade END), 0) AS retiradas,
+            COALESCE(SUM(CASE WHEN tipo = 'devolucao' THEN quantidade END), 0) AS devolucoes
+        FROM transactions WHERE item_id = ?
+    """, (item_id,)).fetchone()
+    em_uso_rows = conn.execute(
+        "SELECT COUNT(*) FROM items_em_uso WHERE item_id = ?", (item_id,)
+    ).fetchone()[0]
+    negativos = conn.execute(
+        "SELECT COUNT(*) FROM transactions WHERE item_id = ? AND saldo_apos < 0", (item_id,)
+    ).fetchone()[0]
+
+    checks = [
+        ("disponível + em uso == total",
+         item['quantidade_disponivel'] + item['quantidade_em_uso'] == item['quantidade_total']),
+        ("disponível nunca negativo", item['quantidade_disponivel'] >= 0 and negativos == 0),
+        ("em uso == unidades nas mãos dos workers", item['quantidade_em_uso'] == stats["em_maos"]),
+        ("items_em_uso tem uma linha por unidade em uso", em_uso_rows == item['quantidade_em_uso']),
+        ("histórico == operações aceitas",
+         ledger['retiradas'] == stats["retiradas"] and ledger['devolucoes'] == stats["devolucoes"]),
+        ("saldo final bate com o histórico",
+         args.estoque - ledger['retiradas'] + ledger['devolucoes'] == item['quantidade_disponivel']),
+        ("conexões dos workers fechadas quando as threads terminam", conexoes_abertas == 1),
+    ]
+
+    print(f"\nRetiradas: {stats['retiradas']} | Devoluções: {stats['devolucoes']} | "
+          f"Recusadas: {stats['recusadas']}")
+    print(f"Saldo final: {item['quantidade_disponivel']} disponíveis, {item['quantidade_em_uso']} em uso\n")
+
+    ok = True
+    for descricao, passed in checks:
+        print(f"{'✅' if passed else '❌'} {descricao}")
+        ok = ok and passed
+
+    Database.close_all()
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""
+Teste da compressão e do cache HTTP do frontend e da API
+Confere URLs com hash no index.html, cache immutable dos assets, ETag do
+index, .br/.gz pré-comprimidos (e ignorados quando ficam velhos) e a
+compressão das respostas da API acima do limite (inclusive corpos grandes
+e em streaming).
+
+Execute: python test_http_cache.py
+"""
+import asyncio
+import gzip
+import os
+import re
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add benchmarks to path (fixtures puts backend there too)
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'benchmarks'))
+from fixtures import banco_temporario, populate, sync_desligado
+banco_temporario("http_cache.db")
+
+import httpx
+from fastapi import FastAPI, Response
+from fastapi.responses import StreamingResponse
+from app.main import app
+from app.services.database import Database
+from app.services.sync_scheduler import sync_scheduler
+from app.utils.compression import CompressionMiddleware, brotli, precompress_file
+from app.utils.static_assets import StaticAssets, render_index
+
+FRONTEND = os.path.join(os.path.dirname(__file__), "frontend")
+
+
+async def checar_app(checks):
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://kiosk") as http:
+            index = await http.get("/", headers={"Accept-Encoding": "gzip"})
+            urls = re.findall(r'(?:href|src)="(/static/[^"]+)"', index.text)
+            checks.append(("index.html: todos os assets com ?v=<hash>",
+                           urls and all(re.search(r"\?v=[0-9a-f]{12}$", url) for url in urls)))
+            checks.append(("index.html: no-cache + ETag, comprimido",
+                           index.headers.get("cache-control") == "no-cache" and "etag" in index.headers and
+                           index.headers.get("content-encoding") == "gzip"))
+
+            revalidado = await http.get("/", headers={"If-None-Match": index.headers["etag"]})
+            checks.append(("index.html revalidado: 304", revalidado.status_code == 304))
+
+            asset = await http.get(urls[-1])
+            checks.append(("asset com hash atual: immutable",
+                           "immutable" in asset.headers.get("cache-control", "")))
+            velho = await http.get(urls[-1].split("?")[0] + "?v=000000000000")
+            checks.append(("asset com hash antigo/sem hash: revalida",
+                           velho.headers.get("cache-control") == "no-cache"))
+
+            items = await http.get("/api/items", headers={"Accept-Encoding": "gzip"})
+            checks.append(("/api/items comprimido (gzip)",
+                           items.headers.get("content-encoding") == "gzip" and len(items.json()) == 100))
+            health = await http.get("/api/health", headers={"Accept-Encoding": "gzip"})
+            checks.append(("resposta abaixo do limite sai sem compressão",
+                           "content-encoding" not in health.headers))
+            sem = await http.get("/api/items", headers={"Accept-Encoding": "identity"})
+            checks.append(("sem Accept-Encoding: resposta original",
+                           "content-encoding" not in sem.headers and sem.content == items.content))
+
+
+async def checar_precomprimidos(checks):
+    pasta = tempfile.mkdtemp()
+    arquivo = os.path.join(pasta, "app.js")
+    with open(arquivo, "w") as f:
+        f.write("console.log('estoque');\n" * 200)
+    precompress_file(Path(arquivo))
+
+    estatico = FastAPI()
+    estatico.add_middleware(CompressionMiddleware)
+    estatico.mount("/static", StaticAssets(directory=pasta), name="static")
+    transport = httpx.ASGITransport(app=estatico)
+    async with httpx.AsyncClient(transport=transport, base_url="http://kiosk") as http:
+        resposta = await http.get("/static/app.js", headers={"Accept-Encoding": "gzip"})
+        checks.append(("servido o .gz pré-comprimido",
+                       resposta.headers.get("content-encoding") == "gzip" and
+                       int(resposta.headers["content-length"]) == os.path.getsize(arquivo + ".gz") and
+                       resposta.headers.get("content-type", "").startswith(("text/javascript", "application/javascript"))))
+        if brotli is not None:
+            resposta = await http.get("/static/app.js", headers={"Accept-Encoding": "gzip, br"})
+            checks.append(("servido o .br quando aceito",
+                           resposta.headers.get("content-encoding") == "br" and
+                           int(resposta.headers["content-length"]) == os.path.getsize(arquivo + ".br")))
+
+        # Original editado depois da compressão: o .gz velho não pode sair
+        time.sleep(0.01)
+        with open(arquivo, "a") as f:
+            f.write("console.log('novo');\n")
+        resposta = await http.get("/static/app.js", headers={"Accept-Encoding": "gzip"})
+        checks.append(("pré-comprimido velho é ignorado",
+                       resposta.text.endswith("console.log('novo');\n") and
+                       gzip.decompress(open(arquivo + ".gz", "rb").read()) != resposta.content))
+    shutil.rmtree(pasta)
+
+    # Corpo grande (comprimido numa thread), streaming e SSE
+    grande = ("[" + ",".join('{"id": %d, "nome": "Paquímetro"}' % i for i in range(10000)) + "]").encode()
+    respostas = FastAPI()
+    respostas.add_middleware(CompressionMiddleware)
+
+    @respostas.get("/grande")
+    def rota_grande():
+        return Response(grande, media_type="application/json")
+
+    @respostas.get("/pedacos")
+    def rota_pedacos():
+        return StreamingResponse(iter([grande[:200000], grande[200000:]]), media_type="application/json")
+
+    @respostas.get("/eventos")
+    def rota_eventos():
+        return StreamingResponse(iter(["data: 1\n\n" * 200]), media_type="text/event-stream")
+
+    transport = httpx.ASGITransport(app=respostas)
+    async with httpx.AsyncClient(transport=transport, base_url="http://kiosk") as http:
+        resposta = await http.get("/grande", headers={"Accept-Encoding": "gzip"})
+        checks.append(("corpo acima de 128 KiB comprimido inteiro",
+                       len(grande) > 128 * 1024 and resposta.headers.get("content-encoding") == "gzip" and
+                       resposta.content == grande))
+        resposta = await http.get("/pedacos", headers={"Accept-Encoding": "br, gzip"})
+        checks.append(("streaming comprimido pedaço a pedaço",
+                       resposta.headers.get("content-encoding") == ("br" if brotli is not None else "gzip") and
+                       "content-length" not in resposta.headers and resposta.content == grande))
+        resposta = await http.get("/eventos", headers={"Accept-Encoding": "gzip"})
+        checks.append(("text/event-stream não é comprimido", "content-encoding" not in resposta.headers))
+
+    corpo, etag = render_index(FRONTEND)
+    checks.append(("ETag do index estável", render_index(FRONTEND) == (corpo, etag)))
+
+
+def main():
+    sync_scheduler.sync_func = sync_desligado
+    populate(100, unidades=2)
+
+    print("=" * 80)
+    print("TESTE DE COMPRESSÃO E CACHE HTTP")
+    print("=" * 80)
+    checks = []
+    asyncio.run(checar_app(checks))
+    asyncio.run(checar_precomprimidos(checks))
+
+    ok = True
+    for descricao, passed in checks:
+        print(f"{'✅' if passed else '❌'} {descricao}")
+        ok = ok and passed
+
+    Database.close_all()
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Teste do sync incremental contra uma planilha falsa (sem Google)
+Confere que abas sem mudança não são reprocessadas e que o resultado
+do sync incremental é igual ao de um sync completo num banco novo.
+
+Execute: python test_incremental_sync.py [--items 3000]
+"""
+import argparse
+import os
+import sys
+
+# Add benchmarks to path (fixtures puts backend there too)
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'benchmarks'))
+from fixtures import estado, novo_banco
+
+from app.services.database import Database
+from app.services.google_sheets import GoogleSheetsService
+from fake_sheets import FakeSheetsClient, FakeSpreadsheet, build_inventory
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Teste do sync incremental")
+    parser.add_argument("--items", type=int, default=3000)
+    args = parser.parse_args()
+
+    planilha = FakeSpreadsheet(build_inventory(items=args.items))
+    db = novo_banco("incremental.db")
+    service = GoogleSheetsService(client=FakeSheetsClient(planilha), db=db)
+
+    print("=" * 80)
+    print("TESTE DE SYNC INCREMENTAL")
+    print("=" * 80)
+    checks = []
+
+    primeiro = service._sync_from_sheets()
+    checks.append(("1º sync cria todos os itens", primeiro['items_novos'] == primeiro['itens_unicos'] > 0))
+
+    planilha.calls.clear()
+    repetido = service._sync_from_sheets()
+    checks.append(("planilha sem mudança: nenhuma aba baixada",
+                   planilha.calls['values_batch_get'] == 0 and repetido['items_atualizados'] == 0))
+
+    # Escrita em outra aba (HISTÓRICO) muda o modifiedTime mas não o inventário
+    planilha.add_worksheet("HISTÓRICO", rows=1000, cols=10)
+    planilha.calls.clear()
+    historico = service._sync_from_sheets()
+    checks.append(("só o HISTÓRICO mudou: abas lidas e todas puladas",
+                   planilha.calls['values_batch_get'] == 1 and len(historico['abas_inalteradas']) == 3))
+
+    # Movimenta um item antes das mudanças: o sync não pode perder o saldo
+    item = db.get_all_items()[0]
+    db.apply_stock_movement('retirada', item['id'], 1, 'Teste')
+
+    # Mudanças só na aba Mecânica
+    grade = planilha.sheets["Mecânica"].values
+    nome_alvo = grade[5][1]
+    planilha.add_unit("Mecânica", ["5S-900001", nome_alvo, grade[5][2], grade[5][3]])
+    planilha.set_cell("Mecânica", 10, 0, "5S-900002")          # troca de etiqueta
+    planilha.remove_row("Mecânica", 20)                        # unidade baixada
+    planilha.add_unit("Mecânica", ["5S-900003", "Item Novo Incremental", "Medição", "Armário 1"])
+
+    planilha.calls.clear()
+    incremental = service._sync_from_sheets()
+    checks.append(("só a aba alterada é reprocessada",
+                   sorted(incremental['abas_inalteradas']) == ["Eletrônica", "Produto"]))
+    checks.append(("mudanças aplicadas (1 novo, >=2 atualizados)",
+                   incremental['items_novos'] == 1 and incremental['items_atualizados'] >= 2))
+
+    # Referência: sync completo num banco novo, com a mesma retirada
+    referencia = novo_banco("completo.db")
+    GoogleSheetsService(client=FakeSheetsClient(planilha), db=referencia)._sync_from_sheets(full=True)
+    ref_item = referencia.get_item_by_name_and_aba(item['nome'], item['aba_origem'])
+    referencia.apply_stock_movement('retirada', ref_item['id'], 1, 'Teste')
+    checks.append(("incremental == sync completo", estado(db) == estado(referencia)))
+
+    print(f"\nItens: {primeiro['itens_unicos']} | registros: {primeiro['registros_lidos']}")
+    ok = True
+    for descricao, passed in checks:
+        print(f"{'✅' if passed else '❌'} {descricao}")
+        ok = ok and passed
+
+    Database.close_all()
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
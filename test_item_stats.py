@@ -0,0 +1,143 @@
+"""
+Teste dos agregados do /api/stats (tabela item_stats, mantida por triggers)
+Depois de cada tipo de escrita (movimentação, lote, sync, remoção, banco
+antigo sem a tabela) compara o /api/stats com uma varredura completa dos
+itens, e mede a leitura com catálogos de tamanhos diferentes.
+
+Execute: python test_item_stats.py
+"""
+import asyncio
+import os
+import sys
+import time
+
+# Add benchmarks to path (fixtures puts backend there too)
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'benchmarks'))
+from fixtures import banco_temporario, item_sintetico, sync_desligado
+banco_temporario("stats.db")
+
+import httpx
+from app.main import app
+from app.services.database import Database
+from app.services.inventory_sync import apply_groups
+from app.services.sync_scheduler import sync_scheduler
+
+ABAS = ["Produto", "Mecânica", "Elétrica"]
+CATEGORIAS = ["Medição", "Ferramenta", None]
+
+
+def item(i):
+    return item_sintetico(
+        i, i % 4 + 1,
+        categoria=CATEGORIAS[i // len(ABAS) % len(CATEGORIAS)],
+        aba_origem=ABAS[i % len(ABAS)]
+    )
+
+
+def varredura(db):
+    """The same totals, computed the slow way"""
+    conn = db.get_connection()
+    grupos = [dict(row) for row in conn.execute("""
+        SELECT COALESCE(aba_origem, '') AS aba_origem, COALESCE(categoria, '') AS categoria,
+            COUNT(*) AS itens, SUM(quantidade_total) AS quantidade_total,
+            SUM(quantidade_disponivel) AS quantidade_disponivel, SUM(quantidade_em_uso) AS quantidade_em_uso,
+            SUM(quantidade_disponivel < estoque_minimo) AS abaixo_minimo
+        FROM items
+        GROUP BY 1, 2
+        ORDER BY 1, 2
+    """)]
+    return grupos
+
+
+async def confere(http, db, descricao, checks):
+    stats = (await http.get("/api/stats")).json()
+    esperado = varredura(db)
+    totais_ok = all(
+        stats['totais'][campo] == sum(g[campo] for g in esperado)
+        for campo in ("itens", "quantidade_total", "quantidade_disponivel", "quantidade_em_uso", "abaixo_minimo")
+    )
+    checks.append((descricao, stats['grupos'] == esperado and totais_ok))
+    return stats
+
+
+async def checar(db, checks):
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://kiosk") as http:
+            stats = await confere(http, db, "carga inicial (bulk_sync_items)", checks)
+            checks.append(("9 grupos aba/categoria, 3 abas",
+                           len(stats['grupos']) == 9 and len(stats['por_aba']) == 3))
+
+            ids = [i['id'] for i in (await http.get("/api/items")).json()]
+            await http.post("/api/transactions", json={"tipo": "retirada", "item_id": ids[3], "quantidade": 2, "nome_pessoa": "Ana"})
+            await http.post("/api/transactions/batch", json={"nome_pessoa": "Ana", "itens": [
+                {"tipo": "retirada", "item_id": ids[7], "quantidade": 1},
+                {"tipo": "retirada", "item_id": ids[11], "quantidade": 3},
+                {"tipo": "devolucao", "item_id": ids[3], "quantidade": 1}
+            ]})
+            stats = await confere(http, db, "movimentação e lote", checks)
+            checks.append(("abaixo do mínimo conta a retirada", stats['totais']['abaixo_minimo'] > 0))
+
+            # Sync: muda quantidade, troca categoria, move de aba e cria item novo
+            grupos = {}
+            for i, mudanca in ((0, {'quantidade_total': 9, 'codigos': [f"5S-00000-{u}" for u in range(9)]}),
+                               (1, {'categoria': "Elétrica"}),
+                               (2, {'aba_origem': "Produto"}),
+                               (999, {})):
+                novo = {**item(i), **mudanca}
+                grupos[(novo['nome'], novo['aba_origem'])] = novo
+            apply_groups(db, grupos)
+            await confere(http, db, "sync (quantidade, categoria, aba, item novo)", checks)
+
+            with db.transaction() as conn:
+                conn.execute("UPDATE items SET estoque_minimo = 10 WHERE id = ?", (ids[20],))
+                conn.execute("DELETE FROM item_units WHERE item_id IN (?, ?)", (ids[21], ids[22]))
+                conn.execute("DELETE FROM items WHERE id IN (?, ?)", (ids[21], ids[22]))
+            await confere(http, db, "estoque_minimo alterado e itens removidos", checks)
+
+            etag = (await http.get("/api/stats")).headers["etag"]
+            checks.append(("ETag: 304 sem mudanças",
+                           (await http.get("/api/stats", headers={"If-None-Match": etag})).status_code == 304))
+
+            # Banco anterior aos agregados: init_db recalcula a partir dos itens
+            with db.transaction() as conn:
+                conn.execute("DROP TABLE item_stats")
+            db.init_db()
+            await confere(http, db, "banco sem item_stats é reconstruído no init_db", checks)
+
+            # Leitura não cresce com o catálogo
+            tempos = {}
+            for total in (1000, 20000):
+                db.bulk_sync_items([item(i) for i in range(total)], [])
+                inicio = time.perf_counter()
+                for _ in range(200):
+                    await http.get("/api/stats")
+                tempos[total] = (time.perf_counter() - inicio) / 200 * 1000
+            await confere(http, db, "20.000 itens", checks)
+            print(f"GET /api/stats: {tempos[1000]:.2f} ms com 1.000 itens, {tempos[20000]:.2f} ms com 20.000")
+            checks.append(("leitura não cresce com o catálogo", tempos[20000] < tempos[1000] * 2))
+
+
+def main():
+    sync_scheduler.sync_func = sync_desligado
+    db = Database()
+    db.init_db()
+    db.bulk_sync_items([item(i) for i in range(60)], [])
+
+    print("=" * 80)
+    print("TESTE DOS AGREGADOS (/api/stats)")
+    print("=" * 80)
+    checks = []
+    asyncio.run(checar(db, checks))
+
+    ok = True
+    for descricao, passed in checks:
+        print(f"{'✅' if passed else '❌'} {descricao}")
+        ok = ok and passed
+
+    Database.close_all()
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+"""
+Teste dos alertas de estoque baixo (cruzamentos de estoque_minimo)
+Movimenta itens direto no banco e entrega o outbox na mão, com o Slack
+trocado por um stub. Confere que só cruzamentos do limite geram alerta,
+que idas e voltas antes da entrega não avisam, que os avisos de um lote
+saem numa mensagem só, que itens novos já abaixo do mínimo não avisam
+(só a volta ao normal) e que o estado sobrevive a um reinício.
+
+Execute: python test_low_stock_alerts.py
+"""
+import asyncio
+import os
+import sys
+
+# Add benchmarks to path (fixtures puts backend there too)
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'benchmarks'))
+from fixtures import banco_temporario, item_sintetico
+banco_temporario("alertas.db", LOW_STOCK_ALERT_WINDOW_SECONDS="0", OUTBOX_BACKOFF_BASE_SECONDS="0")
+
+from app.services.database import Database, EVENTO_ALERTA_ESTOQUE
+from app.services.outbox import outbox_worker
+from app.services.slack_service import SlackService
+
+mensagens = []
+slack_fora = {"ativo": False}
+
+
+async def send_low_stock_alert_stub(self, alertas):
+    if slack_fora["ativo"]:
+        return False
+    mensagens.append([(alerta['nome'], alerta['abaixo']) for alerta in alertas])
+    return True
+
+
+def populate():
+    db = Database()
+    db.init_db()
+    # 10 unidades cada: estoque_minimo = max(2, 20%) = 2
+    db.bulk_sync_items([
+        item_sintetico(i, 10, nome=nome, estoque_minimo=2) for i, nome in enumerate(("A", "B", "C", "D"))
+    ], [])
+    return db, {item['nome']: item['id'] for item in db.get_all_items()}
+
+
+def mover(db, ids, nome, tipo, quantidade):
+    db.apply_stock_movement(tipo, ids[nome], quantidade, "Ana")
+
+
+def alertas_na_fila(db):
+    return db.get_connection().execute(
+        "SELECT COUNT(*) FROM outbox WHERE evento = ? AND status = 'pendente'", (EVENTO_ALERTA_ESTOQUE,)
+    ).fetchone()[0]
+
+
+def entregar():
+    async def drenar():
+        while await outbox_worker.drain():
+            pass
+    asyncio.run(drenar())
+
+
+def main():
+    SlackService.is_configured = lambda self: True
+    SlackService.send_low_stock_alert = send_low_stock_alert_stub
+    db, ids = populate()
+
+    print("=" * 80)
+    print("TESTE DOS ALERTAS DE ESTOQUE BAIXO")
+    print("=" * 80)
+    checks = []
+
+    mover(db, ids, "A", "retirada", 7)  # 10 → 3: continua acima do mínimo
+    checks.append(("movimentação sem cruzar o limite não gera alerta", alertas_na_fila(db) == 0))
+
+    mover(db, ids, "A", "retirada", 2)  # 3 → 1: cruza para baixo
+    mover(db, ids, "A", "retirada", 1)  # 1 → 0: já estava abaixo
+    checks.append(("só o cruzamento entra no outbox (1 entrada para 2 retiradas)", alertas_na_fila(db) == 1))
+
+    entregar()
+    checks.append(("alerta de estoque baixo enviado", mensagens == [[("A", 1)]]))
+
+    # B desce e volta antes da entrega; C e D descem: os dois numa mensagem só
+    mensagens.clear()
+    mover(db, ids, "B", "retirada", 9)
+    mover(db, ids, "B", "devolucao", 9)
+    mover(db, ids, "C", "retirada", 9)
+    mover(db, ids, "D", "retirada", 9)
+    entregar()
+    checks.append(("ida e volta antes da entrega não avisa; C e D saem juntos",
+                   mensagens == [[("C", 1), ("D", 1)]]))
+
+    # Slack fora do ar: nada é marcado como avisado e a entrega é repetida
+    mensagens.clear()
+    slack_fora["ativo"] = True
+    mover(db, ids, "A", "devolucao", 10)  # 0 → 10: volta ao normal
+    asyncio.run(outbox_worker.drain())
+    estado = db.get_connection().execute(
+        "SELECT abaixo, notificado_abaixo FROM estoque_alertas WHERE item_id = ?", (ids["A"],)
+    ).fetchone()
+    checks.append(("falha no Slack mantém o alerta pendente", tuple(estado) == (0, 1) and alertas_na_fila(db) == 1))
+    slack_fora["ativo"] = False
+    entregar()
+    checks.append(("nova tentativa avisa a normalização", mensagens == [[("A", 0)]]))
+
+    # Reinício: o estado está no banco
+    Database.close_all()
+    db = Database()
+    db.init_db()
+    mensagens.clear()
+    mover(db, ids, "C", "devolucao", 9)
+    mover(db, ids, "C", "retirada", 9)  # De volta abaixo: C já tinha sido avisado
+    entregar()
+    checks.append(("depois de reiniciar, voltar ao lado já avisado não repete o alerta", mensagens == []))
+
+    # Sync que aumenta a quantidade_total: C (1 disponível) volta para 11
+    mensagens.clear()
+    db.bulk_sync_items([], [item_sintetico(2, 20, nome="C", id=ids["C"])])
+    entregar()
+    checks.append(("sync que aumenta a quantidade_total também cruza", mensagens == [[("C", 0)]]))
+
+    # Mudança do estoque_minimo direto no banco também é um cruzamento
+    mensagens.clear()
+    with db.transaction() as conn:
+        conn.execute("UPDATE items SET estoque_minimo = 0 WHERE id = ?", (ids["D"],))
+    entregar()
+    checks.append(("estoque_minimo alterado direto no banco também cruza", mensagens == [[("D", 0)]]))
+
+    # Item que já nasce abaixo do mínimo (1 unidade, mínimo 2) entra como avisado
+    mensagens.clear()
+    db.bulk_sync_items([
+        item_sintetico(i, total, nome=nome, estoque_minimo=2) for i, nome, total in ((4, "E", 1), (5, "F", 5))
+    ], [])
+    ids.update({item['nome']: item['id'] for item in db.get_all_items()})
+    estado = db.get_connection().execute(
+        "SELECT abaixo, notificado_abaixo FROM estoque_alertas WHERE item_id = ?", (ids["E"],)
+    ).fetchone()
+    entregar()
+    checks.append(("item inserido abaixo do mínimo não gera alerta (import/sync em massa)",
+                   mensagens == [] and alertas_na_fila(db) == 0 and tuple(estado) == (1, 1)))
+
+    with db.transaction() as conn:
+        conn.execute("UPDATE items SET estoque_minimo = 1 WHERE id = ?", (ids["E"],))
+    entregar()
+    checks.append(("item inserido abaixo do mínimo avisa quando volta ao normal", mensagens == [[("E", 0)]]))
+
+    with db.transaction() as conn:
+        conn.execute("DELETE FROM items_em_uso WHERE item_id = ?", (ids["C"],))
+        conn.execute("DELETE FROM item_units WHERE item_id = ?", (ids["C"],))
+        conn.execute("DELETE FROM items WHERE id = ?", (ids["C"],))
+    restante = db.get_connection().execute(
+        "SELECT COUNT(*) FROM estoque_alertas WHERE item_id = ?", (ids["C"],)
+    ).fetchone()[0]
+    checks.append(("item removido leva o estado junto", restante == 0))
+
+    ok = True
+    for descricao, passed in checks:
+        print(f"{'✅' if passed else '❌'} {descricao}")
+        ok = ok and passed
+
+    Database.close_all()
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+"""
+Teste do OutboxWorker (entrega em segundo plano de Slack/HISTÓRICO)
+Faz um handler falhar e confere tentativas, backoff exponencial com teto,
+o status 'falhou' depois de OUTBOX_MAX_ATTEMPTS, o RetryLater que não
+gasta tentativa e o lote reagendado junto; depois "reinicia" o processo
+no mesmo banco e confere que as entradas pendentes são entregues.
+
+Execute: python test_outbox.py
+"""
+import asyncio
+import os
+import sys
+import time
+
+# Add benchmarks to path (fixtures puts backend there too)
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'benchmarks'))
+from fixtures import banco_temporario
+banco_temporario("outbox.db", OUTBOX_MAX_ATTEMPTS="3", OUTBOX_BACKOFF_BASE_SECONDS="10", OUTBOX_BACKOFF_MAX_SECONDS="15")
+
+from app.services.database import AsyncDatabase, Database
+from app.services.outbox import OutboxWorker, RetryLater
+
+entregas = []
+falhas = {"erro": None}
+
+
+async def handler(payload):
+    if falhas["erro"] is not None:
+        raise falhas["erro"]
+    entregas.append(payload)
+
+
+async def handler_lote(payloads):
+    if falhas["erro"] is not None:
+        raise falhas["erro"]
+    entregas.append(payloads)
+
+
+def novo_worker() -> OutboxWorker:
+    worker = OutboxWorker()
+    worker.register("teste", handler)
+    worker.register_batch("teste_lote", handler_lote, max_size=10)
+    return worker
+
+
+def enfileirar(db, evento, *payloads):
+    with db.transaction() as conn:
+        for payload in payloads:
+            Database._enqueue_outbox(conn, (evento,), payload)
+
+
+def linhas(db, evento):
+    return [dict(row) for row in db.get_connection().execute(
+        "SELECT * FROM outbox WHERE evento = ? ORDER BY id", (evento,)
+    )]
+
+
+def vencer(db):
+    """Simulate the backoff elapsing"""
+    with db.transaction() as conn:
+        conn.execute("UPDATE outbox SET proxima_tentativa = ? WHERE status = 'pendente'", (time.time() - 1,))
+
+
+def drenar(worker) -> int:
+    return asyncio.run(worker.drain())
+
+
+def main():
+    db = Database()
+    db.init_db()
+    worker = novo_worker()
+
+    print("=" * 80)
+    print("TESTE DO OUTBOX")
+    print("=" * 80)
+    checks = []
+
+    # 1ª falha: tentativa contada, backoff de base (10s, jitter 0.8–1.2)
+    enfileirar(db, "teste", {"n": 1})
+    falhas["erro"] = RuntimeError("Slack fora do ar")
+    antes = time.time()
+    drenar(worker)
+    linha = linhas(db, "teste")[0]
+    checks.append(("1ª falha: tentativas=1, pendente, erro gravado",
+                   linha['tentativas'] == 1 and linha['status'] == 'pendente' and linha['ultimo_erro'] == "Slack fora do ar"))
+    checks.append(("1ª falha: próxima tentativa em 8–12s",
+                   antes + 8 <= linha['proxima_tentativa'] <= time.time() + 12))
+    checks.append(("antes do backoff vencer nada é tentado", drenar(worker) == 0))
+
+    # 2ª falha: 10 * 2 = 20s, limitado por OUTBOX_BACKOFF_MAX_SECONDS (15s)
+    vencer(db)
+    antes = time.time()
+    drenar(worker)
+    linha = linhas(db, "teste")[0]
+    checks.append(("2ª falha: backoff dobra e respeita o teto (12–18s)",
+                   linha['tentativas'] == 2 and antes + 12 <= linha['proxima_tentativa'] <= time.time() + 18))
+
+    # RetryLater (cota da API): reagenda sem gastar tentativa
+    vencer(db)
+    falhas["erro"] = RetryLater("Cota excedida", 60)
+    antes = time.time()
+    drenar(worker)
+    linha = linhas(db, "teste")[0]
+    checks.append(("RetryLater não gasta tentativa e espera retry_after",
+                   linha['tentativas'] == 2 and linha['status'] == 'pendente' and
+                   antes + 60 <= linha['proxima_tentativa'] <= time.time() + 72))
+
+    # 3ª falha = OUTBOX_MAX_ATTEMPTS: desiste
+    vencer(db)
+    falhas["erro"] = RuntimeError("Slack fora do ar")
+    drenar(worker)
+    linha = linhas(db, "teste")[0]
+    vencer(db)
+    checks.append(("depois de OUTBOX_MAX_ATTEMPTS: status 'falhou' e não é mais tentada",
+                   linha['tentativas'] == 3 and linha['status'] == 'falhou' and drenar(worker) == 0))
+
+    # Lote: a falha reagenda todas as entradas juntas
+    enfileirar(db, "teste_lote", {"n": 1}, {"n": 2}, {"n": 3})
+    drenar(worker)
+    lote = linhas(db, "teste_lote")
+    checks.append(("lote com falha: as 3 entradas reagendadas juntas",
+                   [l['tentativas'] for l in lote] == [1, 1, 1] and
+                   len({l['proxima_tentativa'] for l in lote}) == 1))
+
+    # Reinício: pendentes ficam no SQLite e o worker novo entrega na ordem
+    enfileirar(db, "teste", {"n": 2}, {"n": 3})
+    falhas["erro"] = None
+    entregas.clear()
+    AsyncDatabase.shutdown()
+    Database.close_all()
+
+    async def reiniciar():
+        worker = novo_worker()
+        worker.start()
+        vencer(Database())  # O backoff do lote "passou" enquanto o processo estava parado
+        worker.notify()
+        limite = time.time() + 5
+        while time.time() < limite and len(entregas) < 3:
+            await asyncio.sleep(0.05)
+        await worker.stop()
+
+    asyncio.run(reiniciar())
+    db = Database()
+    restantes = [(row['evento'], row['status']) for row in db.get_connection().execute(
+        "SELECT evento, status FROM outbox ORDER BY id"
+    )]
+    checks.append(("depois do reinício as pendentes são entregues em ordem",
+                   {"n": 2} in entregas and {"n": 3} in entregas and
+                   entregas.index({"n": 2}) < entregas.index({"n": 3}) and
+                   [{"n": 1}, {"n": 2}, {"n": 3}] in entregas))
+    checks.append(("entregues saem da tabela; a que falhou fica para inspeção",
+                   restantes == [("teste", "falhou")]))
+
+    ok = True
+    for descricao, passed in checks:
+        print(f"{'✅' if passed else '❌'} {descricao}")
+        ok = ok and passed
+
+    AsyncDatabase.shutdown()
+    Database.close_all()
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
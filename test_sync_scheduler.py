@@ -0,0 +1,113 @@
+"""
+Teste do agendador de sync (POST /api/sync e /api/sync/status)
+Troca o sync do Sheets por um falso e confere que pedidos simultâneos
+esperam um único sync, que o timeout devolve 504 sem liberar um segundo
+sync enquanto o primeiro roda, e que o resultado ou o erro de um sync
+que termina depois do timeout aparece no status.
+
+Execute: python test_sync_scheduler.py
+"""
+import asyncio
+import os
+import sys
+
+# Add benchmarks to path (fixtures puts backend there too)
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'benchmarks'))
+from fixtures import banco_temporario
+banco_temporario("sync.db", SYNC_TIMEOUT_SECONDS="0.3")
+
+import httpx
+from app.main import app, startup_state
+from app.services.database import Database
+from app.services.sync_scheduler import sync_scheduler
+
+
+class SyncFalso:
+    """Sync that takes `duracao` seconds and then returns or raises"""
+
+    def __init__(self):
+        self.chamadas = 0
+        self.duracao = 0.0
+        self.erro = None
+
+    async def __call__(self, full):
+        self.chamadas += 1
+        await asyncio.sleep(self.duracao)
+        if self.erro is not None:
+            raise self.erro
+        return {"success": True, "items_novos": self.chamadas, "items_atualizados": 0}
+
+
+async def checar(sync, checks):
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://kiosk") as http:
+            while startup_state["initial_sync"] in ("pendente", "rodando"):  # Sync da partida
+                await asyncio.sleep(0.01)
+
+            # Cinco pedidos ao mesmo tempo: um sync só
+            sync.chamadas, sync.duracao = 0, 0.1
+            joined = sync_scheduler.status()["joined"]
+            respostas = await asyncio.gather(*[http.post("/api/sync") for _ in range(5)])
+            checks.append(("5 pedidos simultâneos: 1 sync, mesmo resultado para todos",
+                           sync.chamadas == 1 and {r.status_code for r in respostas} == {200} and
+                           all(r.json() == respostas[0].json() for r in respostas) and
+                           sync_scheduler.status()["joined"] - joined == 4))
+
+            # Sync mais lento que o timeout: 504, e quem chega depois espera o mesmo
+            sync.chamadas, sync.duracao = 0, 0.6
+            primeiro = await http.post("/api/sync")
+            status = (await http.get("/api/sync/status")).json()
+            segundo = await http.post("/api/sync")
+            checks.append(("timeout: 504 e o sync continua rodando",
+                           primeiro.status_code == 504 and status["running"] and "excedeu" in status["error"]))
+            checks.append(("durante o sync que estourou, outro pedido não inicia um segundo",
+                           segundo.status_code == 504 and sync.chamadas == 1))
+
+            await asyncio.sleep(0.5)
+            status = (await http.get("/api/sync/status")).json()
+            checks.append(("resultado que chega depois do timeout aparece no status",
+                           not status["running"] and status["error"] is None and
+                           status["result"] == {"success": True, "items_novos": 1, "items_atualizados": 0} and
+                           status["finished_at"] is not None))
+
+            # Erro que chega depois do timeout substitui a mensagem de timeout
+            sync.erro = RuntimeError("Aba PESSOAS não encontrada")
+            resposta = await http.post("/api/sync")
+            await asyncio.sleep(0.5)
+            status = (await http.get("/api/sync/status")).json()
+            checks.append(("erro que chega depois do timeout aparece no status",
+                           resposta.status_code == 504 and status["error"] == "Aba PESSOAS não encontrada" and
+                           status["result"] is None and not status["running"]))
+
+            # Falha dentro do prazo: 500 e o resultado antigo não fica no status
+            sync.duracao = 0.0
+            resposta = await http.post("/api/sync")
+            status = (await http.get("/api/sync/status")).json()
+            checks.append(("falha rápida: 500 com o erro, sem resultado velho",
+                           resposta.status_code == 500 and status["error"] == "Aba PESSOAS não encontrada" and
+                           status["result"] is None))
+
+
+def main():
+    sync = SyncFalso()
+    sync_scheduler.sync_func = sync
+    Database().init_db()
+
+    print("=" * 80)
+    print("TESTE DO AGENDADOR DE SYNC")
+    print("=" * 80)
+    checks = []
+    asyncio.run(checar(sync, checks))
+
+    ok = True
+    for descricao, passed in checks:
+        print(f"{'✅' if passed else '❌'} {descricao}")
+        ok = ok and passed
+
+    Database.close_all()
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()